@@ -0,0 +1,252 @@
+"""CPU inference backends for the Pegasus generator and the Bertsum encoder.
+
+- 'fp32': eager PyTorch, the checkpoint as published (model kinds 'seq2seq' / 'encoder')
+- 'int8': dynamic int8 quantization of every nn.Linear (kinds 'seq2seq-int8' / 'encoder-int8')
+- 'onnx': ONNX Runtime, for the Bertsum encoder only (kind 'encoder-onnx'). The
+  Pegasus export goes through optimum's ORTModelForSeq2SeqLM, whose releases
+  need transformers<4.58, so `backend_kind` refuses 'seq2seq' on 'onnx' until
+  a pin that works with this project's transformers is verified. onnxruntime
+  and optimum are optional, see requirements-onnx.txt
+
+Quantized weights and ONNX exports are produced once and kept under
+cache/backends/. Later loads read the artifact instead of quantizing or
+exporting again. The backends are registered as model_registry loaders, so they
+are cached and shared like any other model. `python backends.py` compares the
+ROUGE of every backend against fp32 on DUC2006.
+"""
+import os
+import re
+import time
+
+import torch
+
+from cache_paths import cache_path
+from model_registry import register_loader, release
+
+BACKENDS = ('fp32', 'int8', 'onnx')
+ARTIFACT_DIR = 'backends'  # Under the cache root, see cache_paths
+UNSUPPORTED = {
+    ('seq2seq', 'onnx'): "The onnx backend is not available for Pegasus: optimum's ORTModelForSeq2SeqLM "
+                         "needs transformers<4.58. Use fp32 or int8 for Pegasus.",
+}
+
+def check_backend(kind, backend):
+    """Raise ValueError if `kind` ('seq2seq' or 'encoder') cannot run on `backend`."""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend {backend!r}, expected one of {BACKENDS}")
+    if (kind, backend) in UNSUPPORTED:
+        raise ValueError(UNSUPPORTED[(kind, backend)])
+
+def backend_kind(kind, backend):
+    """Registry kind of `kind` ('seq2seq' or 'encoder') on `backend`."""
+    check_backend(kind, backend)
+    return kind if backend == 'fp32' else f"{kind}-{backend}"
+
+def _import_onnxruntime():
+    try:
+        import onnxruntime
+    except ImportError:
+        raise ImportError("The onnx backend needs ONNX Runtime (pip install -r requirements-onnx.txt)")
+    return onnxruntime
+
+def _artifact_path(name, kind, backend):
+    return os.path.join(cache_path(ARTIFACT_DIR), f"{re.sub(r'[^A-Za-z0-9_.-]+', '_', name)}-{kind}-{backend}")
+
+def _check_cpu(device, backend):
+    if str(device) != 'cpu':
+        raise ValueError(f"The {backend} backend runs on CPU only, got device {device!r}")
+
+def _model_class(kind):
+    from transformers import AutoModel, AutoModelForSeq2SeqLM
+    return AutoModelForSeq2SeqLM if kind == 'seq2seq' else AutoModel
+
+def quantize_int8(model):
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+def _quantized_linears(model):
+    return {name: module for name, module in model.named_modules()
+            if isinstance(module, torch.ao.nn.quantized.dynamic.Linear)}
+
+def save_int8(model, path):
+    """
+    Save a dynamically quantized model as plain tensors.
+
+    Packed int8 weights do not pickle cleanly, so each quantized Linear is
+    stored as its int8 values, quantization parameters and float bias.
+    """
+    linears = {}
+    for name, module in _quantized_linears(model).items():
+        weight, bias = module._weight_bias()
+        entry = {'int_repr': weight.int_repr(), 'bias': bias}
+        if weight.qscheme() in (torch.per_channel_affine, torch.per_channel_symmetric):
+            entry.update(scales=weight.q_per_channel_scales(), zero_points=weight.q_per_channel_zero_points(),
+                         axis=weight.q_per_channel_axis())
+        else:
+            entry.update(scale=weight.q_scale(), zero_point=weight.q_zero_point())
+        linears[name] = entry
+    tensors = {key: value for key, value in model.state_dict().items() if isinstance(value, torch.Tensor)}
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    torch.save({'tensors': tensors, 'linears': linears}, path + '.tmp')
+    os.replace(path + '.tmp', path)
+
+def load_int8(model, path):
+    """Quantize the freshly built float `model` and load the weights written by save_int8 into it."""
+    state = torch.load(path)
+    # Non-Linear weights (embeddings, layer norms) go in first; quantized Linears reject plain state dicts
+    model.load_state_dict(state['tensors'], strict=False)
+    model = quantize_int8(model)
+    modules = _quantized_linears(model)
+    for name, entry in state['linears'].items():
+        if 'axis' in entry:
+            weight = torch._make_per_channel_quantized_tensor(entry['int_repr'], entry['scales'], entry['zero_points'], entry['axis'])
+        else:
+            weight = torch._make_per_tensor_quantized_tensor(entry['int_repr'], entry['scale'], entry['zero_point'])
+        modules[name].set_weight_bias(weight, entry['bias'])
+    return model
+
+def _load_int8(kind, name, device, dtype):
+    """Dynamic int8 model; the quantized weights are saved once and later loaded without the fp32 checkpoint."""
+    from transformers import AutoConfig, AutoTokenizer, GenerationConfig
+    _check_cpu(device, 'int8')
+    tokenizer = AutoTokenizer.from_pretrained(name)
+    path = _artifact_path(name, kind, 'int8') + '.pt'
+    model_class = _model_class(kind)
+    if os.path.exists(path):
+        model = load_int8(model_class.from_config(AutoConfig.from_pretrained(name)).eval(), path)
+        if kind == 'seq2seq':
+            # from_config does not read the checkpoint's generation defaults
+            model.generation_config = GenerationConfig.from_pretrained(name)
+    else:
+        print(f"[Backend] Quantizing {name} ke int8 (sekali saja)...")
+        model = quantize_int8(model_class.from_pretrained(name).eval())
+        save_int8(model, path)
+    return tokenizer, model.eval()
+
+class OnnxEncoder:
+    """ONNX Runtime session that returns the hidden layer used for sentence embeddings."""
+
+    def __init__(self, path, config):
+        onnxruntime = _import_onnxruntime()
+        self.config = config
+        self.device = torch.device('cpu')
+        self.session = onnxruntime.InferenceSession(path, providers=['CPUExecutionProvider'])
+
+    def hidden_layer(self, input_ids, attention_mask):
+        outputs = self.session.run(None, {'input_ids': input_ids.numpy(), 'attention_mask': attention_mask.numpy()})
+        return torch.from_numpy(outputs[0])
+
+class _HiddenLayerModule(torch.nn.Module):
+    def __init__(self, model, layer):
+        super().__init__()
+        self.model = model
+        self.layer = layer
+
+    def forward(self, input_ids, attention_mask):
+        return self.model(input_ids=input_ids, attention_mask=attention_mask, output_hidden_states=True).hidden_states[self.layer]
+
+def _load_onnx_encoder(name, device, dtype):
+    from transformers import AutoConfig, AutoModel, AutoTokenizer
+    from extractive import HIDDEN_LAYER
+    _check_cpu(device, 'onnx')
+    _import_onnxruntime()  # Fail before the export, not after it
+    tokenizer = AutoTokenizer.from_pretrained(name)
+    # The exported graph returns only the embedding layer, so its index is part of the artifact name
+    path = _artifact_path(name, 'encoder', 'onnx') + f"-layer{HIDDEN_LAYER}.onnx"
+    if not os.path.exists(path):
+        print(f"[Backend] Export {name} ke ONNX (sekali saja)...")
+        os.makedirs(cache_path(ARTIFACT_DIR), exist_ok=True)
+        model = AutoModel.from_pretrained(name).eval()
+        sample = tokenizer(["export sample"], add_special_tokens=False, return_tensors='pt')
+        dynamic = {0: 'batch', 1: 'sequence'}
+        torch.onnx.export(_HiddenLayerModule(model, HIDDEN_LAYER), (sample['input_ids'], sample['attention_mask']),
+                          path + '.tmp', input_names=['input_ids', 'attention_mask'], output_names=['hidden'],
+                          dynamic_axes={'input_ids': dynamic, 'attention_mask': dynamic, 'hidden': dynamic},
+                          opset_version=17, dynamo=False)
+        os.replace(path + '.tmp', path)
+    return tokenizer, OnnxEncoder(path, AutoConfig.from_pretrained(name))
+
+def _load_onnx_seq2seq(name, device, dtype):
+    # Unreachable through backend_kind while ('seq2seq', 'onnx') is in UNSUPPORTED
+    from transformers import AutoTokenizer
+    try:
+        from optimum.onnxruntime import ORTModelForSeq2SeqLM
+    except ImportError:
+        raise ImportError("The Pegasus onnx export needs optimum (pip install optimum[onnxruntime]) "
+                          "with a transformers version it supports")
+    _check_cpu(device, 'onnx')
+    path = _artifact_path(name, 'seq2seq', 'onnx')
+    if not os.path.isdir(path):
+        print(f"[Backend] Export {name} ke ONNX dengan KV cache (sekali saja)...")
+        model = ORTModelForSeq2SeqLM.from_pretrained(name, export=True, use_cache=True)
+        model.save_pretrained(path + '.tmp')
+        AutoTokenizer.from_pretrained(name).save_pretrained(path + '.tmp')
+        os.replace(path + '.tmp', path)
+    return AutoTokenizer.from_pretrained(path), ORTModelForSeq2SeqLM.from_pretrained(path, use_cache=True)
+
+register_loader('seq2seq-int8', lambda name, device, dtype: _load_int8('seq2seq', name, device, dtype))
+register_loader('encoder-int8', lambda name, device, dtype: _load_int8('encoder', name, device, dtype))
+register_loader('seq2seq-onnx', _load_onnx_seq2seq)
+register_loader('encoder-onnx', _load_onnx_encoder)
+
+def rouge_delta_report(dataset, backends=BACKENDS, output_path=None):
+    """
+    Summarize `dataset` with Bertsum and Pegasus on every backend and report mean ROUGE F1 against fp32.
+
+    Caching is disabled so every backend really runs. Pairs in UNSUPPORTED are
+    skipped. Returns {(model, backend): {'seconds': ..., 'rouge-1': ..., ...}}.
+    """
+    from bertsum_summarization import bertsum_summarize
+    from pegasus_summarization import pegasus_summarize
+    from rouge_scorer import evaluate_rouge
+
+    summarizers = {'bertsum': (bertsum_summarize, 'encoder'), 'pegasus': (pegasus_summarize, 'seq2seq')}
+    references = [sample['references'] for sample in dataset]
+    results = {}
+    for model_name, (summarize, kind) in summarizers.items():
+        for backend in backends:
+            if (kind, backend) in UNSUPPORTED:
+                print(f"\n[Backend] {model_name} / {backend} dilewati: {UNSUPPORTED[(kind, backend)]}")
+                continue
+            print(f"\n[Backend] {model_name} / {backend}")
+            start = time.perf_counter()
+            summaries = summarize(dataset, use_cache=False, backend=backend)
+            seconds = time.perf_counter() - start
+            # Only one backend of a model is kept in memory at a time
+            release(kind=backend_kind(kind, backend))
+            scores = evaluate_rouge(summaries, references)
+            row = {'seconds': seconds}
+            for metric in scores[0]:
+                row[metric] = sum(s[metric]['f'] for s in scores) / len(scores)
+            results[(model_name, backend)] = row
+
+    metrics = [m for m in next(iter(results.values())) if m != 'seconds']
+    lines = [f"{'model':<8} {'backend':<7} {'time (s)':>9} " + ' '.join(f"{m + ' F1':>13} {'vs fp32':>8}" for m in metrics)]
+    for (model_name, backend), row in results.items():
+        base = results.get((model_name, 'fp32'), row)
+        cells = ' '.join(f"{row[m]:>13.4f} {row[m] - base[m]:>+8.4f}" for m in metrics)
+        lines.append(f"{model_name:<8} {backend:<7} {row['seconds']:>9.1f} {cells}")
+    report = '\n'.join(lines)
+    print('\n' + report)
+    if output_path is not None:
+        os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+        with open(output_path, 'w') as f:
+            f.write(report + '\n')
+    return results
+
+if __name__ == "__main__":
+    import argparse
+    import datetime
+    from load_data import load_multiple_datasets
+    from run_options import DUC_DEFAULTS
+
+    parser = argparse.ArgumentParser(description="Compare ROUGE and runtime of the inference backends on DUC2006")
+    parser.add_argument("--data-dir", default=DUC_DEFAULTS['data_dir'], help="Folder with the DUC20xx folders")
+    parser.add_argument("--samples", type=int, default=None, help="Only use the first N topics")
+    parser.add_argument("--backends", nargs='+', choices=BACKENDS, default=list(BACKENDS))
+    args = parser.parse_args()
+
+    dataset = list(load_multiple_datasets(args.data_dir)['DUC2006'])
+    if args.samples is not None:
+        dataset = dataset[:args.samples]
+    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    rouge_delta_report(dataset, args.backends, os.path.join('results', f'backend_report_{timestamp}.txt'))
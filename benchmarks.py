@@ -0,0 +1,288 @@
+"""Reproducible performance benchmarks for the summarization and scoring pipeline.
+
+Stages:
+
+- load.duc: parse every DUC folder from the raw files (no snapshot)
+- load.duc_snapshot: load the same folders from their Arrow snapshots
+- load.cnn: read rows of a CNN/DailyMail-style CSV through the row index
+- bertsum: bertsum_summarize with the summary cache off
+- pegasus: pegasus_summarize with the summary cache off
+- rouge: evaluate_rouge of lead-3 predictions against the references
+
+Inputs are the first `--samples` topics of DUC2006 and DUC2007, plus a
+synthetic set produced from a fixed seed. Every stage/input pair runs in its
+own spawned process with a fixed torch thread count, so peak RSS is measured
+per stage and earlier stages leave no warm state behind. Each pair gets one
+warm-up round and then `--repeats` timed rounds. The report gives items/sec
+(from the fastest round), per-call latency percentiles over all rounds and
+peak RSS, and is written as JSON. Compared against a stored baseline, any
+throughput, p95 or RSS regression beyond the tolerance makes the run exit
+with status 1. So does a missing baseline, unless `--save-baseline` is given.
+"""
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+BASELINE_PATH = os.path.join('benchmarks', 'baseline.json')
+STAGES = ('load.duc', 'load.duc_snapshot', 'load.cnn', 'bertsum', 'pegasus', 'rouge')
+INPUTS = ('duc2006', 'duc2007', 'synthetic')
+CALL_SIZE = 8  # Samples per summarizer call, the default Pegasus batch size
+TOLERANCE = 0.10  # Allowed relative throughput / p95 latency regression
+RSS_TOLERANCE = 0.20
+MIN_LATENCY_DELTA_MS = 5.0  # Smaller p95 changes are timer noise on millisecond-scale stages
+SYNTHETIC_SEED = 1234
+_WORDS = ("the of and to in a is that for on with as was by at from his her said it an be are have has "
+          "government officials report president market company year new people police court state city "
+          "study health water energy election minister attack trade prices workers school children").split()
+
+def synthetic_samples(n, seed=SYNTHETIC_SEED, sentences=30):
+    """`n` deterministic news-like samples with three reference summaries each."""
+    rng = random.Random(seed)
+
+    def sentence():
+        words = [rng.choice(_WORDS) for _ in range(rng.randint(8, 30))]
+        return ' '.join(words).capitalize() + '.'
+
+    samples = []
+    for _ in range(n):
+        article = [sentence() for _ in range(sentences)]
+        references = [' '.join(rng.sample(article, 4)) for _ in range(3)]
+        samples.append({'article': ' '.join(article), 'references': references})
+    return samples
+
+def write_synthetic_csv(path, n, seed=SYNTHETIC_SEED):
+    import csv
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['id', 'article', 'highlights'])
+        for i, sample in enumerate(synthetic_samples(n, seed, sentences=20)):
+            # Embedded newlines exercise the quote-aware row index
+            writer.writerow([f'synthetic-{i}', sample['article'].replace('. ', '.\n', 3), sample['references'][0]])
+    return path
+
+def _lead3(article):
+    from chunking import split_sentences
+    return ' '.join(split_sentences(article)[:3])
+
+def _input_samples(name, config):
+    if name == 'synthetic':
+        return synthetic_samples(config['samples'])
+    from load_data import load_multiple_datasets
+    dataset = load_multiple_datasets(config['data_dir'])[name.upper()]
+    return [dataset[i] for i in range(min(config['samples'], len(dataset)))]
+
+def _chunked_calls(fn, samples):
+    return [(lambda chunk=samples[i:i + CALL_SIZE]: fn(chunk), len(samples[i:i + CALL_SIZE]))
+            for i in range(0, len(samples), CALL_SIZE)]
+
+def _stage_calls(stage, input_name, config):
+    """Return [(callable, items processed)] for one stage/input pair, after any untimed setup."""
+    if stage in ('load.duc', 'load.duc_snapshot'):
+        from load_data import load_multiple_datasets
+        use_snapshot = stage == 'load.duc_snapshot'
+        # Count the samples and, for the snapshot stage, make sure the snapshots exist
+        n_items = sum(len(dataset) for dataset in load_multiple_datasets(config['data_dir']).values())
+        return [(lambda: load_multiple_datasets(config['data_dir'], use_snapshot=use_snapshot), n_items)]
+    if stage == 'load.cnn':
+        from cnn_inference import load_cnn_dailymail
+        from csv_index import load_csv_index
+        path = config['cnn_csv'] or write_synthetic_csv(os.path.join(config['work_dir'], 'synthetic_cnn.csv'), config['cnn_rows'])
+        n_rows = len(load_csv_index(path))
+        rng = random.Random(SYNTHETIC_SEED)
+        rows = sorted(rng.sample(range(n_rows), min(config['samples'], n_rows)))
+        return [(lambda: load_cnn_dailymail(path, config['samples']), config['samples']),
+                (lambda: load_cnn_dailymail(path, indices=rows), len(rows))]
+
+    samples = _input_samples(input_name, config)
+    if stage == 'bertsum':
+        from bertsum_summarization import bertsum_summarize
+        return _chunked_calls(lambda chunk: bertsum_summarize(chunk, use_cache=False), samples)
+    if stage == 'pegasus':
+        from pegasus_summarization import pegasus_summarize
+        return _chunked_calls(lambda chunk: pegasus_summarize(chunk, use_cache=False), samples)
+    if stage == 'rouge':
+        from rouge_scorer import evaluate_rouge
+        predictions = [_lead3(sample['article']) for sample in samples]
+        references = [sample['references'] for sample in samples]
+        return [(lambda: evaluate_rouge(predictions, references), len(samples))]
+    raise ValueError(f"Unknown stage {stage!r}, expected one of {STAGES}")
+
+def _stage_inputs(stage, inputs):
+    # Loading stages have a single, fixed input of their own
+    if stage.startswith('load.duc'):
+        return ['duc']
+    if stage == 'load.cnn':
+        return ['cnn_csv']
+    return list(inputs)
+
+def run_stage(stage, input_name, config):
+    """Time one stage/input pair in the current process and return its result dict."""
+    from inference_scheduler import configure_threads
+    configure_threads(config['threads'])
+    setup_start = time.perf_counter()
+    calls = _stage_calls(stage, input_name, config)
+    setup_seconds = time.perf_counter() - setup_start
+    for fn, _ in calls:
+        fn()
+    latencies = []
+    rounds = []
+    items = sum(n_items for _, n_items in calls)
+    for _ in range(config['repeats']):
+        round_start = time.perf_counter()
+        for fn, _ in calls:
+            call_start = time.perf_counter()
+            fn()
+            latencies.append(time.perf_counter() - call_start)
+        rounds.append(time.perf_counter() - round_start)
+    # Throughput of the fastest round: the least disturbed by other load on the machine
+    seconds = min(rounds)
+    p50, p95, p99 = np.percentile(np.array(latencies) * 1000, [50, 95, 99])
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 ** 2 if sys.platform == 'darwin' else 1024)
+    return {'stage': stage, 'input': input_name, 'items': items, 'calls': len(latencies),
+            'round_seconds': [round(r, 4) for r in rounds], 'setup_seconds': round(setup_seconds, 4),
+            'items_per_sec': round(items / seconds, 4) if seconds > 0 else None,
+            'p50_ms': round(p50, 3), 'p95_ms': round(p95, 3), 'p99_ms': round(p99, 3),
+            'peak_rss_mb': round(peak_rss, 1)}
+
+def _environment(config):
+    environment = {'python': platform.python_version(), 'platform': platform.platform(),
+                   'cpus': os.cpu_count(), 'threads': config['threads']}
+    try:
+        import torch
+        environment['torch'] = torch.__version__
+    except ImportError:
+        pass
+    try:
+        environment['commit'] = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                               text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        pass
+    return environment
+
+def run_benchmarks(stages=STAGES, inputs=INPUTS, config=None):
+    """Run every stage/input pair in a fresh spawned process; returns the report dict."""
+    results = []
+    context = multiprocessing.get_context('spawn')
+    for stage in stages:
+        for input_name in _stage_inputs(stage, inputs):
+            print(f"[Benchmark] {stage} / {input_name}...")
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                try:
+                    result = executor.submit(run_stage, stage, input_name, config).result()
+                except Exception as e:
+                    result = {'stage': stage, 'input': input_name, 'error': repr(e)}
+                    print(f"[Benchmark] {stage} / {input_name} GAGAL: {e!r}")
+            results.append(result)
+    return {'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'), 'config': config,
+            'environment': _environment(config), 'results': results}
+
+def compare(report, baseline, tolerance=TOLERANCE, rss_tolerance=RSS_TOLERANCE):
+    """Return a list of regression messages of `report` against `baseline` (empty when none)."""
+    previous = {(r['stage'], r['input']): r for r in baseline['results'] if 'error' not in r}
+    regressions = []
+    for result in report['results']:
+        key = (result['stage'], result['input'])
+        if 'error' in result:
+            regressions.append(f"{key[0]}/{key[1]}: gagal ({result['error']})")
+            continue
+        base = previous.get(key)
+        if base is None:
+            continue
+        checks = [('items_per_sec', -1, tolerance), ('p95_ms', 1, tolerance), ('peak_rss_mb', 1, rss_tolerance)]
+        for metric, direction, allowed in checks:
+            old, new = base.get(metric), result.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            result.setdefault('vs_baseline', {})[metric] = round(change, 4)
+            if metric == 'p95_ms' and new - old < MIN_LATENCY_DELTA_MS:
+                continue
+            if change * direction > allowed:
+                regressions.append(f"{key[0]}/{key[1]}: {metric} {old} -> {new} ({change:+.1%}, batas {allowed:.0%})")
+    return regressions
+
+def measured_rates(path=BASELINE_PATH, input_name='synthetic'):
+    """Items/sec per stage from a stored benchmark report, or {} when there is none."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            results = json.load(f)['results']
+    except (OSError, ValueError, KeyError):
+        return {}
+    return {r['stage']: r['items_per_sec'] for r in results
+            if r.get('input') == input_name and r.get('items_per_sec')}
+
+def format_report(report):
+    lines = [f"{'stage':<18} {'input':<10} {'items/s':>10} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'RSS MB':>8} {'vs base':>8}"]
+    for r in report['results']:
+        if 'error' in r:
+            lines.append(f"{r['stage']:<18} {r['input']:<10} ERROR {r['error']}")
+            continue
+        delta = r.get('vs_baseline', {}).get('items_per_sec')
+        delta = f"{delta:+.1%}" if delta is not None else '-'
+        lines.append(f"{r['stage']:<18} {r['input']:<10} {r['items_per_sec']:>10.2f} {r['p50_ms']:>10.1f} "
+                     f"{r['p95_ms']:>10.1f} {r['p99_ms']:>10.1f} {r['peak_rss_mb']:>8.0f} {delta:>8}")
+    return '\n'.join(lines)
+
+if __name__ == "__main__":
+    import argparse
+    import datetime
+
+    from cache_paths import cache_path
+    from run_options import DUC_DEFAULTS
+
+    parser = argparse.ArgumentParser(description="Benchmark loading, Bertsum, Pegasus and ROUGE scoring")
+    parser.add_argument("--stages", nargs='+', choices=STAGES, default=list(STAGES))
+    parser.add_argument("--inputs", nargs='+', choices=INPUTS, default=list(INPUTS))
+    parser.add_argument("--data-dir", default=DUC_DEFAULTS['data_dir'], help="Folder with DUC2006/DUC2007")
+    parser.add_argument("--cnn-csv", default=None, help="CSV for load.cnn (default: a generated synthetic file)")
+    parser.add_argument("--samples", type=int, default=16, help="Samples per input")
+    parser.add_argument("--repeats", type=int, default=3, help="Timed rounds after one warm-up round")
+    parser.add_argument("--threads", type=int, default=1, help="Torch threads in every stage process")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    parser.add_argument("--output", default=None, help="Report path (default: results/benchmark_<timestamp>.json)")
+    args = parser.parse_args()
+
+    config = {'data_dir': args.data_dir, 'cnn_csv': args.cnn_csv, 'cnn_rows': 2000, 'samples': args.samples,
+              'repeats': args.repeats, 'threads': args.threads, 'work_dir': cache_path('benchmark')}
+    report = run_benchmarks(args.stages, args.inputs, config)
+
+    regressions = []
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+    else:
+        regressions = [f"{r['stage']}/{r['input']}: gagal ({r['error']})" for r in report['results'] if 'error' in r]
+        if not args.save_baseline:
+            # Without a baseline nothing was compared, so the run must not look like a pass
+            regressions.append(f"belum ada baseline di {args.baseline}; simpan dulu dengan --save-baseline")
+    report['regressions'] = regressions
+    print('\n' + format_report(report))
+
+    output = args.output or os.path.join('results', f"benchmark_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n[Benchmark] Laporan disimpan di {output}")
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline) or '.', exist_ok=True)
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"[Benchmark] Baseline disimpan di {args.baseline}")
+    if regressions:
+        print("\n[Benchmark] REGRESI:")
+        for message in regressions:
+            print(f"  - {message}")
+        sys.exit(1)
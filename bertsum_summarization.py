@@ -1,30 +1,43 @@
-from summarizer import Summarizer
 from load_data import load_duc2006_data
-from rouge_metric import PyRouge
+from rouge_scorer import evaluate_rouge
+from model_registry import get_model
+from backends import backend_kind
+from resource_monitor import get_monitor
+from summary_cache import cached_summarize
+from extractive import EMBED_BATCH_SIZE, ExtractiveSummarizer
 
-def bertsum_summarize(dataset):
-    model = Summarizer('distilbert-base-uncased')
-    summaries = []
-    for idx, sample in enumerate(dataset):
-        print(f"[Bertsum] Memproses sample ke-{idx+1} dari {len(dataset)}...")
-        article = sample['article']
-        summary = model(article, ratio=0.3)  # Extract 30% of sentences
-        summaries.append(summary)
-    return summaries
+MODEL_NAME = 'distilbert-base-uncased'
+RATIO = 0.3  # Extract 30% of sentences
+STRATEGY = 'cluster'
 
-def evaluate_rouge(predictions, reference_lists):
-    # Initialize PyRouge for ROUGE1, ROUGE2, and ROUGE SU4
-    rouge = PyRouge(rouge_n=(1, 2), rouge_su=True, skip_gap=4, multi_ref_mode='best', alpha=0.5)
-    scores = []
-    for pred, references in zip(predictions, reference_lists):
-        if not references:
-            continue
-        # Evaluate with multiple references
-        hypotheses = [pred]
-        multi_references = [references]
-        score = rouge.evaluate(hypotheses, multi_references)
-        scores.append(score)
-    return scores
+def _extract_summaries(articles, device, dtype, ratio, strategy, backend, use_cache, batch_size, on_summary=None):
+    tokenizer, model = get_model(backend_kind('encoder', backend), MODEL_NAME, device, dtype)
+    # Quantized or exported encoders give slightly different vectors, so they get their own cache entries
+    encoder_name = f"{MODEL_NAME}:{dtype}" if backend == 'fp32' else f"{MODEL_NAME}:{backend}"
+    engine = ExtractiveSummarizer(tokenizer, model, encoder_name, use_cache=use_cache, batch_size=batch_size)
+    monitor = get_monitor()
+    print(f"[Bertsum] Memproses {len(articles)} sample (ratio={ratio}, strategy={strategy})...")
+    print(monitor.format_latest())
+    with monitor.stage('bertsum.summarize', samples=len(articles)):
+        return engine.summarize_many(articles, ratio, strategy, on_summary)
+
+def bertsum_summarize(dataset, device='cpu', dtype=None, use_cache=True, on_summary=None, ratio=RATIO, strategy=STRATEGY,
+                      backend='fp32', batch_size=EMBED_BATCH_SIZE):
+    """
+    Extractive summaries for every sample; `on_summary(index, summary)` is called as each one finishes.
+
+    Sentence embeddings are cached separately from the summaries, so a new
+    `ratio` or `strategy` ('cluster' or 'centroid') only re-runs the selection.
+    `backend` is one of backends.BACKENDS ('fp32', 'int8', 'onnx'). `batch_size`
+    is the number of sentences per encoder batch and does not change the output.
+    """
+    articles = [sample['article'] for sample in dataset]
+    if not use_cache:
+        return _extract_summaries(articles, device, dtype, ratio, strategy, backend, False, batch_size, on_summary)
+    params = {'ratio': ratio, 'strategy': strategy, 'engine': 'embedding-spacy', 'dtype': dtype, 'backend': backend}
+    return cached_summarize(MODEL_NAME, params, articles,
+                            lambda missing, callback: _extract_summaries(missing, device, dtype, ratio, strategy, backend, True, batch_size, callback),
+                            on_summary)
 
 if __name__ == "__main__":
     dataset = load_duc2006_data()
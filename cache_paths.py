@@ -0,0 +1,19 @@
+"""Root directory of the on-disk caches.
+
+Summaries, embeddings, reference indexes, DUC snapshots, CSV row indexes and
+backend artifacts all live under one directory, `cache/` by default. The root
+is read from the SUMMARY_CACHE_DIR environment variable at the moment a cache
+is opened, not at import time. So `set_cache_dir` made before the first cache
+access applies both to this process and to the worker processes it spawns
+later.
+"""
+import os
+
+CACHE_DIR_ENV = 'SUMMARY_CACHE_DIR'
+DEFAULT_CACHE_DIR = 'cache'
+
+def cache_path(*parts):
+    return os.path.join(os.environ.get(CACHE_DIR_ENV) or DEFAULT_CACHE_DIR, *parts)
+
+def set_cache_dir(path):
+    os.environ[CACHE_DIR_ENV] = path
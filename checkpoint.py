@@ -0,0 +1,153 @@
+"""Per-sample checkpointing for long evaluation runs.
+
+Every generated summary is appended to `<run_dir>/checkpoint.jsonl` as soon as
+it is produced. Lines are flushed immediately and fsync'ed in batches, so a
+crash or Ctrl-C loses at most the last few unsynced samples, and a torn last
+line is cut off before the file is appended to again. `--resume <run_dir>`
+reloads the file and skips samples that are already completed for each
+(dataset, model) pair. Each entry also keeps `finished_after`, the seconds from
+the start of its summarizer call until the sample was reported. Samples are
+batched and spread over replicas, so this is when the sample was done, not how
+long it took on its own. The run settings are stored in `run_config.json` so a
+resumed run processes exactly the same selection.
+"""
+import json
+import os
+import threading
+import time
+
+from tracing import span
+
+CHECKPOINT_FILE = 'checkpoint.jsonl'
+RUN_CONFIG_FILE = 'run_config.json'
+
+class CheckpointWriter:
+    def __init__(self, run_dir, fsync_every=16, fsync_interval=5.0):
+        self.run_dir = run_dir
+        self.path = os.path.join(run_dir, CHECKPOINT_FILE)
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self._completed = load_checkpoint(run_dir)
+        self._finish_times = load_checkpoint(run_dir, 'finished_after')
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._last_sync = time.monotonic()
+        os.makedirs(run_dir, exist_ok=True)
+        _drop_torn_tail(self.path)
+        self._file = open(self.path, 'a', encoding='utf-8')
+
+    def completed(self, dataset, model):
+        """Return {sample index: summary} of the samples already finished for (dataset, model)."""
+        return dict(self._completed.get((dataset, model), {}))
+
+    def finish_times(self, dataset, model):
+        """Return {sample index: seconds after the summarizer call started} of the samples that recorded one."""
+        return dict(self._finish_times.get((dataset, model), {}))
+
+    def record(self, dataset, model, index, summary, **extra):
+        entry = {'dataset': dataset, 'model': model, 'index': index, 'summary': summary}
+        entry.update(extra)
+        with self._lock:
+            self._file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            self._file.flush()
+            self._completed.setdefault((dataset, model), {})[index] = summary
+            if 'finished_after' in extra:
+                self._finish_times.setdefault((dataset, model), {})[index] = extra['finished_after']
+            self._pending += 1
+            if self._pending >= self.fsync_every or time.monotonic() - self._last_sync >= self.fsync_interval:
+                self._sync()
+
+    def _sync(self):
+        with span('checkpoint.fsync', entries=self._pending):
+            os.fsync(self._file.fileno())
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._sync()
+                self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+def _drop_torn_tail(path):
+    """Cut a partly written last line, so the next entry starts on a line of its own."""
+    if not os.path.exists(path):
+        return
+    with open(path, 'rb+') as f:
+        size = f.seek(0, os.SEEK_END)
+        if size == 0:
+            return
+        f.seek(size - 1)
+        if f.read(1) == b'\n':
+            return
+        # Walk back to the last complete line; entries are small, so this reads little
+        end = size
+        while end > 0:
+            start = max(end - 65536, 0)
+            f.seek(start)
+            newline = f.read(end - start).rfind(b'\n')
+            if newline >= 0:
+                end = start + newline + 1
+                break
+            end = start
+        f.truncate(end)
+
+def load_checkpoint(run_dir, field='summary'):
+    """Read `checkpoint.jsonl` into {(dataset, model): {index: entry[field]}}, ignoring a torn last line."""
+    completed = {}
+    path = os.path.join(run_dir, CHECKPOINT_FILE)
+    if not os.path.exists(path):
+        return completed
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if field in entry:
+                completed.setdefault((entry['dataset'], entry['model']), {})[entry['index']] = entry[field]
+    return completed
+
+def save_run_config(run_dir, config):
+    os.makedirs(run_dir, exist_ok=True)
+    with open(os.path.join(run_dir, RUN_CONFIG_FILE), 'w', encoding='utf-8') as f:
+        json.dump(config, f, indent=2)
+
+def load_run_config(run_dir):
+    with open(os.path.join(run_dir, RUN_CONFIG_FILE), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def summarize_with_checkpoint(checkpoint, dataset_name, model_name, dataset, summarize_fn, on_summary=None):
+    """
+    Run `summarize_fn(samples, on_summary=...)` only on samples not yet in the checkpoint.
+
+    Each new summary is recorded as soon as the summarizer reports it. The
+    optional `on_summary(index, summary)` sees every sample by dataset index:
+    restored ones first, then new ones as they finish. Returns the summaries of
+    all samples in dataset order.
+    """
+    done = checkpoint.completed(dataset_name, model_name)
+    pending = [i for i in range(len(dataset)) if i not in done]
+    if done:
+        print(f"[Resume] {dataset_name}/{model_name}: {len(dataset) - len(pending)} sample sudah selesai, sisa {len(pending)}")
+        if on_summary is not None:
+            for i in sorted(done):
+                if i < len(dataset):
+                    on_summary(i, done[i])
+    if pending:
+        start = time.perf_counter()
+
+        def record(local_index, summary):
+            checkpoint.record(dataset_name, model_name, pending[local_index], summary,
+                              finished_after=round(time.perf_counter() - start, 4))
+            if on_summary is not None:
+                on_summary(pending[local_index], summary)
+        summaries = summarize_fn([dataset[i] for i in pending], on_summary=record)
+        done.update(zip(pending, summaries))
+    return [done[i] for i in range(len(dataset))]
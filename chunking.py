@@ -0,0 +1,45 @@
+"""Sentence splitting and token-bounded chunking of long multi-document inputs.
+
+A DUC topic joins ~25 news stories into one string, far beyond the encoder
+limit of the summarization models. `token_chunks` splits such a text at
+sentence boundaries into pieces that fit a token budget, measured with the
+model's own tokenizer in a single batched call.
+"""
+import re
+
+# A sentence ends at . ! or ? (optionally followed by a closing quote) before whitespace
+_SENTENCE_END_RE = re.compile(r'(?<=[.!?])\s+|(?<=[.!?]["\'])\s+')
+
+def split_sentences(text):
+    return [sentence for sentence in _SENTENCE_END_RE.split(text.strip()) if sentence]
+
+def token_chunks(tokenizer, text, max_tokens):
+    """
+    Split `text` into chunks of whole sentences of at most `max_tokens` tokens each.
+
+    One token of the budget is kept for the end-of-sequence marker. A single
+    sentence longer than the budget is cut into token windows.
+    """
+    sentences = split_sentences(text)
+    if not sentences:
+        return []
+    budget = max_tokens - 1
+    encoded = tokenizer(sentences, add_special_tokens=False)['input_ids']
+
+    chunks = []
+    current = []
+    current_tokens = 0
+    for sentence, ids in zip(sentences, encoded):
+        if current and current_tokens + len(ids) > budget:
+            chunks.append(' '.join(current))
+            current = []
+            current_tokens = 0
+        if len(ids) > budget:
+            for start in range(0, len(ids), budget):
+                chunks.append(tokenizer.decode(ids[start:start + budget], skip_special_tokens=True))
+            continue
+        current.append(sentence)
+        current_tokens += len(ids)
+    if current:
+        chunks.append(' '.join(current))
+    return chunks
@@ -1,13 +1,28 @@
 import os
-import datetime
-import pandas as pd
-from bertsum_summarization import bertsum_summarize, evaluate_rouge as evaluate_rouge_bertsum
-from pegasus_summarization import pegasus_summarize, evaluate_rouge as evaluate_rouge_pegasus
+import csv
+import random
+import argparse
+import functools
+import tracing
+from model_registry import release
+from inference_scheduler import InferenceScheduler, model_spec
+from pipeline import PipelinedExecutor
+from benchmarks import measured_rates
+from cache_paths import set_cache_dir
+from resource_monitor import get_monitor
+from summary_cache import get_summary_cache
+from csv_index import load_csv_index
+from results_store import ResultsWriter
+from checkpoint import CheckpointWriter, summarize_with_checkpoint, save_run_config, load_run_config
+from rouge_scorer import ROUGE_WORKERS, ReferenceIndex, ParallelRougeEvaluator, average_f1, get_default_scorer, scores_by_sample
+from run_options import (CNN_DEFAULTS, RESUME_OVERRIDES, add_run_arguments, is_headless, load_config_file, options_from_args,
+                         resolve_options, result_dir_for, sample_range)
 from datasets import Dataset
 
-def check_available_files():
+csv.field_size_limit(10000000)  # Articles are long quoted fields
+
+def check_available_files(cnn_dir=CNN_DEFAULTS['data_dir']):
     """Check which CNN/DailyMail files are available (only existence, not count)"""
-    cnn_dir = '/workspaces/summary/cnn_dailymail'
     available_files = []
     
     if os.path.exists(cnn_dir):
@@ -21,50 +36,89 @@ def check_available_files():
     return available_files
 
 def get_file_sample_count(file_path):
-    """Get sample count from a specific file"""
+    """Get sample count from a specific file (exact, from the persisted row index; blank lines are not samples)"""
     try:
-        # Quick check: read just first line to get count
-        with open(file_path, 'r', encoding='utf-8') as f:
-            line_count = sum(1 for _ in f) - 1  # -1 for header
-        return line_count
+        return len(load_csv_index(file_path))
     except Exception as e:
         return f"Error: {str(e)}"
 
-def load_cnn_dailymail(file_path, n_samples=None):
+def iter_cnn_dailymail(file_path, n_samples=None, offset=0, stride=1):
+    """
+    Stream CNN/DailyMail samples from a CSV file without reading the whole file
+    
+    Rows are parsed one at a time with the csv module (articles may contain quoted
+    newlines), and reading stops as soon as `n_samples` rows have been yielded.
+    
+    Args:
+        file_path: Path to CSV file (test.csv, train.csv, or validation.csv)
+        n_samples: Maximum number of samples to yield (None = until end of file)
+        offset: Index of the first data row to yield
+        stride: Yield every `stride`-th row starting at `offset` (for sharding)
+    
+    Yields:
+        Dicts with 'id', 'article' and 'references' keys
+    """
+    if stride < 1:
+        raise ValueError(f"stride must be >= 1, got {stride}")
+    yielded = 0
+    with open(file_path, 'r', encoding='utf-8', newline='') as f:
+        for row_idx, row in enumerate(csv.DictReader(f)):
+            if n_samples is not None and yielded >= n_samples:
+                break
+            if row_idx < offset or (row_idx - offset) % stride:
+                continue
+            yield {
+                'id': row['id'],
+                'article': row['article'],
+                'references': [row['highlights']]  # Wrap in list for compatibility
+            }
+            yielded += 1
+
+@tracing.traced('load.cnn')
+def load_cnn_dailymail(file_path, n_samples=None, offset=0, stride=1, indices=None):
     """
     Load CNN/DailyMail dataset from CSV file
     
     Args:
         file_path: Path to CSV file (test.csv, train.csv, or validation.csv)
         n_samples: Number of samples to load (None = all)
+        offset: Index of the first data row to load
+        stride: Load every `stride`-th row starting at `offset`
+        indices: Explicit row ids to load (e.g. from `random_row_ids`); overrides offset/stride
     
     Returns:
         Dataset object compatible with summarization functions
     """
     print(f"\n📂 Loading CNN/DailyMail dataset from: {file_path}")
     
-    # Read CSV
-    df = pd.read_csv(file_path)
-    total_samples = len(df)
-    print(f"✅ Total samples in file: {total_samples:,}")
-    
-    # Limit samples if specified
-    if n_samples is not None and n_samples > 0:
-        df = df.head(n_samples)
-        print(f"🎯 Selected samples: {len(df):,}")
-    
-    # Convert to dataset format
-    data = []
-    for idx, row in df.iterrows():
-        data.append({
+    if n_samples is not None and n_samples <= 0:
+        n_samples = None
+    if indices is None and offset == 0:
+        # Reading from the start needs no index: stream and stop after n_samples
+        data = list(iter_cnn_dailymail(file_path, n_samples, offset, stride))
+        print(f"🎯 Selected samples: {len(data):,} (offset {offset}, stride {stride})")
+    else:
+        # Seek straight to the requested rows through the byte-offset index
+        row_index = load_csv_index(file_path)
+        if indices is None:
+            indices = range(offset, len(row_index), stride)
+        indices = list(indices)[:n_samples]
+        data = [{
             'id': row['id'],
             'article': row['article'],
             'references': [row['highlights']]  # Wrap in list for compatibility
-        })
+        } for row in row_index.rows(indices)]
+        print(f"🎯 Selected samples: {len(data):,} (dari index {len(row_index):,} baris)")
     
     dataset = Dataset.from_list(data)
     return dataset
 
+def random_row_ids(file_path, n_samples, seed=0):
+    """Pick `n_samples` distinct random row ids of a CSV file without scanning it (after the index exists)"""
+    total = len(load_csv_index(file_path))
+    rng = random.Random(seed)
+    return sorted(rng.sample(range(total), min(n_samples, total)))
+
 def print_sample_info(dataset, sample_idx=0):
     """Print information about a sample"""
     sample = dataset[sample_idx]
@@ -79,78 +133,22 @@ def print_sample_info(dataset, sample_idx=0):
     print(f"{sample['references'][0]}")
     print(f"{'='*80}\n")
 
-def save_results_cnn(dataset, model_name, summaries, scores, avg_scores, result_dir):
-    """Save CNN/DailyMail inference results"""
-    os.makedirs(result_dir, exist_ok=True)
-    
-    # Save summaries with article info
-    summary_file = os.path.join(result_dir, f'cnn_{model_name}_summaries.txt')
-    with open(summary_file, 'w', encoding='utf-8') as f:
-        f.write(f"CNN/DailyMail Inference Results - {model_name.upper()}\n")
-        f.write(f"{'='*80}\n")
-        f.write(f"Total Samples: {len(summaries)}\n")
-        f.write(f"Date: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-        f.write(f"{'='*80}\n\n")
-        
-        for i, summary in enumerate(summaries):
-            sample = dataset[i]
-            f.write(f"{'='*80}\n")
-            f.write(f"SAMPLE #{i+1}\n")
-            f.write(f"{'='*80}\n")
-            f.write(f"ID: {sample['id']}\n\n")
-            f.write(f"ORIGINAL ARTICLE:\n")
-            f.write(f"{sample['article']}\n\n")
-            f.write(f"{'-'*80}\n")
-            f.write(f"REFERENCE SUMMARY (Ground Truth):\n")
-            f.write(f"{sample['references'][0]}\n\n")
-            f.write(f"{'-'*80}\n")
-            f.write(f"GENERATED SUMMARY ({model_name.upper()}):\n")
-            f.write(f"{summary}\n\n")
-            if i < len(scores):
-                f.write(f"ROUGE SCORES:\n")
-                f.write(f"  ROUGE-1: {scores[i]['rouge1'].fmeasure:.4f}\n")
-                f.write(f"  ROUGE-2: {scores[i]['rouge2'].fmeasure:.4f}\n")
-                f.write(f"  ROUGE-L: {scores[i]['rougeLsum'].fmeasure:.4f}\n")
-            f.write(f"\n\n")
-    
-    # Save scores summary
-    scores_file = os.path.join(result_dir, f'cnn_{model_name}_scores.txt')
-    with open(scores_file, 'w', encoding='utf-8') as f:
-        f.write(f"CNN/DailyMail ROUGE Scores - {model_name.upper()}\n")
-        f.write(f"{'='*80}\n")
-        f.write(f"Total Samples: {len(scores)}\n")
-        f.write(f"Date: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-        f.write(f"{'='*80}\n\n")
-        f.write(f"AVERAGE SCORES:\n")
-        f.write(f"  ROUGE-1: {avg_scores['rouge1']:.4f}\n")
-        f.write(f"  ROUGE-2: {avg_scores['rouge2']:.4f}\n")
-        f.write(f"  ROUGE-L: {avg_scores['rougeLsum']:.4f}\n")
-        f.write(f"\n{'='*80}\n\n")
-        f.write(f"INDIVIDUAL SCORES:\n\n")
-        for i, score in enumerate(scores):
-            f.write(f"Sample #{i+1}:\n")
-            f.write(f"  ROUGE-1: {score['rouge1'].fmeasure:.4f}\n")
-            f.write(f"  ROUGE-2: {score['rouge2'].fmeasure:.4f}\n")
-            f.write(f"  ROUGE-L: {score['rougeLsum'].fmeasure:.4f}\n")
-            f.write(f"\n")
-    
-    print(f"✅ Results saved to: {result_dir}")
-    print(f"   - Summaries: {summary_file}")
-    print(f"   - Scores: {scores_file}")
+def print_average_scores(model_name, scores):
+    """Print the average F1 of every metric (ROUGE-1/2/SU4/L/Lsum) of a model's per-sample scores"""
+    print(f"\n📊 {model_name.upper()} AVERAGE SCORES:")
+    for metric, value in average_f1(scores).items():
+        print(f"   {metric.upper()}: {value:.4f}")
 
-def main():
-    print("\n" + "="*80)
-    print("🚀 CNN/DAILYMAIL TEXT SUMMARIZATION INFERENCE")
-    print("="*80)
-    
+def prompt_run_options(cnn_dir=CNN_DEFAULTS['data_dir']):
+    """Ask for dataset file, sample count and model as run options ('split', 'samples', 'models'). Returns None if no dataset file exists."""
     # Check available files first (only existence)
     print("\n📋 CHECKING AVAILABLE DATASET FILES:")
-    available_files = check_available_files()
+    available_files = check_available_files(cnn_dir)
     
     if not available_files:
-        print("❌ No CNN/DailyMail files found in /workspaces/summary/cnn_dailymail/")
+        print(f"❌ No CNN/DailyMail files found in {cnn_dir}/")
         print("   Please ensure you have the dataset files.")
-        return
+        return None
     
     print("✅ Available files:")
     for file in available_files:
@@ -181,15 +179,21 @@ def main():
     dataset_choice = input("\nPilih dataset (1/2/3) [default: 1]: ").strip()
     
     dataset_file = file_options.get(dataset_choice, file_options.get('1', available_files[0]))
-    file_path = f'/workspaces/summary/cnn_dailymail/{dataset_file}'
     
     # Select number of samples
     print(f"\n🎯 PILIH JUMLAH SAMPEL:")
     print("Berapa artikel yang ingin di-inference?")
-    print("  - 1 sample: ~1-2 menit (testing cepat)")
-    print("  - 5 samples: ~5-10 menit")
-    print("  - 10 samples: ~10-20 menit")
-    print("  - 50+ samples: lebih lama (tergantung resource)")
+    rates = measured_rates()
+    if rates.get('bertsum') and rates.get('pegasus'):
+        # Measured on this machine by benchmarks.py --save-baseline
+        per_sample = 1 / rates['bertsum'] + 1 / rates['pegasus']
+        for n in (1, 5, 10, 50):
+            print(f"  - {n} sample: ~{n * per_sample / 60:.1f} menit (kedua model, hasil benchmark)")
+    else:
+        print("  - 1 sample: ~1-2 menit (testing cepat)")
+        print("  - 5 samples: ~5-10 menit")
+        print("  - 10 samples: ~10-20 menit")
+        print("  - 50+ samples: lebih lama (tergantung resource)")
     
     try:
         n_samples = int(input("\nMasukkan jumlah sampel [default: 1]: ").strip() or "1")
@@ -214,33 +218,93 @@ def main():
         print("⚠️  Input tidak valid, menggunakan default: 3 (keduanya)")
         model_choice = '3'
     
+    models = {'1': ['bertsum'], '2': ['pegasus'], '3': ['bertsum', 'pegasus']}[model_choice]
+    return {'split': os.path.splitext(dataset_file)[0], 'samples': n_samples, 'models': models}
+
+def main(options=None, resume_dir=None, overrides=None):
+    """
+    Summarize a CNN/DailyMail split.
+
+    Args:
+        options: Resolved run options (see run_options.CNN_DEFAULTS); runs headless
+            into a deterministic folder. None asks through the interactive menu.
+        resume_dir: Continue this run folder with its saved options
+        overrides: Options applied on top of the menu answers or, when resuming,
+            on top of the saved options (e.g. workers and threads)
+    """
+    print("\n" + "="*80)
+    print("🚀 CNN/DAILYMAIL TEXT SUMMARIZATION INFERENCE")
+    print("="*80)
+    
+    if resume_dir:
+        # Reuse the file, sample count and model choice of the interrupted run
+        options = resolve_options(CNN_DEFAULTS, load_run_config(resume_dir), overrides)
+        result_dir = resume_dir
+        print(f"\n🔁 Melanjutkan run di: {resume_dir}")
+    elif options is None:
+        menu_defaults = resolve_options(CNN_DEFAULTS, overrides)
+        prompted = prompt_run_options(menu_defaults['data_dir'])
+        if prompted is None:
+            return
+        options = resolve_options(CNN_DEFAULTS, overrides, prompted)
+        result_dir = result_dir_for(options, headless=False)
+    else:
+        result_dir = result_dir_for(options, headless=True)
+    # Caches of this process and of the spawned replicas live under one root
+    set_cache_dir(options['cache_dir'])
+    if options['trace'] or options['profile']:
+        tracing.enable(options['profile'], options['profile_stages'])
+    dataset_file = f"{options['split']}.csv"
+    file_path = os.path.join(options['data_dir'], dataset_file)
+    models = options['models']
+    model_choice = {('bertsum',): '1', ('pegasus',): '2'}.get(tuple(models), '3')
+    sequential = options['sequential']
+    backend = options['backend']
+    
     # NOW check file count and load data after all inputs are collected
     print(f"\n⏳ CHECKING FILE AND LOADING DATA...")
     
-    # Get actual sample count
-    total_samples = get_file_sample_count(file_path)
-    if isinstance(total_samples, str):  # Error
-        print(f"❌ Error reading file: {total_samples}")
+    if options['start'] > 0:
+        # Rows after --start are fetched through the byte-offset index, which also gives the exact count
+        total_samples = get_file_sample_count(file_path)
+        if isinstance(total_samples, str):  # Error
+            print(f"❌ Error reading file: {total_samples}")
+            return
+        print(f"📊 File {dataset_file} contains: {total_samples:,} samples")
+        n_samples = len(sample_range(total_samples, options))
+    else:
+        # From row 0 the file is streamed and reading stops after --samples rows, so no full index scan
+        n_samples = options['samples']
+    if n_samples is not None and n_samples <= 0:
+        print("❌ Tidak ada sampel pada rentang yang dipilih")
         return
     
-    print(f"📊 File {dataset_file} contains: {total_samples:,} samples")
+    try:
+        dataset = load_cnn_dailymail(file_path, n_samples, offset=options['start'], stride=options['stride'])
+    except (OSError, csv.Error) as e:
+        print(f"❌ Error reading file: {e}")
+        return
     
     # Adjust n_samples if user requested more than available
-    if n_samples > total_samples:
-        print(f"⚠️  Requested {n_samples} samples but file only has {total_samples} samples")
-        print(f"   Using all available samples: {total_samples}")
-        n_samples = total_samples
-    
-    dataset = load_cnn_dailymail(file_path, n_samples)
+    if options['samples'] is not None and options['samples'] > len(dataset):
+        print(f"⚠️  Requested {options['samples']} samples but file only has {len(dataset)} samples from row {options['start']}")
+        print(f"   Using all available samples: {len(dataset)}")
+    if len(dataset) == 0:
+        print("❌ Tidak ada sampel pada rentang yang dipilih")
+        return
     
     # Show sample info
     if len(dataset) > 0:
         print_sample_info(dataset, 0)
     
     # Create result directory
-    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-    result_dir = os.path.join('results_cnn', timestamp)
-    os.makedirs(result_dir, exist_ok=True)
+    if not resume_dir:
+        save_run_config(result_dir, options)
+    
+    # Every finished summary is appended to checkpoint.jsonl so the run can be resumed
+    checkpoint = CheckpointWriter(result_dir)
+    # Per-sample summaries, P/R/F and timings go to one columnar store; articles are referenced by id
+    results_writer = ResultsWriter(result_dir, options['output_format'])
     
     print(f"\n💾 Results akan disimpan di: {result_dir}")
     print(f"📊 Total samples yang akan diproses: {len(dataset)}")
@@ -251,8 +315,31 @@ def main():
     }
     print(f"🤖 Model yang dipilih: {model_display.get(model_choice, 'BertSum + Pegasus')}\n")
     
-    # Prepare references
+    # Load the selected models once before inference starts
+    model_specs = {
+        '1': [model_spec('bertsum', backend)],
+        '2': [model_spec('pegasus', backend)],
+        '3': [model_spec('bertsum', backend), model_spec('pegasus', backend)]
+    }
+    monitor = get_monitor(interval=options['monitor_interval']).start()
+    with monitor.stage('warm_up'):
+        if model_choice == '3' and not sequential:
+            # Both models run at the same time, each on its own share of the cores
+            scheduler = PipelinedExecutor(('bertsum', 'pegasus'), workers=options['workers'], threads_per_worker=options['threads'])
+            scheduler.warm_up({'bertsum': [model_spec('bertsum', backend)], 'pegasus': [model_spec('pegasus', backend)]})
+        else:
+            # K model replicas, each pinned to its own cores with a fixed torch thread count
+            scheduler = InferenceScheduler(workers=options['workers'], threads_per_worker=options['threads'])
+            scheduler.warm_up(model_specs[model_choice])
+    summarize_fns = {
+        'bertsum': scheduler.summarize_fn('bertsum', backend=backend, batch_size=options['bertsum_batch_size']),
+        'pegasus': scheduler.summarize_fn('pegasus', backend=backend, batch_size=options['pegasus_batch_size'])
+    }
+    
+    # Prepare references (indexed once, shared by both models)
     references = [sample['references'] for sample in dataset]
+    reference_index = ReferenceIndex.build(get_default_scorer(), references)
+    rouge_evaluator = ParallelRougeEvaluator(workers=ROUGE_WORKERS)
     
     # Run inference based on choice
     if model_choice == '1':
@@ -261,21 +348,14 @@ def main():
         print(f"🔵 RUNNING BERTSUM (EXTRACTIVE) SUMMARIZATION")
         print(f"{'='*80}")
         
-        bertsum_summaries = bertsum_summarize(dataset)
-        bertsum_scores = evaluate_rouge_bertsum(bertsum_summaries, references)
+        bertsum_summaries = summarize_with_checkpoint(checkpoint, 'cnn', 'bertsum', dataset, summarize_fns['bertsum'])
+        with monitor.stage('rouge', model='bertsum'):
+            bertsum_scores = rouge_evaluator.evaluate(bertsum_summaries, references, reference_index)
         
-        bertsum_avg = {
-            'rouge1': sum(s['rouge1'].fmeasure for s in bertsum_scores) / len(bertsum_scores),
-            'rouge2': sum(s['rouge2'].fmeasure for s in bertsum_scores) / len(bertsum_scores),
-            'rougeLsum': sum(s['rougeLsum'].fmeasure for s in bertsum_scores) / len(bertsum_scores)
-        }
+        print_average_scores('bertsum', bertsum_scores)
         
-        print(f"\n📊 BERTSUM AVERAGE SCORES:")
-        print(f"   ROUGE-1: {bertsum_avg['rouge1']:.4f}")
-        print(f"   ROUGE-2: {bertsum_avg['rouge2']:.4f}")
-        print(f"   ROUGE-L: {bertsum_avg['rougeLsum']:.4f}")
-        
-        save_results_cnn(dataset, 'bertsum', bertsum_summaries, bertsum_scores, bertsum_avg, result_dir)
+        results_writer.write('cnn', 'bertsum', dataset, bertsum_summaries, scores_by_sample(bertsum_scores, reference_index),
+                             checkpoint.finish_times('cnn', 'bertsum'))
         
     elif model_choice == '2':
         # Run Pegasus only
@@ -283,63 +363,64 @@ def main():
         print(f"🟢 RUNNING PEGASUS (ABSTRACTIVE) SUMMARIZATION")
         print(f"{'='*80}")
         
-        pegasus_summaries = pegasus_summarize(dataset)
-        pegasus_scores = evaluate_rouge_pegasus(pegasus_summaries, references)
-        
-        pegasus_avg = {
-            'rouge1': sum(s['rouge1'].fmeasure for s in pegasus_scores) / len(pegasus_scores),
-            'rouge2': sum(s['rouge2'].fmeasure for s in pegasus_scores) / len(pegasus_scores),
-            'rougeLsum': sum(s['rougeLsum'].fmeasure for s in pegasus_scores) / len(pegasus_scores)
-        }
+        pegasus_summaries = summarize_with_checkpoint(checkpoint, 'cnn', 'pegasus', dataset, summarize_fns['pegasus'])
+        with monitor.stage('rouge', model='pegasus'):
+            pegasus_scores = rouge_evaluator.evaluate(pegasus_summaries, references, reference_index)
         
-        print(f"\n📊 PEGASUS AVERAGE SCORES:")
-        print(f"   ROUGE-1: {pegasus_avg['rouge1']:.4f}")
-        print(f"   ROUGE-2: {pegasus_avg['rouge2']:.4f}")
-        print(f"   ROUGE-L: {pegasus_avg['rougeLsum']:.4f}")
+        print_average_scores('pegasus', pegasus_scores)
         
-        save_results_cnn(dataset, 'pegasus', pegasus_summaries, pegasus_scores, pegasus_avg, result_dir)
+        results_writer.write('cnn', 'pegasus', dataset, pegasus_summaries, scores_by_sample(pegasus_scores, reference_index),
+                             checkpoint.finish_times('cnn', 'pegasus'))
         
     else:  # model_choice == '3'
         # Run both models
+        if not sequential:
+            print(f"\n{'='*80}")
+            print(f"🔵🟢 RUNNING BERTSUM + PEGASUS CONCURRENTLY")
+            print(f"{'='*80}")
+            results = scheduler.run({
+                model: functools.partial(summarize_with_checkpoint, checkpoint, 'cnn', model, dataset, summarize_fns[model])
+                for model in ('bertsum', 'pegasus')
+            }, reference_index)
+            bertsum_summaries, bertsum_scores = results['bertsum']
+            pegasus_summaries, pegasus_scores = results['pegasus']
+        
         print(f"\n{'='*80}")
         print(f"🔵 RUNNING BERTSUM (EXTRACTIVE) SUMMARIZATION")
         print(f"{'='*80}")
         
-        bertsum_summaries = bertsum_summarize(dataset)
-        bertsum_scores = evaluate_rouge_bertsum(bertsum_summaries, references)
+        if sequential:
+            bertsum_summaries = summarize_with_checkpoint(checkpoint, 'cnn', 'bertsum', dataset, summarize_fns['bertsum'])
+            with monitor.stage('rouge', model='bertsum'):
+                bertsum_scores = rouge_evaluator.evaluate(bertsum_summaries, references, reference_index)
         
-        bertsum_avg = {
-            'rouge1': sum(s['rouge1'].fmeasure for s in bertsum_scores) / len(bertsum_scores),
-            'rouge2': sum(s['rouge2'].fmeasure for s in bertsum_scores) / len(bertsum_scores),
-            'rougeLsum': sum(s['rougeLsum'].fmeasure for s in bertsum_scores) / len(bertsum_scores)
-        }
+        print_average_scores('bertsum', bertsum_scores)
         
-        print(f"\n📊 BERTSUM AVERAGE SCORES:")
-        print(f"   ROUGE-1: {bertsum_avg['rouge1']:.4f}")
-        print(f"   ROUGE-2: {bertsum_avg['rouge2']:.4f}")
-        print(f"   ROUGE-L: {bertsum_avg['rougeLsum']:.4f}")
-        
-        save_results_cnn(dataset, 'bertsum', bertsum_summaries, bertsum_scores, bertsum_avg, result_dir)
+        results_writer.write('cnn', 'bertsum', dataset, bertsum_summaries, scores_by_sample(bertsum_scores, reference_index),
+                             checkpoint.finish_times('cnn', 'bertsum'))
         
         print(f"\n{'='*80}")
         print(f"🟢 RUNNING PEGASUS (ABSTRACTIVE) SUMMARIZATION")
         print(f"{'='*80}")
         
-        pegasus_summaries = pegasus_summarize(dataset)
-        pegasus_scores = evaluate_rouge_pegasus(pegasus_summaries, references)
-        
-        pegasus_avg = {
-            'rouge1': sum(s['rouge1'].fmeasure for s in pegasus_scores) / len(pegasus_scores),
-            'rouge2': sum(s['rouge2'].fmeasure for s in pegasus_scores) / len(pegasus_scores),
-            'rougeLsum': sum(s['rougeLsum'].fmeasure for s in pegasus_scores) / len(pegasus_scores)
-        }
+        if sequential:
+            pegasus_summaries = summarize_with_checkpoint(checkpoint, 'cnn', 'pegasus', dataset, summarize_fns['pegasus'])
+            with monitor.stage('rouge', model='pegasus'):
+                pegasus_scores = rouge_evaluator.evaluate(pegasus_summaries, references, reference_index)
         
-        print(f"\n📊 PEGASUS AVERAGE SCORES:")
-        print(f"   ROUGE-1: {pegasus_avg['rouge1']:.4f}")
-        print(f"   ROUGE-2: {pegasus_avg['rouge2']:.4f}")
-        print(f"   ROUGE-L: {pegasus_avg['rougeLsum']:.4f}")
+        print_average_scores('pegasus', pegasus_scores)
         
-        save_results_cnn(dataset, 'pegasus', pegasus_summaries, pegasus_scores, pegasus_avg, result_dir)
+        results_writer.write('cnn', 'pegasus', dataset, pegasus_summaries, scores_by_sample(pegasus_scores, reference_index),
+                             checkpoint.finish_times('cnn', 'pegasus'))
+    
+    release()
+    scheduler.close()
+    rouge_evaluator.close()
+    checkpoint.close()
+    results_writer.close()
+    monitor.stop()
+    monitor.save(os.path.join(result_dir, 'resource_timeline.json'))
+    tracing.save(result_dir, options['trace'] or 'chrome')
     
     # Final summary
     print(f"\n{'='*80}")
@@ -347,7 +428,20 @@ def main():
     print(f"{'='*80}")
     print(f"📁 Hasil tersimpan di: {result_dir}")
     print(f"📝 Total samples diproses: {len(dataset)}")
+    print(get_summary_cache().format_stats())
     print(f"{'='*80}\n")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="CNN/DailyMail summarization inference")
+    parser.add_argument("--resume", metavar="RUN_DIR", help="Continue an interrupted run in results_cnn/<run>, skipping finished samples")
+    add_run_arguments(parser, CNN_DEFAULTS)
+    args = parser.parse_args()
+    cli_options = options_from_args(args, CNN_DEFAULTS)
+    if args.resume:
+        # Only throughput and tracing settings may change for a resumed run
+        main(resume_dir=args.resume, overrides={key: cli_options[key] for key in RESUME_OVERRIDES if key in cli_options})
+    elif is_headless(args, cli_options):
+        config = load_config_file(args.config, 'cnn') if args.config else None
+        main(resolve_options(CNN_DEFAULTS, config, cli_options))
+    else:
+        main(overrides=cli_options)
@@ -1,26 +1,15 @@
 import os
 import csv
-import re
+from duc_parser import parse_file, parse_files, read_text
 
 def extract_text_from_doc(file_path):
-    """Membaca file, mengekstrak teks dari dalam tag <TEXT>, dan membersihkan tag HTML."""
+    """Membaca file dan mengembalikan teks bersih dari dalam tag <TEXT>."""
     try:
-        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-            content = f.read()
+        return parse_file(file_path).text
     except Exception as e:
         print(f"Error reading file {file_path}: {e}")
         return ""
 
-    # Ekstrak konten di antara <TEXT> dan </TEXT>
-    match = re.search(r'<TEXT>(.*?)</TEXT>', content, re.DOTALL)
-    if not match:
-        return ""
-    text = match.group(1)
-    # Hapus semua tag HTML/XML (seperti <P>) dan ganti dengan spasi
-    cleaned_text = re.sub(r'<[^>]+>', ' ', text)
-    # Ganti beberapa spasi/newline menjadi satu spasi dan rapikan
-    return ' '.join(cleaned_text.split())
-
 def get_folder_name_duc2006(topic_num):
     letter = chr(64 + ((topic_num - 1) % 9) + 1)
     folder = "D06{:02d}{}".format(topic_num, letter)
@@ -38,11 +27,9 @@ def get_content_for_topic(dataset_path, topic_num, dataset='DUC2006'):
     elif dataset == 'DUC2007':
         folder = get_folder_name_duc2007(topic_num)
     folder_path = os.path.join(dataset_path, 'raw_data', folder)
-    texts = []
-    for file_name in os.listdir(folder_path):
-        file_path = os.path.join(folder_path, file_name)
-        texts.append(extract_text_from_doc(file_path))
-    return ' '.join(texts)
+    file_paths = [os.path.join(folder_path, file_name) for file_name in os.listdir(folder_path)]
+    # Semua dokumen dalam satu topik diparse paralel
+    return ' '.join(doc.text for doc in parse_files(file_paths))
 
 def create_csv_for_dataset(dataset_path, output_file, dataset='DUC2006'):
     num_topics = 50 if dataset == 'DUC2006' else 45
@@ -57,8 +44,7 @@ def create_csv_for_dataset(dataset_path, output_file, dataset='DUC2006'):
             for file_name in os.listdir(summary_dir):
                 if file_name.startswith('{}{}_'.format(topic_prefix, topic_num)) and file_name.endswith('.txt'):
                     summary_path = os.path.join(summary_dir, file_name)
-                    with open(summary_path, 'r', encoding='utf-8', errors='ignore') as f:
-                        summaries.append(f.read().strip())
+                    summaries.append(read_text(summary_path).strip())
             combined_summary = ' '.join(summaries)
             writer.writerow(['{}{}'.format(topic_prefix, topic_num), content, combined_summary])
 
@@ -0,0 +1,150 @@
+"""Byte-offset index for large CSV files with quoted multi-line fields.
+
+The index stores the byte offset where each record starts, so the record count
+is known without reading the file and any row can be fetched with one seek.
+It is built once with a quote-aware NumPy scan (a newline ends a record only
+outside double quotes), saved next to the CSV as `<file>.idx.npz` and rebuilt
+whenever the CSV's size or mtime changes.
+"""
+import csv
+import hashlib
+import io
+import os
+
+import numpy as np
+
+from cache_paths import cache_path
+
+INDEX_CACHE_DIR = 'csv_index'  # Under the cache root, see cache_paths
+INDEX_VERSION = 2  # 2: blank lines are no longer counted as records
+_SCAN_CHUNK = 8 * 1024 ** 2
+_QUOTE = ord('"')
+_NEWLINE = ord('\n')
+
+csv.field_size_limit(10000000)  # Articles are long quoted fields
+
+def scan_record_offsets(file_path):
+    """
+    Return the start offset of every record (header included) plus the file size as end sentinel.
+
+    Blank lines are not records, as with csv.reader; each one is folded into
+    the span of the record before it.
+    """
+    offsets = [np.zeros(1, dtype=np.int64)]
+    in_quotes = 0
+    position = 0
+    with open(file_path, 'rb') as f:
+        while True:
+            chunk = f.read(_SCAN_CHUNK)
+            if not chunk:
+                break
+            data = np.frombuffer(chunk, dtype=np.uint8)
+            # Quote parity before each byte; "" escapes toggle twice and cancel out.
+            # uint8 cumsum wraps at 256, which keeps the parity intact.
+            parity = (np.cumsum(data == _QUOTE, dtype=np.uint8) + in_quotes) & 1
+            ends = np.flatnonzero((data == _NEWLINE) & (parity == 0))
+            offsets.append(ends.astype(np.int64) + position + 1)
+            in_quotes = int(parity[-1])
+            position += len(chunk)
+    offsets = np.concatenate(offsets)
+    # A trailing newline does not start another record
+    if offsets[-1] != position:
+        offsets = np.append(offsets, position)
+    return _drop_blank_records(file_path, offsets)
+
+def _drop_blank_records(file_path, offsets):
+    # Only records of at most two bytes can be '\n' or '\r\n', so just those few are read back
+    short = np.flatnonzero(np.diff(offsets) <= 2)
+    short = short[short > 0]
+    if not len(short):
+        return offsets
+    blank = []
+    with open(file_path, 'rb') as f:
+        for i in short.tolist():
+            f.seek(int(offsets[i]))
+            if f.read(int(offsets[i + 1] - offsets[i])) in (b'\n', b'\r\n'):
+                blank.append(i)
+    return np.delete(offsets, blank)
+
+def _index_path(file_path):
+    return file_path + '.idx.npz'
+
+def _fallback_index_path(file_path):
+    digest = hashlib.sha256(os.path.abspath(file_path).encode('utf-8')).hexdigest()[:16]
+    return os.path.join(cache_path(INDEX_CACHE_DIR), f"{os.path.basename(file_path)}_{digest}.idx.npz")
+
+class CsvRowIndex:
+    def __init__(self, file_path, offsets):
+        self.file_path = file_path
+        self.offsets = offsets
+        self.header = next(csv.reader(io.StringIO(self._read_span(0, 1))))
+
+    def __len__(self):
+        # offsets holds the header start, one start per data row and the end sentinel
+        return len(self.offsets) - 2
+
+    def _read_span(self, first, last):
+        start, end = int(self.offsets[first]), int(self.offsets[last])
+        with open(self.file_path, 'rb') as f:
+            f.seek(start)
+            return f.read(end - start).decode('utf-8')
+
+    def row(self, row_id):
+        """Return data row `row_id` (0-based, header excluded) as a dict."""
+        if not 0 <= row_id < len(self):
+            raise IndexError(f"Row {row_id} out of range for {len(self)} rows")
+        values = next(csv.reader(io.StringIO(self._read_span(row_id + 1, row_id + 2))))
+        return dict(zip(self.header, values))
+
+    def rows(self, row_ids):
+        """Yield the given data rows in the order requested."""
+        with open(self.file_path, 'rb') as f:
+            for row_id in row_ids:
+                if not 0 <= row_id < len(self):
+                    raise IndexError(f"Row {row_id} out of range for {len(self)} rows")
+                start, end = int(self.offsets[row_id + 1]), int(self.offsets[row_id + 2])
+                f.seek(start)
+                values = next(csv.reader(io.StringIO(f.read(end - start).decode('utf-8'))))
+                yield dict(zip(self.header, values))
+
+def _load_saved(path, stat):
+    if not os.path.exists(path):
+        return None
+    try:
+        with np.load(path) as data:
+            if (int(data['version']) == INDEX_VERSION and int(data['size']) == stat.st_size
+                    and int(data['mtime_ns']) == stat.st_mtime_ns):
+                return data['offsets']
+    except (OSError, ValueError, KeyError):
+        pass
+    return None
+
+def _save(path, offsets, stat):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = path + '.tmp.npz'
+    np.savez(tmp_path, offsets=offsets, size=np.int64(stat.st_size), mtime_ns=np.int64(stat.st_mtime_ns),
+             version=np.int64(INDEX_VERSION))
+    os.replace(tmp_path, path)
+
+def load_csv_index(file_path):
+    """
+    Return the CsvRowIndex of `file_path`, building and persisting it if missing or stale.
+
+    The sidecar lives next to the CSV; if that directory is read-only the index
+    is stored under cache/csv_index/ instead.
+    """
+    stat = os.stat(file_path)
+    if stat.st_size == 0:
+        raise ValueError(f"Empty CSV file: {file_path}")
+    for path in (_index_path(file_path), _fallback_index_path(file_path)):
+        offsets = _load_saved(path, stat)
+        if offsets is not None:
+            return CsvRowIndex(file_path, offsets)
+
+    print(f"[Index] Membangun index baris untuk {file_path}...")
+    offsets = scan_record_offsets(file_path)
+    try:
+        _save(_index_path(file_path), offsets, stat)
+    except OSError:
+        _save(_fallback_index_path(file_path), offsets, stat)
+    return CsvRowIndex(file_path, offsets)
@@ -0,0 +1,122 @@
+"""Near-duplicate sentence removal for multi-document inputs.
+
+A DUC topic often carries the same AP/NYT wire copy several times, so both
+summarizers would encode the same sentences again and again. Each sentence gets
+a MinHash signature over its word shingles. Signatures are banded into LSH
+buckets, and a sentence is dropped when an earlier kept sentence in the same
+bucket has an estimated Jaccard similarity of at least JACCARD_THRESHOLD.
+Hashing and signatures are NumPy array operations over all shingles of an
+article at once; the first occurrence of every sentence is kept, in order.
+"""
+import re
+import zlib
+
+import numpy as np
+
+from chunking import split_sentences
+from tracing import span
+
+SHINGLE_WORDS = 3
+NUM_PERM = 64
+BANDS = 16  # 16 bands x 4 rows: pairs above ~0.5 Jaccard almost always share a bucket
+JACCARD_THRESHOLD = 0.8
+_PRIME = np.uint64((1 << 31) - 1)
+_WORD_RE = re.compile(r'\w+')
+
+def _permutations(seed=1):
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, int(_PRIME), NUM_PERM, dtype=np.uint64)
+    b = rng.integers(0, int(_PRIME), NUM_PERM, dtype=np.uint64)
+    # Odd multipliers that mix the word hashes of a shingle (or the rows of an LSH band)
+    mix = rng.integers(1, 1 << 63, max(SHINGLE_WORDS, NUM_PERM // BANDS), dtype=np.uint64) | np.uint64(1)
+    return a[:, None], b[:, None], mix
+
+_PERM_A, _PERM_B, _MIX = _permutations()
+
+def shingle_hashes(sentences):
+    """
+    32-bit hashes of the word SHINGLE_WORDS-grams of every sentence, flattened, plus the count per sentence.
+
+    Each distinct word is hashed once. A sentence shorter than a shingle is
+    zero-padded to one full shingle, so no window spans two sentences.
+    """
+    vocab = {}
+    ids = []
+    lengths = []
+    for sentence in sentences:
+        words = _WORD_RE.findall(sentence.lower())
+        ids.extend([vocab.setdefault(word, len(vocab) + 1) for word in words])
+        ids.extend([0] * (SHINGLE_WORDS - len(words)))
+        lengths.append(max(len(words), SHINGLE_WORDS))
+    word_hashes = np.zeros(len(vocab) + 1, dtype=np.uint64)
+    word_hashes[1:] = [zlib.crc32(word.encode('utf-8')) for word in vocab]
+    padded = word_hashes[np.array(ids, dtype=np.int64)]
+
+    lengths = np.array(lengths, dtype=np.int64)
+    counts = lengths - (SHINGLE_WORDS - 1)
+    sentence_starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    first_shingle = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    starts = np.repeat(sentence_starts, counts) + np.arange(counts.sum()) - np.repeat(first_shingle, counts)
+    mixed = np.zeros(len(starts), dtype=np.uint64)
+    for offset in range(SHINGLE_WORDS):
+        mixed ^= padded[starts + offset] * _MIX[offset]
+    return (mixed ^ (mixed >> np.uint64(32))) & np.uint64(0xFFFFFFFF), counts
+
+def minhash_signatures(sentences):
+    """(n_sentences, NUM_PERM) MinHash signatures, computed in one pass over all shingles."""
+    hashes, counts = shingle_hashes(sentences)
+    # a * x + b stays below 2^63 because a < 2^31 and x < 2^32
+    permuted = (_PERM_A * hashes[None, :] + _PERM_B) % _PRIME
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    return np.minimum.reduceat(permuted, starts, axis=1).T
+
+def near_duplicate_mask(sentences):
+    """Boolean mask of the sentences to keep: the first of every group of near-duplicates."""
+    keep = np.ones(len(sentences), dtype=bool)
+    if len(sentences) < 2:
+        return keep
+    signatures = minhash_signatures(sentences)
+    rows = NUM_PERM // BANDS
+    # One 64-bit key per band; a key collision only adds a candidate, which is then verified
+    band_keys = (signatures.reshape(len(sentences), BANDS, rows) * _MIX[:rows]).sum(axis=2).tolist()
+    buckets = [{} for _ in range(BANDS)]
+    for i, keys in enumerate(band_keys):
+        candidates = set()
+        for band_buckets, key in zip(buckets, keys):
+            candidates.update(band_buckets.get(key, ()))
+        if candidates:
+            candidates = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+            similarity = (signatures[candidates] == signatures[i]).mean(axis=1)
+            if similarity.max() >= JACCARD_THRESHOLD:
+                keep[i] = False
+                continue
+        for band_buckets, key in zip(buckets, keys):
+            band_buckets.setdefault(key, []).append(i)
+    return keep
+
+def deduplicate_text(text):
+    """Return (text without near-duplicate sentences, sentences before, sentences after)."""
+    sentences = split_sentences(text)
+    keep = near_duplicate_mask(sentences)
+    return ' '.join(s for s, kept in zip(sentences, keep) if kept), len(sentences), int(keep.sum())
+
+def deduplicate_samples(samples, name=''):
+    """
+    Copy `samples` with near-duplicate sentences removed from each 'article' and print the reduction.
+
+    Returns the new samples and a stats dict with sentence and character counts before and after.
+    """
+    deduplicated = []
+    stats = {'sentences_before': 0, 'sentences_after': 0, 'chars_before': 0, 'chars_after': 0}
+    with span('preprocess.dedup', dataset=name, samples=len(samples)):
+        for sample in samples:
+            article, before, after = deduplicate_text(sample['article'])
+            stats['sentences_before'] += before
+            stats['sentences_after'] += after
+            stats['chars_before'] += len(sample['article'])
+            stats['chars_after'] += len(article)
+            deduplicated.append(dict(sample, article=article))
+    stats['reduction'] = 1 - stats['chars_after'] / stats['chars_before'] if stats['chars_before'] else 0.0
+    print(f"[Dedup] {name}: {stats['sentences_before']} -> {stats['sentences_after']} kalimat, "
+          f"{stats['chars_before']} -> {stats['chars_after']} chars (-{stats['reduction'] * 100:.1f}%)")
+    return deduplicated, stats
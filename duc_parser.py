@@ -0,0 +1,64 @@
+"""Shared parser for DUC/TREC SGML news documents (APW, NYT, XIE).
+
+Both `load_data` and `create_csv` use this module, so the summarizers get plain
+text instead of raw `<DOC>`/`<P>` markup. Patterns are compiled once, the
+`<TEXT>` body is located with plain string searches, and each `<P>` block is
+stripped of tags and whitespace-normalized in a single substitution pass.
+"""
+import re
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+PARSER_VERSION = 1
+PARSE_WORKERS = 8
+
+_FIELD_RE = re.compile(r'<(DOCNO|DATE_TIME|DATE|HEADLINE)>(.*?)</\1>', re.DOTALL)
+_PARAGRAPH_RE = re.compile(r'</?P>')
+_TAG_RE = re.compile(r'<[^>]+>')
+
+DucDocument = namedtuple('DucDocument', 'docno date headline paragraphs')
+DucDocument.text = property(lambda self: ' '.join(self.paragraphs))
+
+def _normalize(text):
+    return ' '.join(_TAG_RE.sub(' ', text).split())
+
+def split_paragraphs(body):
+    """Strip tags from a `<TEXT>` body and return its paragraphs as whitespace-normalized strings."""
+    paragraphs = []
+    for block in _PARAGRAPH_RE.split(body):
+        paragraph = _normalize(block)
+        if paragraph:
+            paragraphs.append(paragraph)
+    return paragraphs
+
+def parse_document(content):
+    """Parse one SGML document into a DucDocument (empty paragraphs if it has no <TEXT>)."""
+    text_start = content.find('<TEXT>')
+    text_end = content.find('</TEXT>', text_start) if text_start >= 0 else -1
+    # Header fields all precede <TEXT>, so only that part is scanned for them
+    fields = {}
+    for match in _FIELD_RE.finditer(content, 0, text_start if text_start >= 0 else len(content)):
+        fields.setdefault(match.group(1), match.group(2))
+    date = fields.get('DATE_TIME', fields.get('DATE', ''))
+    return DucDocument(
+        docno=fields.get('DOCNO', '').strip(),
+        date=date.strip(),
+        headline=_normalize(fields.get('HEADLINE', '')),
+        paragraphs=split_paragraphs(content[text_start + 6:text_end]) if text_end >= 0 else []
+    )
+
+def read_text(file_path):
+    """Read a DUC file; a few documents and gold summaries contain stray non-UTF-8 bytes, which are dropped."""
+    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+        return f.read()
+
+def parse_file(file_path):
+    return parse_document(read_text(file_path))
+
+def parse_files(file_paths, workers=PARSE_WORKERS):
+    """Parse many files concurrently; results follow the order of `file_paths`."""
+    file_paths = list(file_paths)
+    if workers <= 1 or len(file_paths) <= 1:
+        return [parse_file(path) for path in file_paths]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(parse_file, file_paths))
@@ -0,0 +1,105 @@
+"""Persistent sentence-embedding cache keyed by (encoder, sentence hash).
+
+DUC topics repeat many sentences across wire stories, and re-running Bertsum
+with another ratio or selection strategy needs exactly the same embeddings.
+Vectors are stored as float32 blobs in a SQLite database under `cache/`, so
+every distinct sentence is encoded once. Like the summary cache it is bounded
+in size and evicts the least recently used entries first.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from cache_paths import cache_path
+
+CACHE_FILE = 'embeddings.sqlite'
+MAX_CACHE_BYTES = 1024 ** 3
+_SQLITE_BATCH = 500
+
+def make_key(encoder, sentence):
+    return hashlib.sha256(f"{encoder}\0{sentence}".encode('utf-8')).hexdigest()
+
+class EmbeddingCache:
+    def __init__(self, path=None, max_bytes=MAX_CACHE_BYTES):
+        path = path or cache_path(CACHE_FILE)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB, last_access REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_emb_last_access ON embeddings (last_access)")
+        self._conn.commit()
+
+    def get_many(self, keys):
+        """Return {key: float32 vector} for the cached keys and mark them as recently used."""
+        found = {}
+        keys = list(keys)
+        with self._lock:
+            for start in range(0, len(keys), _SQLITE_BATCH):
+                batch = keys[start:start + _SQLITE_BATCH]
+                placeholders = ','.join('?' * len(batch))
+                rows = self._conn.execute(f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch)
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32)
+            if found:
+                now = time.time()
+                self._conn.executemany("UPDATE embeddings SET last_access = ? WHERE key = ?", [(now, key) for key in found])
+                self._conn.commit()
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, keys, vectors):
+        """Store one vector (row of `vectors`) per key, then evict old entries past max_bytes."""
+        now = time.time()
+        vectors = np.asarray(vectors, dtype=np.float32)
+        rows = [(key, vector.tobytes(), now) for key, vector in zip(keys, vectors)]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?)", rows)
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        victims = []
+        for key, size in self._conn.execute("SELECT key, LENGTH(vector) FROM embeddings ORDER BY last_access ASC"):
+            victims.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        self._conn.executemany("DELETE FROM embeddings WHERE key = ?", victims)
+
+    def format_stats(self):
+        total = self.hits + self.misses
+        hit_rate = self.hits / total * 100 if total else 0.0
+        return f"[EmbCache] Hits: {self.hits} | Misses: {self.misses} | Hit rate: {hit_rate:.1f}%"
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_embedding_cache(path=None, max_bytes=MAX_CACHE_BYTES):
+    """Return the process-wide embedding cache, opening it on first use."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = EmbeddingCache(path, max_bytes)
+        return _cache
@@ -0,0 +1,195 @@
+"""Extractive summarization engine behind the Bertsum path.
+
+Follows the `Summarizer()` recipe of bert-extractive-summarizer 0.10.1 with each
+step done once and in bulk:
+
+- Sentences come from spaCy's rule-based `sentencizer` (a blank English
+  pipeline, no model download) and those of 40-600 characters are kept.
+- A sentence embedding is the mean of the second-to-last hidden layer.
+- The first sentence is always selected. The other picks are the sentences
+  closest to the centroids of scikit-learn's KMeans (random_state 12345) over
+  the remaining sentences, with k = max(int((n - 1) * ratio), 1), which is
+  how `cluster_runner` computes it when `num_sentences` is not given.
+
+tests/test_extractive.py runs the library's own SentenceHandler and
+ClusterFeatures next to this module and checks that both give the same
+sentences and, for the same embeddings, the same picks. Two things differ
+from the library:
+
+- Sentences longer than MAX_SENTENCE_TOKENS are truncated. The library feeds
+  them whole, so its encoder fails on them. Below 600 characters that is rare.
+- Distances to a centroid are computed for all sentences at once. Float32
+  rounding can then reorder near-equal distances, so candidates within
+  NEAR_TIE of the minimum are re-ranked with the library's per-row norm
+  and first-minimum rule.
+
+Embeddings come from padded batches with padding masked out of the mean.
+They match the library's one-sentence-at-a-time embeddings only up to float
+rounding, which can tip a near-tie the other way. All sentences of all
+articles are deduplicated and embedded in large padded batches. Vectors go to the persistent embedding cache, so changing the ratio
+or the selection strategy only re-runs the selection step.
+"""
+import threading
+import time
+
+import numpy as np
+import torch
+
+from embedding_cache import get_embedding_cache, make_key
+from resource_monitor import get_monitor
+from tracing import span
+
+MIN_SENTENCE_CHARS = 40
+MAX_SENTENCE_CHARS = 600
+HIDDEN_LAYER = -2
+EMBED_BATCH_SIZE = 64
+MAX_SENTENCE_TOKENS = 512
+RANDOM_STATE = 12345
+NEAR_TIE = 1e-4  # Relative distance gap below which closest_distinct re-checks candidates
+STRATEGIES = ('cluster', 'centroid')
+
+_nlp = None
+_nlp_lock = threading.Lock()
+
+def _sentencizer():
+    global _nlp
+    with _nlp_lock:
+        if _nlp is None:
+            import spacy
+            _nlp = spacy.blank('en')
+            _nlp.add_pipe('sentencizer')
+            _nlp.max_length = 10 ** 8  # Whole DUC topics are one document
+        return _nlp
+
+def segment(article):
+    """Candidate sentences of an article, as bert-extractive-summarizer's SentenceHandler returns them."""
+    sentences = (sentence.text.strip() for sentence in _sentencizer()(article).sents)
+    return [s for s in sentences if MIN_SENTENCE_CHARS < len(s) < MAX_SENTENCE_CHARS]
+
+def _hidden_layer(model, inputs):
+    # Exported encoders (backends.OnnxEncoder) compute only the layer that is pooled
+    if hasattr(model, 'hidden_layer'):
+        return model.hidden_layer(**inputs)
+    return model(**inputs, output_hidden_states=True).hidden_states[HIDDEN_LAYER]
+
+def embed_sentences(tokenizer, model, sentences, batch_size=EMBED_BATCH_SIZE):
+    """Mean-pooled HIDDEN_LAYER embeddings (float32, one row per sentence) from length-sorted padded batches."""
+    with span('bertsum.tokenize', sentences=len(sentences)):
+        encoded = tokenizer(sentences, add_special_tokens=False, truncation=True, max_length=MAX_SENTENCE_TOKENS)['input_ids']
+    # Empty token lists would divide by zero in the masked mean
+    encoded = [ids or [tokenizer.unk_token_id] for ids in encoded]
+    order = sorted(range(len(encoded)), key=lambda i: len(encoded[i]), reverse=True)
+    vectors = np.zeros((len(sentences), model.config.hidden_size), dtype=np.float32)
+    device = model.device
+    for start in range(0, len(order), batch_size):
+        batch = order[start:start + batch_size]
+        inputs = tokenizer.pad({'input_ids': [encoded[i] for i in batch]}, padding='longest', return_tensors='pt')
+        inputs = {key: value.to(device) for key, value in inputs.items()}
+        with span('bertsum.encode', batch_size=len(batch), max_tokens=len(encoded[batch[0]])), torch.no_grad():
+            hidden = _hidden_layer(model, inputs)
+        # Padding positions are masked out, so each row equals the unpadded per-sentence mean
+        mask = inputs['attention_mask'].unsqueeze(-1).to(hidden.dtype)
+        pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1)
+        vectors[batch] = pooled.float().cpu().numpy()
+    return vectors
+
+def kmeans(points, k, random_state=RANDOM_STATE):
+    """Centroids of scikit-learn's KMeans with its default settings, as the library runs it."""
+    from sklearn.cluster import KMeans
+    return KMeans(n_clusters=k, random_state=random_state).fit(points).cluster_centers_
+
+def closest_distinct(points, centers):
+    """For each center in turn, the index of the nearest point not already taken by an earlier center."""
+    chosen = []
+    for center in centers:
+        distances = np.linalg.norm(points - center, axis=1)
+        distances[chosen] = np.inf
+        # Near-ties are settled with the library's own per-row norm and first-minimum rule
+        # (__find_closest_args), since float32 rounding differs between the two ways of summing
+        nearest = distances.min()
+        candidates = np.flatnonzero(distances <= nearest * (1 + NEAR_TIE) + 1e-12)
+        if len(candidates) > 1:
+            exact = [np.linalg.norm(points[i] - center) for i in candidates]
+            chosen.append(int(candidates[int(np.argmin(exact))]))
+        else:
+            chosen.append(int(candidates[0]))
+    return chosen
+
+def select_sentences(embeddings, ratio, strategy='cluster', use_first=True, random_state=RANDOM_STATE):
+    """
+    Return the sorted indices of the sentences to extract.
+
+    Args:
+        embeddings: (n_sentences, hidden) array of one article
+        ratio: Fraction of the sentences after the first to select, at least one
+        strategy: 'cluster' picks the sentence closest to each k-means centroid,
+            'centroid' the sentences most similar (cosine) to the article mean
+        use_first: Always include the first sentence, as news leads are informative
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown selection strategy {strategy!r}, expected one of {STRATEGIES}")
+    n = len(embeddings)
+    if n <= 1:
+        return list(range(n))
+    offset = 1 if use_first else 0
+    # Clustered in the encoder's dtype (float32), like the library
+    points = np.asarray(embeddings[offset:])
+    k = max(int(len(points) * ratio), 1)
+    if strategy == 'cluster':
+        picked = closest_distinct(points, kmeans(points, k, random_state))
+    else:
+        points = points.astype(np.float64)
+        normalized = points / np.maximum(np.linalg.norm(points, axis=1, keepdims=True), 1e-12)
+        centroid = normalized.mean(axis=0)
+        picked = np.argsort(-(normalized @ centroid), kind='stable')[:k].tolist()
+    indices = sorted(i + offset for i in picked)
+    return [0] + indices if use_first else indices
+
+class ExtractiveSummarizer:
+    def __init__(self, tokenizer, model, encoder_name, use_cache=True, batch_size=EMBED_BATCH_SIZE):
+        self.tokenizer = tokenizer
+        self.model = model
+        self.encoder_name = encoder_name
+        self.use_cache = use_cache
+        self.batch_size = batch_size
+
+    def embeddings_for(self, sentences):
+        """Return {sentence: vector}, encoding only the sentences missing from the embedding cache."""
+        unique = list(dict.fromkeys(sentences))
+        vectors = {}
+        missing = unique
+        if self.use_cache:
+            cache = get_embedding_cache()
+            keys = {sentence: make_key(self.encoder_name, sentence) for sentence in unique}
+            found = cache.get_many(keys.values())
+            vectors = {sentence: found[keys[sentence]] for sentence in unique if keys[sentence] in found}
+            missing = [sentence for sentence in unique if sentence not in vectors]
+        print(f"[Bertsum] {len(unique)} kalimat unik, {len(missing)} perlu di-encode")
+        if missing:
+            with get_monitor().stage('bertsum.embed', sentences=len(missing)):
+                encoded = embed_sentences(self.tokenizer, self.model, missing, self.batch_size)
+            if self.use_cache:
+                cache.put_many([keys[sentence] for sentence in missing], encoded)
+            vectors.update(zip(missing, encoded))
+        return vectors
+
+    def summarize_many(self, articles, ratio, strategy='cluster', on_summary=None):
+        """Summarize all articles with one shared embedding pass; `on_summary(index, summary)` per article."""
+        monitor = get_monitor()
+        with span('bertsum.segment', samples=len(articles)):
+            segmented = [segment(article) for article in articles]
+        vectors = self.embeddings_for([sentence for sentences in segmented for sentence in sentences])
+        summaries = []
+        for idx, sentences in enumerate(segmented):
+            start = time.perf_counter()
+            with span('bertsum.select', index=idx, sentences=len(sentences)):
+                if sentences:
+                    embeddings = np.stack([vectors[sentence] for sentence in sentences])
+                    summary = ' '.join(sentences[i] for i in select_sentences(embeddings, ratio, strategy))
+                else:
+                    summary = ''
+            summaries.append(summary)
+            monitor.record_sample('bertsum.select', idx, time.perf_counter() - start, sentences=len(sentences))
+            if on_summary is not None:
+                on_summary(idx, summary)
+        return summaries
@@ -0,0 +1,252 @@
+"""Multi-replica CPU inference with explicit thread and core control.
+
+By default PyTorch sizes its intra-op pool to every core of the machine, and
+nothing else limits it. One pipeline then leaves cores idle on small batches,
+and two pipelines oversubscribe the machine. InferenceScheduler runs K model
+replicas, each in its own spawned process pinned to a disjoint slice of cores
+with `torch.set_num_threads(len(slice))`. A dataset is cut into small
+length-sorted tasks that go to whichever replica is free. Results are merged
+back in dataset order, and `on_summary` still fires per sample, so
+checkpointing keeps working. When tracing is enabled, replicas record their
+own spans and hand them back with every task, together with their
+summary-cache hit/miss counts, which are added to the parent's cache stats. `python inference_scheduler.py`
+sweeps K x threads and reports samples/sec.
+"""
+import functools
+import importlib
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import tracing
+from summary_cache import COUNTERS, cache_counters, get_summary_cache
+
+TASK_SIZE = 8  # Samples per task; matches the Pegasus batch size so tasks batch cleanly
+
+_SUMMARIZERS = {
+    'bertsum': ('bertsum_summarization', 'bertsum_summarize', 'encoder'),
+    'pegasus': ('pegasus_summarization', 'pegasus_summarize', 'seq2seq'),
+}
+
+def available_cores():
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+def plan_core_slices(workers, threads_per_worker=None, cores=None):
+    """
+    Split the cores into one slice per worker.
+
+    Without `threads_per_worker` every worker gets an even share (at least one
+    core). If workers x threads exceeds the cores, slices wrap around and overlap.
+    """
+    cores = list(cores) if cores is not None else available_cores()
+    if threads_per_worker is None:
+        threads_per_worker = max(len(cores) // workers, 1)
+    if workers * threads_per_worker > len(cores):
+        print(f"[Scheduler] Peringatan: {workers} worker x {threads_per_worker} thread > {len(cores)} core (oversubscribed)")
+    return [[cores[(w * threads_per_worker + i) % len(cores)] for i in range(threads_per_worker)] for w in range(workers)]
+
+def configure_threads(threads, interop_threads=1, cores=None):
+    """Pin the current process to `cores` (where supported) and size the torch thread pools."""
+    import torch
+    if cores is not None and hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, cores)
+    torch.set_num_threads(threads)
+    try:
+        torch.set_num_interop_threads(interop_threads)
+    except RuntimeError:
+        # Can only be set before the first inter-op parallel work in this process
+        pass
+
+def _resolve(model):
+    module_name, function_name, _ = _SUMMARIZERS[model]
+    return getattr(importlib.import_module(module_name), function_name)
+
+def model_kind(model):
+    """model_registry kind ('encoder' or 'seq2seq') of a summarizer on fp32."""
+    return _SUMMARIZERS[model][2]
+
+def model_spec(model, backend='fp32'):
+    """model_registry spec (kind, name) of a summarizer on `backend`."""
+    from backends import backend_kind
+    module_name, _, kind = _SUMMARIZERS[model]
+    return backend_kind(kind, backend), importlib.import_module(module_name).MODEL_NAME
+
+def _init_replica(threads, interop_threads, cores, trace):
+    configure_threads(threads, interop_threads, cores)
+    if trace:
+        tracing.enable()
+
+def _summarize_task(model, samples, kwargs):
+    # The spans recorded in the replica travel back with the result (an empty list when not tracing),
+    # and so do the replica's summary-cache counts for this task, which the parent's cache never sees
+    before = cache_counters()
+    with tracing.span('scheduler.task', model=model, samples=len(samples)):
+        summaries = _resolve(model)(samples, **kwargs)
+    after = cache_counters()
+    return summaries, tracing.drain(), {name: after[name] - before[name] for name in COUNTERS}
+
+def _warm_up_task(specs):
+    from model_registry import warm_up
+    with tracing.span('warm_up.replica'):
+        warm_up(specs)
+    return tracing.drain()
+
+class InferenceScheduler:
+    """
+    Args:
+        workers: Number of model replicas
+        threads_per_worker: Torch threads (and pinned cores) per replica, default an even share
+        interop_threads: Torch inter-op threads per replica
+        task_size: Samples per task handed to a replica
+        cores: Core ids this scheduler may use (default: all available)
+        isolated: Run even a single replica in its own process, so several
+            schedulers can share one machine without sharing a torch thread pool
+        name: Label used in log lines
+    """
+
+    def __init__(self, workers=1, threads_per_worker=None, interop_threads=1, task_size=TASK_SIZE,
+                 cores=None, isolated=False, name=None):
+        self.workers = max(int(workers), 1)
+        self.interop_threads = interop_threads
+        self.task_size = task_size
+        self.core_slices = plan_core_slices(self.workers, threads_per_worker, cores)
+        self.threads_per_worker = len(self.core_slices[0])
+        self.in_process = self.workers == 1 and not isolated
+        self._executors = None
+        if self.in_process:
+            # A single replica runs in this process, so it keeps using the already loaded models
+            configure_threads(self.threads_per_worker, interop_threads)
+        label = f"[Scheduler {name}]" if name else "[Scheduler]"
+        print(f"{label} {self.workers} replica x {self.threads_per_worker} thread, core {sorted(set(sum(self.core_slices, [])))}")
+
+    def _get_executors(self):
+        if self._executors is None:
+            context = multiprocessing.get_context('spawn')
+            self._executors = [
+                ProcessPoolExecutor(max_workers=1, mp_context=context, initializer=_init_replica,
+                                    initargs=(len(cores), self.interop_threads, cores, tracing.enabled()))
+                for cores in self.core_slices
+            ]
+        return self._executors
+
+    def warm_up(self, specs):
+        """Load the models in every replica before timing or processing starts."""
+        if self.in_process:
+            from model_registry import warm_up
+            warm_up(specs)
+            return
+        for future in [executor.submit(_warm_up_task, specs) for executor in self._get_executors()]:
+            tracing.add_events(future.result())
+
+    def run(self, model, samples, on_summary=None, **summarize_kwargs):
+        """
+        Summarize `samples` with `model` ('bertsum' or 'pegasus') across the replicas.
+
+        Returns the summaries in sample order. `on_summary(index, summary)` is
+        called as each task comes back. Extra keyword arguments go to the summarizer.
+        """
+        samples = [{'article': sample['article']} for sample in samples]
+        if self.in_process:
+            return _resolve(model)(samples, on_summary=on_summary, **summarize_kwargs)
+
+        # Longest articles first, so the slowest tasks start early and the tail is short
+        order = sorted(range(len(samples)), key=lambda i: len(samples[i]['article']), reverse=True)
+        tasks = [order[start:start + self.task_size] for start in range(0, len(order), self.task_size)]
+        summaries = [None] * len(samples)
+        idle = list(self._get_executors())
+        pending = {}
+        next_task = 0
+        while next_task < len(tasks) or pending:
+            while idle and next_task < len(tasks):
+                executor = idle.pop()
+                indices = tasks[next_task]
+                next_task += 1
+                future = executor.submit(_summarize_task, model, [samples[i] for i in indices], summarize_kwargs)
+                pending[future] = (executor, indices)
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                executor, indices = pending.pop(future)
+                idle.append(executor)
+                task_summaries, events, cache_counts = future.result()
+                tracing.add_events(events)
+                if any(cache_counts.values()):
+                    get_summary_cache().add_counters(cache_counts)
+                for i, summary in zip(indices, task_summaries):
+                    summaries[i] = summary
+                    if on_summary is not None:
+                        on_summary(i, summary)
+        return summaries
+
+    def summarize_fn(self, model, **summarize_kwargs):
+        """A `summarize_fn(samples, on_summary=...)` for checkpoint.summarize_with_checkpoint."""
+        return functools.partial(self.run, model, **summarize_kwargs)
+
+    def close(self):
+        if self._executors is not None:
+            for executor in self._executors:
+                executor.shutdown()
+            self._executors = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+def benchmark(model, samples, worker_counts, thread_counts, backend='fp32', **summarize_kwargs):
+    """
+    Time every K x threads combination that fits the cores and return one result dict per run.
+
+    Models are loaded before the clock starts and the summary cache is off, so
+    only inference is measured.
+    """
+    n_cores = len(available_cores())
+    results = []
+    for workers in worker_counts:
+        for threads in thread_counts:
+            if workers * threads > n_cores:
+                print(f"[Benchmark] Skip {workers}x{threads}: butuh {workers * threads} core, tersedia {n_cores}")
+                continue
+            with InferenceScheduler(workers, threads) as scheduler:
+                scheduler.warm_up([model_spec(model, backend)])
+                start = time.perf_counter()
+                scheduler.run(model, samples, use_cache=False, backend=backend, **summarize_kwargs)
+                seconds = time.perf_counter() - start
+            results.append({'workers': workers, 'threads': threads, 'seconds': round(seconds, 3),
+                            'samples_per_sec': round(len(samples) / seconds, 4)})
+            print(f"[Benchmark] {workers} worker x {threads} thread: {results[-1]['samples_per_sec']} samples/sec")
+
+    print(f"\n{'workers':>7} {'threads':>7} {'seconds':>9} {'samples/sec':>12}")
+    for row in sorted(results, key=lambda r: -r['samples_per_sec']):
+        print(f"{row['workers']:>7} {row['threads']:>7} {row['seconds']:>9.2f} {row['samples_per_sec']:>12.4f}")
+    return results
+
+if __name__ == "__main__":
+    import argparse
+    import datetime
+    import json
+    from backends import BACKENDS
+    from load_data import load_multiple_datasets
+    from run_options import DUC_DEFAULTS
+
+    parser = argparse.ArgumentParser(description="Sweep replicas x threads and report summarization throughput")
+    parser.add_argument("--model", choices=sorted(_SUMMARIZERS), default='pegasus')
+    parser.add_argument("--data-dir", default=DUC_DEFAULTS['data_dir'], help="Folder with the DUC20xx folders")
+    parser.add_argument("--samples", type=int, default=16, help="Number of DUC2006 topics to summarize per run")
+    parser.add_argument("--workers", type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument("--threads", type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument("--backend", choices=BACKENDS, default='fp32')
+    args = parser.parse_args()
+
+    samples = list(load_multiple_datasets(args.data_dir)['DUC2006'])[:args.samples]
+    results = benchmark(args.model, samples, args.workers, args.threads, backend=args.backend)
+    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    os.makedirs('results', exist_ok=True)
+    output_path = os.path.join('results', f'scheduler_benchmark_{args.model}_{timestamp}.json')
+    with open(output_path, 'w') as f:
+        json.dump({'model': args.model, 'backend': args.backend, 'samples': len(samples),
+                   'cores': len(available_cores()), 'results': results}, f, indent=2)
+    print(f"Hasil benchmark disimpan di {output_path}")
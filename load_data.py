@@ -1,87 +1,157 @@
 import os
 import re
+import shutil
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
 from datasets import Dataset
+from cache_paths import cache_path
+from tracing import span
+from duc_parser import PARSER_VERSION, parse_files, read_text
 
-def load_multiple_datasets(base_path="/workspaces/summary/Dataset"):
+SNAPSHOT_DIR = 'duc_snapshots'  # Under the cache root, see cache_paths
+READ_WORKERS = 8
+
+def _list_dir(path, want_dirs=False):
+    # Single scandir pass instead of listdir + isdir/isfile per entry
+    with os.scandir(path) as entries:
+        return [entry for entry in entries if (entry.is_dir() if want_dirs else entry.is_file())]
+
+def directory_fingerprint(duc_path):
+    """Hash of the name, size and mtime of every gold summary and raw document of a DUC folder."""
+    h = hashlib.sha256()
+    # Parser changes alter the article text, so they must invalidate old snapshots too
+    h.update(f"parser-v{PARSER_VERSION}\n".encode('utf-8'))
+    for sub in ("gold_summaries", "raw_data"):
+        stack = [os.path.join(duc_path, sub)]
+        while stack:
+            path = stack.pop()
+            with os.scandir(path) as entries:
+                for entry in sorted(entries, key=lambda e: e.name):
+                    if entry.is_dir():
+                        stack.append(entry.path)
+                    else:
+                        stat = entry.stat()
+                        h.update(f"{os.path.relpath(entry.path, duc_path)}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode('utf-8'))
+    return h.hexdigest()[:16]
+
+def _read_topic_articles(raw_path):
+    # Plain <TEXT> content only; the SGML markup would just waste model tokens
+    paths = [entry.path for entry in sorted(_list_dir(raw_path), key=lambda e: e.name)]
+    return [doc.text for doc in parse_files(paths, workers=1) if doc.text]
+
+def _load_duc_folder(duc_folder, duc_path, workers):
+    raw_data_path = os.path.join(duc_path, "raw_data")
+    gold_summaries_path = os.path.join(duc_path, "gold_summaries")
+
+    # Load gold summaries
+    summaries = {}
+    for entry in _list_dir(gold_summaries_path):
+        if not entry.name.endswith('.txt'):
+            continue
+        topic = entry.name.split('_')[0]  # e.g., T1 from T1_1.txt
+        summary = read_text(entry.path).strip()
+        summaries.setdefault(topic, []).append(summary)
+
+    if not summaries:
+        print(f"Skipping {duc_folder}: No gold summaries found")
+        return None
+
+    topic_prefix = re.match(r'^[A-Za-z]+', next(iter(summaries.keys()))).group()
+
+    # Prepare mapping topic -> raw folder using numeric alignment (e.g., T1 -> D0601A)
+    folder_map = {}
+    for entry in _list_dir(raw_data_path, want_dirs=True):
+        match = re.search(r'(\d+)', entry.name)
+        if not match:
+            continue
+        folder_number = int(match.group())
+        base = (folder_number // 100) * 100
+        topic_index = folder_number - base
+        topic_name = f"{topic_prefix}{topic_index}"
+        folder_map[topic_name] = entry.name
+
+    missing_topics = [topic for topic in summaries.keys() if topic not in folder_map]
+    if missing_topics:
+        print(f"Warning: {duc_folder} missing raw folders for topics: {missing_topics}")
+
+    # Read topic folders concurrently; results keep the gold summary order
+    topics = [(topic, sum_list) for topic, sum_list in summaries.items() if folder_map.get(topic)]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        topic_articles = list(executor.map(
+            _read_topic_articles, [os.path.join(raw_data_path, folder_map[topic]) for topic, _ in topics]
+        ))
+
+    # Combine summaries per topic and align with correct raw data folder
+    data = []
+    for (topic, sum_list), articles in zip(topics, topic_articles):
+        if not articles:
+            continue
+
+        combined_article = ' '.join(articles)
+
+        data.append({
+            'dataset': duc_folder,
+            'topic': topic,
+            'article': combined_article,
+            'references': sum_list
+        })
+    return data
+
+def load_multiple_datasets(base_path="/workspaces/summary/Dataset", use_snapshot=True, workers=READ_WORKERS):
+    """
+    Load every DUC folder under `base_path` into a `datasets.Dataset`.
+
+    Each parsed dataset is saved as an Arrow snapshot under cache/duc_snapshots/,
+    keyed by a fingerprint of the folder's files (name, size, mtime). Later runs
+    memory-map the snapshot instead of re-reading the documents; any change to
+    the raw or gold files produces a new fingerprint and a fresh parse.
+    """
     datasets = {}
-    
+
     # Detect all DUC folders (e.g., DUC2006, DUC2007)
-    duc_folders = [f for f in os.listdir(base_path) if f.startswith('DUC') and os.path.isdir(os.path.join(base_path, f))]
-    
+    duc_folders = [entry.name for entry in _list_dir(base_path, want_dirs=True) if entry.name.startswith('DUC')]
+
     for duc_folder in duc_folders:
         duc_path = os.path.join(base_path, duc_folder)
         raw_data_path = os.path.join(duc_path, "raw_data")
         gold_summaries_path = os.path.join(duc_path, "gold_summaries")
-        
+
         if not os.path.exists(raw_data_path) or not os.path.exists(gold_summaries_path):
             print(f"Skipping {duc_folder}: Missing raw_data or gold_summaries")
             continue
-        
-        data = []
-        
-        # Load gold summaries
-        gold_files = [f for f in os.listdir(gold_summaries_path) if f.endswith('.txt')]
-        summaries = {}
-        for file in gold_files:
-            topic = file.split('_')[0]  # e.g., T1 from T1_1.txt
-            with open(os.path.join(gold_summaries_path, file), 'r', encoding='utf-8') as f:
-                summary = f.read().strip()
-            summaries.setdefault(topic, []).append(summary)
-
-        if not summaries:
-            print(f"Skipping {duc_folder}: No gold summaries found")
-            continue
-
-        topic_prefix = re.match(r'^[A-Za-z]+', next(iter(summaries.keys()))).group()
 
-        # Prepare mapping topic -> raw folder using numeric alignment (e.g., T1 -> D0601A)
-        raw_subfolders = [f for f in os.listdir(raw_data_path) if os.path.isdir(os.path.join(raw_data_path, f))]
-        folder_map = {}
-        for folder in raw_subfolders:
-            match = re.search(r'(\d+)', folder)
-            if not match:
-                continue
-            folder_number = int(match.group())
-            base = (folder_number // 100) * 100
-            topic_index = folder_number - base
-            topic_name = f"{topic_prefix}{topic_index}"
-            folder_map[topic_name] = folder
-
-        missing_topics = [topic for topic in summaries.keys() if topic not in folder_map]
-        if missing_topics:
-            print(f"Warning: {duc_folder} missing raw folders for topics: {missing_topics}")
-
-        # Combine summaries per topic and align with correct raw data folder
-        for topic, sum_list in summaries.items():
-            topic_folder = folder_map.get(topic)
-            if not topic_folder:
+        snapshot_path = None
+        if use_snapshot:
+            snapshot_path = os.path.join(cache_path(SNAPSHOT_DIR), f"{duc_folder}_{directory_fingerprint(duc_path)}")
+            if os.path.isdir(snapshot_path):
+                with span('load.duc_snapshot', dataset=duc_folder):
+                    datasets[duc_folder] = Dataset.load_from_disk(snapshot_path)
+                print(f"Loaded {len(datasets[duc_folder])} samples for {duc_folder} (snapshot)")
                 continue
 
-            raw_path = os.path.join(raw_data_path, topic_folder)
-            articles = []
-            for file in sorted(os.listdir(raw_path)):
-                file_path = os.path.join(raw_path, file)
-                if not os.path.isfile(file_path):
-                    continue
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    articles.append(f.read().strip())
-            if not articles:
+        with span('load.duc_parse', dataset=duc_folder):
+            data = _load_duc_folder(duc_folder, duc_path, workers)
+            if data is None:
                 continue
+            datasets[duc_folder] = Dataset.from_list(data)
+        print(f"Loaded {len(data)} samples for {duc_folder}")
 
-            combined_article = ' '.join(articles)
+        if snapshot_path is not None:
+            with span('load.duc_save_snapshot', dataset=duc_folder):
+                save_snapshot(datasets[duc_folder], duc_folder, snapshot_path)
 
-            data.append({
-                'dataset': duc_folder,
-                'topic': topic,
-                'article': combined_article,
-                'references': sum_list
-            })
-        
-        datasets[duc_folder] = Dataset.from_list(data)
-        print(f"Loaded {len(data)} samples for {duc_folder}")
-    
     return datasets
 
+def save_snapshot(dataset, duc_folder, snapshot_path):
+    """Write the dataset as an Arrow snapshot and drop older snapshots of the same folder."""
+    tmp_path = snapshot_path + '.tmp'
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    dataset.save_to_disk(tmp_path)
+    os.replace(tmp_path, snapshot_path)
+    for entry in _list_dir(cache_path(SNAPSHOT_DIR), want_dirs=True):
+        if entry.name.startswith(f"{duc_folder}_") and entry.path != snapshot_path:
+            shutil.rmtree(entry.path, ignore_errors=True)
+
 def load_duc2006_data(base_path="/workspaces/summary"):
     # Backward compatibility
     return load_multiple_datasets(os.path.dirname(base_path))[os.path.basename(base_path)]
@@ -91,4 +161,4 @@ if __name__ == "__main__":
     for name, dataset in all_datasets.items():
         print(f"{name}: {len(dataset)} samples")
         if len(dataset) > 0:
-            print(dataset[0])
\ No newline at end of file
+            print(dataset[0])
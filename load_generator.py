@@ -0,0 +1,118 @@
+"""Replay duc2007.csv against summarization_service.py and report latency and throughput.
+
+Requests go out either closed-loop, with `--concurrency` requests in flight at
+any time, or open-loop at `--rate` requests per second with Poisson arrivals.
+Open-loop keeps sending while the service slows down, which is what exposes
+queueing, 503 backpressure and 504 timeouts. The client-side p50/p95/p99 and
+the service's own /metrics are printed and, with --output, saved as JSON.
+"""
+import asyncio
+import csv
+import json
+import os
+import random
+import time
+
+from summarization_service import latency_summary
+
+csv.field_size_limit(10000000)  # Articles are long quoted fields
+
+def read_articles(path):
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        return [row['article'] for row in csv.DictReader(f) if row['article'].strip()]
+
+async def _send(session, url, article, timeout, results):
+    start = time.perf_counter()
+    try:
+        async with session.post(url, json={'article': article, 'timeout': timeout}) as response:
+            body = await response.json(content_type=None)
+            status = response.status
+    except Exception as e:
+        body, status = {'error': repr(e)}, 'client-error'
+    results.append({'status': status, 'latency': time.perf_counter() - start,
+                    'batch_size': body.get('batch_size') if isinstance(body, dict) else None})
+
+async def replay(base_url, model, articles, n_requests, concurrency=8, rate=None, timeout=120.0, seed=0):
+    """
+    Send `n_requests` requests, cycling through `articles`, and return one result dict per request.
+
+    With `rate` (requests/sec) arrivals are open-loop and exponentially spaced;
+    otherwise at most `concurrency` requests are in flight.
+    """
+    from aiohttp import ClientSession, ClientTimeout
+
+    url = f"{base_url.rstrip('/')}/summarize/{model}"
+    results = []
+    rng = random.Random(seed)
+    # The client timeout is a little longer than the service's, so the service reports 504s itself
+    async with ClientSession(timeout=ClientTimeout(total=timeout + 10)) as session:
+        if rate:
+            tasks = []
+            for i in range(n_requests):
+                tasks.append(asyncio.create_task(_send(session, url, articles[i % len(articles)], timeout, results)))
+                await asyncio.sleep(rng.expovariate(rate))
+            await asyncio.gather(*tasks)
+        else:
+            next_index = iter(range(n_requests))
+
+            async def worker():
+                for i in next_index:
+                    await _send(session, url, articles[i % len(articles)], timeout, results)
+
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+        async with session.get(f"{base_url.rstrip('/')}/metrics") as response:
+            server_metrics = await response.json()
+    return results, server_metrics
+
+def report(results, seconds):
+    ok = [r for r in results if r['status'] == 200]
+    statuses = {}
+    for r in results:
+        statuses[str(r['status'])] = statuses.get(str(r['status']), 0) + 1
+    batch_sizes = [r['batch_size'] for r in ok if r['batch_size']]
+    return {
+        'requests': len(results),
+        'seconds': round(seconds, 3),
+        'statuses': statuses,
+        'throughput_rps': round(len(ok) / seconds, 3) if seconds > 0 else 0.0,
+        'latency': latency_summary([r['latency'] for r in ok]),
+        'mean_batch_size': round(sum(batch_sizes) / len(batch_sizes), 2) if batch_sizes else 0.0,
+    }
+
+if __name__ == "__main__":
+    import argparse
+    import datetime
+
+    parser = argparse.ArgumentParser(description="Replay duc2007.csv against the summarization service")
+    parser.add_argument("--url", default='http://127.0.0.1:8080')
+    parser.add_argument("--model", choices=['bertsum', 'pegasus'], default='pegasus')
+    parser.add_argument("--csv", default='duc2007.csv', help="CSV with an 'article' column")
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=8, help="Requests in flight (closed loop)")
+    parser.add_argument("--rate", type=float, default=None, help="Requests per second (open loop, overrides --concurrency)")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-request timeout sent to the service")
+    parser.add_argument("--output", default=None, help="Write the report as JSON (default: results/loadtest_<model>_<ts>.json)")
+    args = parser.parse_args()
+
+    articles = read_articles(args.csv)
+    mode = f"{args.rate} req/s" if args.rate else f"concurrency {args.concurrency}"
+    print(f"[Load] {args.requests} request ke {args.url} ({args.model}, {mode}, {len(articles)} artikel)")
+    start = time.perf_counter()
+    results, server_metrics = asyncio.run(replay(args.url, args.model, articles, args.requests, args.concurrency,
+                                                 args.rate, args.timeout))
+    summary = report(results, time.perf_counter() - start)
+    latency = summary['latency']
+    print(f"[Load] Status: {summary['statuses']} | Throughput: {summary['throughput_rps']} req/s "
+          f"| Rata-rata batch: {summary['mean_batch_size']}")
+    if latency['count']:
+        print(f"[Load] Latency p50 {latency['p50_ms']} ms | p95 {latency['p95_ms']} ms | p99 {latency['p99_ms']} ms")
+    print(f"[Load] Server metrics: {json.dumps(server_metrics.get(args.model, {}), indent=2)}")
+
+    output = args.output
+    if output is None:
+        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        output = os.path.join('results', f'loadtest_{args.model}_{timestamp}.json')
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump({'model': args.model, 'mode': mode, 'client': summary, 'server': server_metrics}, f, indent=2)
+    print(f"[Load] Laporan disimpan di {output}")
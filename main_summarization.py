@@ -1,33 +1,23 @@
 import os
-import datetime
+import argparse
+import functools
+import tracing
 from load_data import load_multiple_datasets
-from bertsum_summarization import bertsum_summarize, evaluate_rouge as evaluate_rouge_bertsum
-from pegasus_summarization import pegasus_summarize, evaluate_rouge as evaluate_rouge_pegasus
-
-def save_results(dataset_name, model_name, summaries, scores, avg_scores, result_dir):
-    os.makedirs(result_dir, exist_ok=True)
-    with open(os.path.join(result_dir, f'{dataset_name}_{model_name}_summaries.txt'), 'w') as f:
-        for i, summary in enumerate(summaries):
-            f.write(f"Sample {i+1}:\n{summary}\n\n")
-    with open(os.path.join(result_dir, f'{dataset_name}_{model_name}_scores.txt'), 'w') as f:
-        f.write(f"Average ROUGE-1 F1: {avg_scores['rouge-1']:.4f}\n")
-        f.write(f"Average ROUGE-2 F1: {avg_scores['rouge-2']:.4f}\n")
-        f.write(f"Average ROUGE-SU4 F1: {avg_scores['rouge-su4']:.4f}\n\n")
-        for i, score in enumerate(scores):
-            f.write(f"Sample {i+1}:\n")
-            f.write(f"ROUGE-1 F1: {score['rouge-1']['f']:.4f}\n")
-            f.write(f"ROUGE-2 F1: {score['rouge-2']['f']:.4f}\n")
-            f.write(f"ROUGE-SU4 F1: {score['rouge-su4']['f']:.4f}\n\n")
-
-if __name__ == "__main__":
-    all_datasets = load_multiple_datasets()
-    print("Loaded datasets:", list(all_datasets.keys()))
-
-    # Buat folder hasil dengan timestamp
-    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-    result_dir = os.path.join('results', timestamp)
-    os.makedirs(result_dir, exist_ok=True)
-
+from dedup import deduplicate_samples
+from model_registry import release
+from inference_scheduler import InferenceScheduler, model_spec
+from pipeline import PipelinedExecutor
+from cache_paths import set_cache_dir
+from resource_monitor import get_monitor
+from summary_cache import get_summary_cache
+from rouge_scorer import ROUGE_WORKERS, load_reference_index, ParallelRougeEvaluator, average_f1, scores_by_sample
+from results_store import ResultsWriter, read_results
+from significance import compare_models, format_comparison
+from checkpoint import CheckpointWriter, summarize_with_checkpoint, save_run_config, load_run_config
+from run_options import (DUC_DEFAULTS, RESUME_OVERRIDES, add_run_arguments, is_headless, load_config_file, options_from_args,
+                         resolve_options, result_dir_for, sample_range)
+
+def prompt_samples():
     print("\nMenu Test Data:")
     print("1. Jalankan SEMUA data")
     print("2. Jalankan BEBERAPA data saja (misal 1 file)")
@@ -35,107 +25,183 @@ if __name__ == "__main__":
 
     if menu == "2":
         try:
-            n_samples = int(input("Masukkan jumlah data yang ingin diuji (misal 1): ").strip())
+            return int(input("Masukkan jumlah data yang ingin diuji (misal 1): ").strip())
         except ValueError:
             print("Input tidak valid, default ke 1 data.")
-            n_samples = 1
+            return 1
+    return None  # None berarti semua data
+
+def format_averages(scores, prefix='Average'):
+    """One '<prefix> ROUGE-x F1: ...' line per metric of per-sample score dicts."""
+    return [f"{prefix} {metric.upper()} F1: {value:.4f}" for metric, value in average_f1(scores).items()]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run Bertsum and Pegasus on the DUC datasets")
+    parser.add_argument("--resume", metavar="RUN_DIR", help="Continue an interrupted run in results/<run>, skipping finished samples")
+    add_run_arguments(parser, DUC_DEFAULTS)
+    args = parser.parse_args()
+    cli_options = options_from_args(args, DUC_DEFAULTS)
+
+    if args.resume:
+        # Reuse the folder and the sample selection of the interrupted run; only throughput and tracing flags may change
+        result_dir = args.resume
+        saved = load_run_config(result_dir)
+        throughput = {key: cli_options[key] for key in RESUME_OVERRIDES if key in cli_options}
+        options = resolve_options(DUC_DEFAULTS, saved, throughput)
+        print(f"\nMelanjutkan run di {result_dir}")
     else:
-        n_samples = None  # None berarti semua data
+        config = load_config_file(args.config, 'duc') if args.config else None
+        options = resolve_options(DUC_DEFAULTS, config, cli_options)
+        headless = is_headless(args, cli_options)
+        if not headless:
+            options['samples'] = prompt_samples()
+        result_dir = result_dir_for(options, headless)
+        save_run_config(result_dir, options)
+    print(f"Hasil disimpan di {result_dir}")
+
+    # Caches of this process and of the spawned replicas live under one root
+    set_cache_dir(options['cache_dir'])
+    if options['trace'] or options['profile']:
+        tracing.enable(options['profile'], options['profile_stages'])
+    models = options['models']
+    backend = options['backend']
+    pegasus_mode = options['pegasus_mode']
+
+    all_datasets = load_multiple_datasets(options['data_dir'])
+    if options['datasets']:
+        missing = [name for name in options['datasets'] if name not in all_datasets]
+        if missing:
+            raise SystemExit(f"Dataset tidak ditemukan: {missing} (tersedia: {list(all_datasets)})")
+        all_datasets = {name: all_datasets[name] for name in options['datasets']}
+    print("Loaded datasets:", list(all_datasets.keys()))
+
+    # Every finished summary is appended to <result_dir>/checkpoint.jsonl
+    checkpoint = CheckpointWriter(result_dir)
+    # Per-sample summaries, P/R/F and timings of every dataset and model go to one columnar store
+    results_writer = ResultsWriter(result_dir, options['output_format'])
+
+    # Sample CPU/RAM in the background; the summarizer loops only read the latest snapshot
+    monitor = get_monitor(interval=options['monitor_interval']).start()
+
+    if options['sequential'] or len(models) == 1:
+        # K replicas with a fixed thread count each; a single replica runs in this process
+        scheduler = InferenceScheduler(workers=options['workers'], threads_per_worker=options['threads'])
+        pipeline = None
+    else:
+        # Bertsum and Pegasus run at the same time, each on its own share of the cores
+        pipeline = PipelinedExecutor(models, workers=options['workers'], threads_per_worker=options['threads'])
+        scheduler = None
+
+    # Load the models once per replica; every dataset below reuses them
+    with monitor.stage('warm_up'):
+        if pipeline is not None:
+            pipeline.warm_up({model: [model_spec(model, backend)] for model in models})
+        else:
+            scheduler.warm_up([model_spec(model, backend) for model in models])
+    runner = pipeline or scheduler
 
-    overall_bertsum_scores = []
-    overall_pegasus_scores = []
+    # One process pool scores both models for every dataset
+    rouge_evaluator = ParallelRougeEvaluator(workers=ROUGE_WORKERS)
+
+    overall_scores = {'bertsum': [], 'pegasus': []}
+    dedup_stats = {}
 
     for dataset_name, dataset in all_datasets.items():
         print(f"\n=== Processing {dataset_name} ===")
         print(f"Dataset has {len(dataset)} samples")
 
-        # Pilih subset jika user memilih hanya beberapa data
-        if n_samples is not None:
-            dataset = list(dataset)[:n_samples]
-        else:
-            dataset = list(dataset)
+        # Reference n-gram statistics are cached on disk per dataset and shared by both models
+        reference_index = load_reference_index(dataset_name, dataset['references'])
+
+        # Pilih subset sesuai --start / --samples
+        rows = sample_range(len(dataset), options)
+        dataset = [dataset[i] for i in rows]
 
         if not dataset:
             print(f"Skipping {dataset_name}: dataset kosong")
             continue
 
+        # Wire stories repeat each other; drop near-duplicate sentences once for both models
+        if options['dedup']:
+            dataset, dedup_stats[dataset_name] = deduplicate_samples(dataset, dataset_name)
+
         references = [sample['references'] for sample in dataset]
+        if len(dataset) < reference_index.n_samples:
+            reference_index = reference_index.take(rows)
 
-        # Bertsum
-        print(f"\n--- Bertsum (Extractive) for {dataset_name} ---")
-        bertsum_summaries = bertsum_summarize(dataset)
-        bertsum_scores = evaluate_rouge_bertsum(bertsum_summaries, references)
-
-        bertsum_avg = {
-            'rouge-1': sum(s['rouge-1']['f'] for s in bertsum_scores) / len(bertsum_scores),
-            'rouge-2': sum(s['rouge-2']['f'] for s in bertsum_scores) / len(bertsum_scores),
-            'rouge-su4': sum(s['rouge-su4']['f'] for s in bertsum_scores) / len(bertsum_scores)
+        summarize_fns = {
+            'bertsum': runner.summarize_fn('bertsum', backend=backend, batch_size=options['bertsum_batch_size']),
+            'pegasus': runner.summarize_fn('pegasus', mode=pegasus_mode, backend=backend,
+                                           batch_size=options['pegasus_batch_size'])
         }
+        if pipeline is not None:
+            # Both tracks generate concurrently; finished samples are scored while generation continues
+            print(f"\n--- Bertsum (Extractive) + Pegasus (Abstractive, {pegasus_mode}) for {dataset_name} ---")
+            results = pipeline.run({
+                model: functools.partial(summarize_with_checkpoint, checkpoint, dataset_name, model, dataset, summarize_fns[model])
+                for model in models
+            }, reference_index, dataset=dataset_name)
+            bertsum_summaries, bertsum_scores = results['bertsum']
+            pegasus_summaries, pegasus_scores = results['pegasus']
 
-        print(f"Average ROUGE-1 F1: {bertsum_avg['rouge-1']:.4f}")
-        print(f"Average ROUGE-2 F1: {bertsum_avg['rouge-2']:.4f}")
-        print(f"Average ROUGE-SU4 F1: {bertsum_avg['rouge-su4']:.4f}")
-
-        save_results(dataset_name, 'bertsum', bertsum_summaries, bertsum_scores, bertsum_avg, result_dir)
-        overall_bertsum_scores.extend(bertsum_scores)
+        # Bertsum
+        if 'bertsum' in models:
+            print(f"\n--- Bertsum (Extractive) for {dataset_name} ---")
+            if pipeline is None:
+                bertsum_summaries = summarize_with_checkpoint(checkpoint, dataset_name, 'bertsum', dataset, summarize_fns['bertsum'])
+                with monitor.stage('rouge', dataset=dataset_name, model='bertsum'):
+                    bertsum_scores = rouge_evaluator.evaluate(bertsum_summaries, references, reference_index)
 
-        # Pegasus
-        print(f"\n--- Pegasus (Abstractive) for {dataset_name} ---")
-        pegasus_summaries = pegasus_summarize(dataset)
-        pegasus_scores = evaluate_rouge_pegasus(pegasus_summaries, references)
-
-        pegasus_avg = {
-            'rouge-1': sum(s['rouge-1']['f'] for s in pegasus_scores) / len(pegasus_scores),
-            'rouge-2': sum(s['rouge-2']['f'] for s in pegasus_scores) / len(pegasus_scores),
-            'rouge-su4': sum(s['rouge-su4']['f'] for s in pegasus_scores) / len(pegasus_scores)
-        }
+            print('\n'.join(format_averages(bertsum_scores)))
 
-        print(f"Average ROUGE-1 F1: {pegasus_avg['rouge-1']:.4f}")
-        print(f"Average ROUGE-2 F1: {pegasus_avg['rouge-2']:.4f}")
-        print(f"Average ROUGE-SU4 F1: {pegasus_avg['rouge-su4']:.4f}")
+            results_writer.write(dataset_name, 'bertsum', dataset, bertsum_summaries,
+                                 scores_by_sample(bertsum_scores, reference_index),
+                                 checkpoint.finish_times(dataset_name, 'bertsum'))
+            overall_scores['bertsum'].extend(bertsum_scores)
 
-        save_results(dataset_name, 'pegasus', pegasus_summaries, pegasus_scores, pegasus_avg, result_dir)
-        overall_pegasus_scores.extend(pegasus_scores)
+        # Pegasus
+        if 'pegasus' in models:
+            print(f"\n--- Pegasus (Abstractive, {pegasus_mode}) for {dataset_name} ---")
+            if pipeline is None:
+                pegasus_summaries = summarize_with_checkpoint(checkpoint, dataset_name, 'pegasus', dataset, summarize_fns['pegasus'])
+                with monitor.stage('rouge', dataset=dataset_name, model='pegasus'):
+                    pegasus_scores = rouge_evaluator.evaluate(pegasus_summaries, references, reference_index)
+
+            print('\n'.join(format_averages(pegasus_scores)))
+
+            results_writer.write(dataset_name, 'pegasus', dataset, pegasus_summaries,
+                                 scores_by_sample(pegasus_scores, reference_index),
+                                 checkpoint.finish_times(dataset_name, 'pegasus'))
+            overall_scores['pegasus'].extend(pegasus_scores)
     
+    release()
+    runner.close()
+    rouge_evaluator.close()
+    checkpoint.close()
+    results_path = results_writer.close()
+    monitor.stop()
+    monitor.save(os.path.join(result_dir, 'resource_timeline.json'))
+    tracing.save(result_dir, options['trace'] or 'chrome')
+
     # Overall averages
     print("\n=== Overall Summary ===")
-    if len(overall_bertsum_scores) > 0:
-        overall_bertsum_avg = {
-            'rouge-1': sum(s['rouge-1']['f'] for s in overall_bertsum_scores) / len(overall_bertsum_scores),
-            'rouge-2': sum(s['rouge-2']['f'] for s in overall_bertsum_scores) / len(overall_bertsum_scores),
-            'rouge-su4': sum(s['rouge-su4']['f'] for s in overall_bertsum_scores) / len(overall_bertsum_scores)
-        }
-        print("Overall Bertsum average ROUGE-1 F1:", overall_bertsum_avg['rouge-1'])
-        print("Overall Bertsum average ROUGE-2 F1:", overall_bertsum_avg['rouge-2'])
-        print("Overall Bertsum average ROUGE-SU4 F1:", overall_bertsum_avg['rouge-su4'])
-    else:
-        overall_bertsum_avg = None
-        print("Tidak ada skor Bertsum yang dihitung.")
-
-    if len(overall_pegasus_scores) > 0:
-        overall_pegasus_avg = {
-            'rouge-1': sum(s['rouge-1']['f'] for s in overall_pegasus_scores) / len(overall_pegasus_scores),
-            'rouge-2': sum(s['rouge-2']['f'] for s in overall_pegasus_scores) / len(overall_pegasus_scores),
-            'rouge-su4': sum(s['rouge-su4']['f'] for s in overall_pegasus_scores) / len(overall_pegasus_scores)
-        }
-        print("Overall Pegasus average ROUGE-1 F1:", overall_pegasus_avg['rouge-1'])
-        print("Overall Pegasus average ROUGE-2 F1:", overall_pegasus_avg['rouge-2'])
-        print("Overall Pegasus average ROUGE-SU4 F1:", overall_pegasus_avg['rouge-su4'])
-    else:
-        overall_pegasus_avg = None
-        print("Tidak ada skor Pegasus yang dihitung.")
+    cache_stats = get_summary_cache().format_stats()
+    print(cache_stats)
+    summary_lines = []
+    for model_name, scores in overall_scores.items():
+        if scores:
+            summary_lines.extend(format_averages(scores, f"Overall {model_name.capitalize()} average"))
+        else:
+            summary_lines.append(f"Tidak ada skor {model_name.capitalize()} yang dihitung.")
+    if results_path is not None:
+        # Bootstrap CIs and the paired Bertsum/Pegasus test, computed from the stored per-sample scores
+        summary_lines.extend(format_comparison(compare_models(read_results(results_path))))
+    print('\n'.join(summary_lines))
 
     # Save overall results
     with open(os.path.join(result_dir, 'overall_summary.txt'), 'w') as f:
-        if overall_bertsum_avg:
-            f.write("Overall Bertsum average ROUGE-1 F1: {:.4f}\n".format(overall_bertsum_avg['rouge-1']))
-            f.write("Overall Bertsum average ROUGE-2 F1: {:.4f}\n".format(overall_bertsum_avg['rouge-2']))
-            f.write("Overall Bertsum average ROUGE-SU4 F1: {:.4f}\n".format(overall_bertsum_avg['rouge-su4']))
-        else:
-            f.write("Tidak ada skor Bertsum yang dihitung.\n")
-        if overall_pegasus_avg:
-            f.write("Overall Pegasus average ROUGE-1 F1: {:.4f}\n".format(overall_pegasus_avg['rouge-1']))
-            f.write("Overall Pegasus average ROUGE-2 F1: {:.4f}\n".format(overall_pegasus_avg['rouge-2']))
-            f.write("Overall Pegasus average ROUGE-SU4 F1: {:.4f}\n".format(overall_pegasus_avg['rouge-su4']))
-        else:
-            f.write("Tidak ada skor Pegasus yang dihitung.\n")
\ No newline at end of file
+        f.write('\n'.join(summary_lines) + '\n')
+        f.write(f"{cache_stats}\n")
+        for dataset_name, stats in dedup_stats.items():
+            f.write(f"[Dedup] {dataset_name}: {stats['sentences_before']} -> {stats['sentences_after']} kalimat, "
+                    f"-{stats['reduction'] * 100:.1f}% chars\n")
\ No newline at end of file
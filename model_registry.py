@@ -0,0 +1,100 @@
+"""Process-wide registry so each summarization model is loaded only once per run.
+
+Models are keyed by (kind, model name, device, dtype) and loaded lazily on first
+use. Loading is guarded by a per-key lock, so concurrent callers asking for the
+same model wait for a single load instead of deserializing the weights twice.
+"""
+import gc
+import threading
+
+_models = {}
+_key_locks = {}
+_registry_lock = threading.Lock()
+_loaders = {}
+
+def _normalize_dtype(dtype):
+    if dtype is None:
+        return None
+    return str(dtype).replace('torch.', '')
+
+def _torch_dtype(dtype):
+    import torch
+    return getattr(torch, dtype) if dtype is not None else None
+
+def _load_encoder(name, device, dtype):
+    from transformers import AutoModel, AutoTokenizer
+    tokenizer = AutoTokenizer.from_pretrained(name)
+    kwargs = {'torch_dtype': _torch_dtype(dtype)} if dtype is not None else {}
+    model = AutoModel.from_pretrained(name, **kwargs).to(device)
+    model.eval()
+    return tokenizer, model
+
+def _load_seq2seq(name, device, dtype):
+    from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
+    tokenizer = AutoTokenizer.from_pretrained(name)
+    kwargs = {'torch_dtype': _torch_dtype(dtype)} if dtype is not None else {}
+    model = AutoModelForSeq2SeqLM.from_pretrained(name, **kwargs).to(device)
+    model.eval()
+    return tokenizer, model
+
+def register_loader(kind, loader):
+    """Register a loader `loader(name, device, dtype)` for a model kind."""
+    _loaders[kind] = loader
+
+register_loader('encoder', _load_encoder)
+register_loader('seq2seq', _load_seq2seq)
+
+def _make_key(kind, name, device, dtype):
+    return (kind, name, str(device), _normalize_dtype(dtype))
+
+def get_model(kind, name, device='cpu', dtype=None):
+    """
+    Return the model registered under (kind, name, device, dtype), loading it on first use.
+
+    Args:
+        kind: Loader kind ('encoder' and 'seq2seq' return (tokenizer, model))
+        name: Hugging Face model name
+        device: Torch device string
+        dtype: Optional torch dtype or its name (e.g. 'float16'); None keeps the checkpoint default
+    """
+    if kind not in _loaders:
+        raise ValueError(f"Unknown model kind: {kind}")
+    key = _make_key(kind, name, device, dtype)
+    model = _models.get(key)
+    if model is not None:
+        return model
+    with _registry_lock:
+        key_lock = _key_locks.setdefault(key, threading.Lock())
+    with key_lock:
+        model = _models.get(key)
+        if model is None:
+            print(f"[Registry] Loading {kind} model {name} ({key[2]}, {key[3] or 'default'})...")
+            model = _loaders[kind](name, key[2], key[3])
+            _models[key] = model
+    return model
+
+def warm_up(specs):
+    """Load every (kind, name[, device[, dtype]]) spec ahead of time."""
+    for spec in specs:
+        get_model(*spec)
+
+def release(kind=None, name=None):
+    """Drop loaded models matching kind/name (all models when both are None) and free their memory."""
+    with _registry_lock:
+        keys = [key for key in _models if (kind is None or key[0] == kind) and (name is None or key[1] == name)]
+        for key in keys:
+            del _models[key]
+            _key_locks.pop(key, None)
+    if keys:
+        gc.collect()
+        try:
+            import torch
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+        except ImportError:
+            pass
+    return len(keys)
+
+def loaded_models():
+    """Return the keys of all currently loaded models."""
+    return list(_models.keys())
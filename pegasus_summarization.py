@@ -1,38 +1,152 @@
-from transformers import pipeline
+import time
+import torch
 from load_data import load_duc2006_data
-from rouge_metric import PyRouge
-import psutil
+from rouge_scorer import evaluate_rouge
+from model_registry import get_model
+from backends import backend_kind
+from resource_monitor import get_monitor
+from summary_cache import cached_summarize
+from chunking import token_chunks
+from tracing import span
 
-def pegasus_summarize(dataset):
-    summarizer = pipeline("summarization", model="google/pegasus-xsum")
-    summaries = []
-    for idx, sample in enumerate(dataset):
-        print(f"[Pegasus] Memproses sample ke-{idx+1} dari {len(dataset)}...")
-        article = sample['article'][:1024]  # Limit length for Pegasus
-        print(f"Article length (chars): {len(article)}")
-        # Log CPU and RAM usage
-        cpu_percent = psutil.cpu_percent(interval=1)
-        ram = psutil.virtual_memory()
-        print(f"[Resource] CPU Usage: {cpu_percent}% | RAM Usage: {ram.percent}%")
-        summary = summarizer(article, max_length=150, min_length=30, do_sample=False)[0]['summary_text']
+MODEL_NAME = "google/pegasus-xsum"
+GENERATION_KWARGS = {'max_length': 150, 'min_length': 30, 'do_sample': False}
+MAX_ARTICLE_CHARS = 1024
+# Hierarchical mode: chunk summaries are short, the final summary uses GENERATION_KWARGS
+CHUNK_TOKENS = 512
+CHUNK_GENERATION_KWARGS = {'max_length': 64, 'min_length': 10, 'do_sample': False}
+MAX_REDUCE_LEVELS = 4
+MODES = ('truncate', 'hierarchical')
+
+def length_sorted_batches(lengths, batch_size):
+    # Group indices by descending length so each batch pads to a similar size
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i], reverse=True)
+    for start in range(0, len(order), batch_size):
+        yield order[start:start + batch_size]
+
+def generate_batched(model, tokenizer, articles, batch_size=8, log_prefix="[Pegasus]", on_summary=None, **generate_kwargs):
+    """
+    Generate summaries for a list of articles using length-sorted, padded batches.
+
+    Articles are tokenized once, grouped into buckets of similar length and padded
+    only within a bucket. The returned list follows the order of `articles`;
+    `on_summary(index, summary)` is called for each sample when its batch finishes.
+    """
+    if not articles:
+        return []
+    kwargs = dict(GENERATION_KWARGS)
+    kwargs.update(generate_kwargs)
+
+    monitor = get_monitor()
+    with monitor.stage('pegasus.tokenize', samples=len(articles)):
+        encoded = tokenizer(articles, truncation=True)['input_ids']
+    lengths = [len(ids) for ids in encoded]
+    summaries = [None] * len(articles)
+    done = 0
+    for batch_indices in length_sorted_batches(lengths, batch_size):
+        done += len(batch_indices)
+        print(f"{log_prefix} Batch {len(batch_indices)} sample (max {lengths[batch_indices[0]]} token) - {done}/{len(articles)}")
+        print(monitor.format_latest())
+        batch_start = time.perf_counter()
+        inputs = tokenizer.pad({'input_ids': [encoded[i] for i in batch_indices]}, padding='longest', return_tensors='pt')
+        inputs = {key: value.to(model.device) for key, value in inputs.items()}
+        with span('pegasus.generate', batch_size=len(batch_indices), max_tokens=lengths[batch_indices[0]]), torch.no_grad():
+            output_ids = model.generate(**inputs, **kwargs)
+        with span('pegasus.decode', batch_size=len(batch_indices)):
+            texts = tokenizer.batch_decode(output_ids, skip_special_tokens=True, clean_up_tokenization_spaces=True)
+        # Samples in a batch share the generate call, so each gets the per-sample share of its time
+        per_sample = (time.perf_counter() - batch_start) / len(batch_indices)
+        for i, text in zip(batch_indices, texts):
+            summaries[i] = text.strip()
+            monitor.record_sample('pegasus.generate', i, per_sample, input_tokens=lengths[i], batch_size=len(batch_indices))
+            if on_summary is not None:
+                on_summary(i, summaries[i])
+    return summaries
+
+def _generate_summaries(articles, batch_size, device, dtype, backend='fp32', on_summary=None):
+    tokenizer, model = get_model(backend_kind('seq2seq', backend), MODEL_NAME, device, dtype)
+    with get_monitor().stage('pegasus.summarize', samples=len(articles)):
+        summaries = generate_batched(model, tokenizer, articles, batch_size=batch_size, on_summary=on_summary)
+    for summary in summaries:
+        print(f"Generated summary length (chars): {len(summary)}")
+        print(f"Generated Summary: {summary}\n")
+    return summaries
+
+def _summarize_texts(texts, generation_kwargs, stage, batch_size, device, dtype, backend, use_cache, on_summary=None):
+    """One batched (and cached) generation pass of the hierarchical mode."""
+    def generate(missing, callback):
+        tokenizer, model = get_model(backend_kind('seq2seq', backend), MODEL_NAME, device, dtype)
+        with get_monitor().stage(f'pegasus.{stage}', samples=len(missing)):
+            return generate_batched(model, tokenizer, missing, batch_size=batch_size, log_prefix=f"[Pegasus:{stage}]",
+                                    on_summary=callback, **generation_kwargs)
+
+    if not use_cache:
+        return generate(texts, on_summary)
+    params = dict(generation_kwargs, stage=stage, chunk_tokens=CHUNK_TOKENS, dtype=dtype, backend=backend)
+    return cached_summarize(MODEL_NAME, params, texts, generate, on_summary)
+
+def hierarchical_summarize(articles, batch_size=8, device='cpu', dtype=None, use_cache=True, on_summary=None, backend='fp32'):
+    """
+    Map-reduce summarization of full-length articles.
+
+    Every article is split into sentence-aligned chunks that fit the encoder
+    (CHUNK_TOKENS). The chunks of all articles are summarized together in
+    length-sorted batches, and each article's chunk summaries are joined. If the
+    joined text still does not fit, it is chunked and summarized again. The
+    final pass summarizes the joined text with GENERATION_KWARGS. Chunk
+    summaries are cached by chunk text, so overlapping or re-run inputs only
+    pay for new chunks.
+    """
+    tokenizer, _ = get_model(backend_kind('seq2seq', backend), MODEL_NAME, device, dtype)
+    max_tokens = min(CHUNK_TOKENS, tokenizer.model_max_length)
+    texts = list(articles)
+    for level in range(MAX_REDUCE_LEVELS):
+        chunks = [token_chunks(tokenizer, text, max_tokens) for text in texts]
+        long_texts = [i for i, text_chunks in enumerate(chunks) if len(text_chunks) > 1]
+        if not long_texts:
+            break
+        flat = [chunk for i in long_texts for chunk in chunks[i]]
+        print(f"[Pegasus] Level {level + 1}: {len(flat)} chunk dari {len(long_texts)} artikel")
+        chunk_summaries = iter(_summarize_texts(flat, CHUNK_GENERATION_KWARGS, 'chunk', batch_size, device, dtype, backend, use_cache))
+        for i in long_texts:
+            texts[i] = ' '.join(next(chunk_summaries) for _ in chunks[i])
+    # Anything still too long after MAX_REDUCE_LEVELS is truncated by the tokenizer
+    summaries = _summarize_texts(texts, GENERATION_KWARGS, 'reduce', batch_size, device, dtype, backend, use_cache, on_summary)
+    for summary in summaries:
         print(f"Generated summary length (chars): {len(summary)}")
-        summaries.append(summary)
         print(f"Generated Summary: {summary}\n")
     return summaries
 
-def evaluate_rouge(predictions, reference_lists):
-    # Initialize PyRouge for ROUGE1, ROUGE2, and ROUGE SU4
-    rouge = PyRouge(rouge_n=(1, 2), rouge_su=True, skip_gap=4, multi_ref_mode='best', alpha=0.5)
-    scores = []
-    for pred, references in zip(predictions, reference_lists):
-        if not references:
-            continue
-        # Evaluate with multiple references
-        hypotheses = [pred]
-        multi_references = [references]
-        score = rouge.evaluate(hypotheses, multi_references)
-        scores.append(score)
-    return scores
+def pegasus_summarize(dataset, batch_size=8, device='cpu', dtype=None, use_cache=True, on_summary=None, mode='truncate',
+                      backend='fp32'):
+    """
+    Abstractive summaries for every sample; `on_summary(index, summary)` is called as each one finishes.
+
+    `mode='truncate'` summarizes the first MAX_ARTICLE_CHARS characters of each
+    article. `mode='hierarchical'` covers the whole article via hierarchical_summarize.
+    `backend` is one of backends.BACKENDS ('fp32', 'int8', 'onnx').
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown Pegasus mode {mode!r}, expected one of {MODES}")
+    if mode == 'hierarchical':
+        articles = [sample['article'] for sample in dataset]
+        print(f"[Pegasus] Hierarchical mode: {len(articles)} artikel, total {sum(len(a) for a in articles)} chars")
+        return hierarchical_summarize(articles, batch_size, device, dtype, use_cache, on_summary, backend)
+
+    articles = []
+    for idx, sample in enumerate(dataset):
+        print(f"[Pegasus] Memproses sample ke-{idx+1} dari {len(dataset)}...")
+        article = sample['article'][:MAX_ARTICLE_CHARS]  # Limit length for Pegasus
+        print(f"Article length (chars): {len(article)}")
+        articles.append(article)
+
+    if not use_cache:
+        return _generate_summaries(articles, batch_size, device, dtype, backend, on_summary)
+    # The batch size does not change the output, so it is not part of the cache key
+    params = dict(GENERATION_KWARGS, max_article_chars=MAX_ARTICLE_CHARS, dtype=dtype, backend=backend)
+    return cached_summarize(MODEL_NAME, params, articles,
+                            lambda missing, callback: _generate_summaries(missing, batch_size, device, dtype, backend, callback),
+                            on_summary)
 
 if __name__ == "__main__":
     dataset = load_duc2006_data()
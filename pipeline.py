@@ -0,0 +1,177 @@
+"""Concurrent Bertsum + Pegasus tracks with ROUGE scoring that overlaps generation.
+
+Running the two summarizers back to back leaves most cores idle during the
+small DistilBERT job, and the Pegasus job cannot start until it is done.
+PipelinedExecutor splits one core budget between the model tracks, weighted by
+TRACK_WEIGHTS. Each track gets its own InferenceScheduler, whose replicas are
+pinned to the track's share. The tracks then run at the same time. Finished
+summaries are scored in chunks on a scoring thread while generation goes on,
+so the wall-clock time of a dataset is close to that of the slowest track
+rather than the sum of both.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from inference_scheduler import InferenceScheduler, available_cores
+from resource_monitor import get_monitor
+from rouge_scorer import evaluate_rouge
+
+TRACK_WEIGHTS = {'bertsum': 1, 'pegasus': 3}  # Pegasus decoding costs several times more than the encoder pass
+SCORE_CHUNK = 32
+
+def split_core_budget(models, cores=None, weights=TRACK_WEIGHTS):
+    """
+    Divide `cores` into one contiguous share per model, proportional to `weights`.
+
+    Every model gets at least one core. With fewer cores than models the shares
+    overlap, so the tracks time-share the same cores.
+    """
+    cores = list(cores) if cores is not None else available_cores()
+    if len(cores) < len(models):
+        print(f"[Pipeline] Peringatan: {len(models)} track berbagi {len(cores)} core")
+        return {model: [cores[i % len(cores)]] for i, model in enumerate(models)}
+    total = sum(weights.get(model, 1) for model in models)
+    shares = {}
+    start = 0
+    for i, model in enumerate(models):
+        remaining = len(models) - i - 1
+        if remaining == 0:
+            size = len(cores) - start
+        else:
+            size = round(len(cores) * weights.get(model, 1) / total)
+            size = min(max(size, 1), len(cores) - start - remaining)
+        shares[model] = cores[start:start + size]
+        start += size
+    return shares
+
+class IncrementalScorer:
+    """
+    Score summaries of one track in chunks as they arrive.
+
+    `add(index, summary)` buffers a finished sample; every `chunk_size` samples
+    the buffer is scored on `executor` against the matching rows of the
+    reference index. `finish()` scores the rest and returns the per-sample
+    scores in dataset order, exactly as `evaluate_rouge` over the whole list
+    would (samples without references are skipped).
+    """
+
+    def __init__(self, reference_index, executor, chunk_size=SCORE_CHUNK):
+        self.reference_index = reference_index
+        self.executor = executor
+        self.chunk_size = chunk_size
+        self._buffer = []
+        self._futures = []
+
+    def add(self, index, summary):
+        self._buffer.append((index, summary))
+        if len(self._buffer) >= self.chunk_size:
+            self._flush()
+
+    def _flush(self):
+        if self._buffer:
+            self._futures.append(self.executor.submit(_score_chunk, self.reference_index, self._buffer))
+            self._buffer = []
+
+    def finish(self):
+        self._flush()
+        scored = {}
+        for future in self._futures:
+            scored.update(future.result())
+        self._futures = []
+        return [scored[i] for i in sorted(scored)]
+
+def _score_chunk(reference_index, items):
+    indices = [index for index, _ in items]
+    subset = reference_index.take(indices)
+    scores = iter(evaluate_rouge([summary for _, summary in items], None, subset))
+    return {index: next(scores) for index, keep in zip(indices, subset.has_references()) if keep}
+
+class PipelinedExecutor:
+    """
+    Run several summarizer tracks at once on a shared core budget.
+
+    Args:
+        models: Track names ('bertsum', 'pegasus') in core-allocation order
+        workers: Replicas per track
+        threads_per_worker: Torch threads per replica (default: the track's share / workers)
+        cores: Core ids to divide between the tracks (default: all available)
+        score_chunk: Summaries per overlapped ROUGE scoring task
+    """
+
+    def __init__(self, models=('bertsum', 'pegasus'), workers=1, threads_per_worker=None, cores=None,
+                 score_chunk=SCORE_CHUNK):
+        self.models = list(models)
+        self.score_chunk = score_chunk
+        self.core_shares = split_core_budget(self.models, cores)
+        # Every track runs in its own processes, so each has a torch thread pool sized to its share
+        self.schedulers = {
+            model: InferenceScheduler(workers=workers, threads_per_worker=threads_per_worker,
+                                      cores=self.core_shares[model], isolated=True, name=model)
+            for model in self.models
+        }
+        self._scoring = ThreadPoolExecutor(max_workers=1, thread_name_prefix='rouge')
+
+    def warm_up(self, specs):
+        """Load the models of every track in parallel; `specs` maps a track to its model_registry specs."""
+        with ThreadPoolExecutor(max_workers=len(self.models)) as pool:
+            for future in [pool.submit(self.schedulers[model].warm_up, specs[model]) for model in self.models]:
+                future.result()
+
+    def summarize_fn(self, model, **summarize_kwargs):
+        return self.schedulers[model].summarize_fn(model, **summarize_kwargs)
+
+    def run(self, tracks, reference_index, **stage_info):
+        """
+        Run the tracks concurrently and score them while they generate.
+
+        Args:
+            tracks: {model: run(on_summary)}; each callable summarizes the whole
+                dataset, calls `on_summary(index, summary)` per finished sample
+                and returns the summaries in order (e.g. a summarize_with_checkpoint call)
+            reference_index: ReferenceIndex of the dataset, one row per sample
+
+        Returns:
+            {model: (summaries, scores)}
+        """
+        monitor = get_monitor()
+        results = {}
+        durations = {}
+        errors = []
+
+        def run_track(model, track):
+            scorer = IncrementalScorer(reference_index, self._scoring, self.score_chunk)
+            start = time.perf_counter()
+            try:
+                with monitor.stage('pipeline.track', model=model, **stage_info):
+                    summaries = track(scorer.add)
+                durations[model] = time.perf_counter() - start
+                with monitor.stage('rouge', model=model, **stage_info):
+                    results[model] = (summaries, scorer.finish())
+                print(f"[Pipeline] {model} selesai dalam {durations[model]:.1f}s")
+            except BaseException as e:
+                errors.append(e)
+
+        start = time.perf_counter()
+        threads = [threading.Thread(target=run_track, args=(model, tracks[model]), name=f'track-{model}')
+                   for model in self.models if model in tracks]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if errors:
+            raise errors[0]
+        wall = time.perf_counter() - start
+        print(f"[Pipeline] Wall-clock {wall:.1f}s (jumlah per track {sum(durations.values()):.1f}s)")
+        return {model: results[model] for model in self.models if model in results}
+
+    def close(self):
+        for scheduler in self.schedulers.values():
+            scheduler.close()
+        self._scoring.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
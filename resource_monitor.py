@@ -0,0 +1,173 @@
+"""Background CPU/RAM sampler shared by the summarization loops.
+
+A daemon thread samples process CPU, RSS and peak RSS every `interval` seconds,
+so hot loops only read the latest snapshot instead of blocking on
+`psutil.cpu_percent(interval=...)`. Stage and per-sample timings are recorded
+together with the snapshot taken when they finish, and the whole timeline can
+be written next to the run results. Peak RSS also takes the kernel's own
+high-water mark (ru_maxrss), so spikes between two samples are not missed.
+"""
+import collections
+import json
+import os
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+import psutil
+
+import tracing
+
+DEFAULT_INTERVAL = 0.5  # Seconds between samples
+
+def max_rss():
+    """Peak RSS of this process in bytes as tracked by the kernel."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024  # bytes on macOS, KiB elsewhere
+
+class ResourceMonitor:
+    def __init__(self, interval=DEFAULT_INTERVAL):
+        self.interval = interval
+        self._process = psutil.Process()
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._start_time = time.perf_counter()
+        self._start_wall = time.time()
+        self._peak_rss = 0
+        self._latest = None
+        self.samples = []
+        self.events = []
+
+    def _elapsed(self):
+        return round(time.perf_counter() - self._start_time, 4)
+
+    def _read(self):
+        # cpu_percent(interval=None) is non-blocking: it reports usage since the previous call
+        rss = self._process.memory_info().rss
+        # latest() may read from a caller thread while the sampler thread runs
+        with self._lock:
+            self._peak_rss = max(self._peak_rss, rss, max_rss())
+            peak_rss = self._peak_rss
+        return {
+            't': self._elapsed(),
+            'cpu_percent': self._process.cpu_percent(interval=None),
+            'system_cpu_percent': psutil.cpu_percent(interval=None),
+            'rss_mb': round(rss / 1024 ** 2, 1),
+            'peak_rss_mb': round(peak_rss / 1024 ** 2, 1),
+            'ram_percent': psutil.virtual_memory().percent
+        }
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            snapshot = self._read()
+            with self._lock:
+                self._latest = snapshot
+                self.samples.append(snapshot)
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return self
+        self._stop_event.clear()
+        self._latest = self._read()
+        self._thread = threading.Thread(target=self._run, name='resource-monitor', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop_event.set()
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def keep_last(self, n):
+        """Bound the in-memory history to the last `n` samples and events, for long-running processes."""
+        with self._lock:
+            self.samples = collections.deque(self.samples, maxlen=n)
+            self.events = collections.deque(self.events, maxlen=n)
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def latest(self):
+        """Return the most recent snapshot without blocking."""
+        with self._lock:
+            snapshot = self._latest
+        if snapshot is None or not self.running:
+            snapshot = self._read()
+        return dict(snapshot)
+
+    def _record(self, event):
+        with self._lock:
+            self.events.append(event)
+
+    def record_sample(self, stage, index, duration, **info):
+        """Record the timing of one processed sample together with the latest resource snapshot."""
+        event = {'type': 'sample', 'stage': stage, 'index': index, 'end': self._elapsed(),
+                 'duration': round(duration, 4), 'resources': self.latest()}
+        event.update(info)
+        self._record(event)
+
+    @contextmanager
+    def stage(self, name, **info):
+        """Time a pipeline stage and record it with the resource snapshot at its end (and as a trace span)."""
+        start = self._elapsed()
+        try:
+            with tracing.span(name, **info):
+                yield
+        finally:
+            end = self._elapsed()
+            event = {'type': 'stage', 'stage': name, 'start': start, 'end': end,
+                     'duration': round(end - start, 4), 'resources': self.latest()}
+            event.update(info)
+            self._record(event)
+
+    def format_latest(self):
+        snapshot = self.latest()
+        return (f"[Resource] CPU Usage: {snapshot['system_cpu_percent']}% | RAM Usage: {snapshot['ram_percent']}% "
+                f"| RSS: {snapshot['rss_mb']} MB (peak {snapshot['peak_rss_mb']} MB)")
+
+    def save(self, path):
+        """Write the sampled timeline and recorded events as JSON."""
+        with self._lock:
+            self._peak_rss = max(self._peak_rss, max_rss())
+            timeline = {
+                'started_at': self._start_wall,
+                'interval': self.interval,
+                'peak_rss_mb': round(self._peak_rss / 1024 ** 2, 1),
+                'samples': list(self.samples),
+                'events': list(self.events)
+            }
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(timeline, f, indent=2)
+        return path
+
+_monitor = None
+_monitor_lock = threading.Lock()
+
+def get_monitor(interval=None):
+    """
+    Return the process-wide monitor (created on first use, started by the entry points).
+
+    Without `interval` the existing monitor is returned unchanged (new monitors
+    sample every DEFAULT_INTERVAL seconds). An explicit `interval` replaces the
+    sampling interval of the existing monitor; a running sampler picks it up
+    after its current wait.
+    """
+    global _monitor
+    with _monitor_lock:
+        if _monitor is None:
+            _monitor = ResourceMonitor(interval or DEFAULT_INTERVAL)
+        elif interval is not None and _monitor.interval != interval:
+            _monitor.interval = interval
+        return _monitor
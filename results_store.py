@@ -0,0 +1,210 @@
+"""Columnar per-sample results of a run.
+
+ResultsWriter streams one record per (dataset, model, sample) into
+`results.parquet` (zstd) or `results.jsonl.gz` in the run folder. Records are
+buffered and written every `buffer_rows` rows, as a Parquet row group or one
+block of gzip'ed lines. A record holds the sample id, the summary, P/R/F of
+every metric in SCORE_METRICS in its own column and `finished_after_s`, the
+seconds from the start of the summarizer call until the sample was done (see
+checkpoint). Articles and references are not copied; the id points back into
+the dataset (the CNN/DM `id` column, or `<DUC folder>/<topic>` for DUC).
+
+The file is written to a temporary name and moved into place on close, so a
+crashed run never leaves a half-written store. The text reports that used to
+be written for every run are rendered from the store on demand:
+
+    python results_store.py results/<run>/results.parquet --model pegasus
+"""
+import gzip
+import json
+import os
+
+from rouge_scorer import SCORE_METRICS
+from tracing import span
+
+RESULT_FORMATS = ('parquet', 'jsonl')
+RESULT_FILES = {'parquet': 'results.parquet', 'jsonl': 'results.jsonl.gz'}
+BUFFER_ROWS = 1024
+SCORE_FIELDS = ('p', 'r', 'f')
+
+def sample_id(sample, index):
+    """Stable id of a dataset sample: its own `id`, else `<dataset>/<topic>`, else the row index."""
+    if sample.get('id'):
+        return str(sample['id'])
+    if sample.get('dataset') and sample.get('topic'):
+        return f"{sample['dataset']}/{sample['topic']}"
+    return str(index)
+
+def metric_column(metric, field):
+    # 'rouge-su4' + 'f' -> 'rouge_su4_f', so columns are plain identifiers in pandas/SQL
+    return f"{metric.replace('-', '_')}_{field}"
+
+class ResultsWriter:
+    """
+    Args:
+        result_dir: Run folder; the store is written to RESULT_FILES[output_format] in it
+        output_format: 'parquet' or 'jsonl' (gzip-compressed)
+        buffer_rows: Records kept in memory between writes
+        metrics: Metrics that get score columns. The columns are fixed up front, so
+            they do not depend on whether the first records written have scores
+    """
+
+    def __init__(self, result_dir, output_format='parquet', buffer_rows=BUFFER_ROWS, metrics=SCORE_METRICS):
+        if output_format not in RESULT_FORMATS:
+            raise ValueError(f"Unknown results format {output_format!r}, expected one of {RESULT_FORMATS}")
+        os.makedirs(result_dir, exist_ok=True)
+        self.output_format = output_format
+        self.buffer_rows = buffer_rows
+        self.path = os.path.join(result_dir, RESULT_FILES[output_format])
+        self._tmp_path = self.path + '.tmp'
+        self._buffer = []
+        self.metrics = tuple(metrics)
+        self._schema = None
+        self._writer = None
+        self.rows = 0
+
+    def write(self, dataset_name, model_name, samples, summaries, scores, finish_times=None):
+        """
+        Add the records of one (dataset, model) pass.
+
+        Args:
+            samples: The dataset rows the summaries belong to (only their ids are stored)
+            summaries: One summary per sample
+            scores: {sample index: metric dict ({metric: {'p', 'r', 'f'}})}; samples without
+                one (no references) get empty score columns, see rouge_scorer.scores_by_sample
+            finish_times: {sample index: seconds}, e.g. CheckpointWriter.finish_times()
+        """
+        finish_times = finish_times or {}
+        with span('save_results', dataset=dataset_name, model=model_name, samples=len(summaries)):
+            for i, summary in enumerate(summaries):
+                self._add(dataset_name, model_name, i, sample_id(samples[i], i), summary, scores.get(i),
+                          finish_times.get(i))
+
+    def _add(self, dataset_name, model_name, index, sid, summary, score, finished_after):
+        unknown = set(score or ()).difference(self.metrics)
+        if unknown:
+            raise ValueError(f"Scores for {sorted(unknown)} have no column, expected metrics {self.metrics}")
+        record = {'dataset': dataset_name, 'model': model_name, 'index': index, 'id': sid, 'summary': summary}
+        for metric in self.metrics:
+            values = score.get(metric) if score else None
+            for field in SCORE_FIELDS:
+                record[metric_column(metric, field)] = values[field] if values else None
+        record['finished_after_s'] = finished_after
+        self._buffer.append(record)
+        if len(self._buffer) >= self.buffer_rows:
+            self._flush()
+
+    def _flush(self):
+        if not self._buffer:
+            return
+        if self.output_format == 'jsonl':
+            if self._writer is None:
+                self._writer = gzip.open(self._tmp_path, 'wt', encoding='utf-8')
+            self._writer.write(''.join(json.dumps(record, ensure_ascii=False) + '\n' for record in self._buffer))
+        else:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            if self._writer is None:
+                fields = [('dataset', pa.string()), ('model', pa.string()), ('index', pa.int32()), ('id', pa.string()),
+                          ('summary', pa.string())]
+                fields += [(metric_column(metric, field), pa.float64()) for metric in self.metrics
+                           for field in SCORE_FIELDS]
+                fields.append(('finished_after_s', pa.float64()))
+                self._schema = pa.schema(fields)
+                self._writer = pq.ParquetWriter(self._tmp_path, self._schema, compression='zstd')
+            self._writer.write_table(pa.Table.from_pylist(self._buffer, schema=self._schema))
+        self.rows += len(self._buffer)
+        self._buffer = []
+
+    def close(self):
+        """Write the remaining records and move the finished store into place."""
+        self._flush()
+        if self._writer is None:
+            return None
+        self._writer.close()
+        self._writer = None
+        os.replace(self._tmp_path, self.path)
+        print(f"[Results] {self.rows} record disimpan di {self.path}")
+        return self.path
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+def find_results(path):
+    """The store file itself, or the store inside a run folder; None if the folder has none."""
+    if not os.path.isdir(path):
+        return path
+    return next((os.path.join(path, name) for name in RESULT_FILES.values()
+                 if os.path.exists(os.path.join(path, name))), None)
+
+def read_results(path, columns=None):
+    """Load a results store (.parquet or .jsonl.gz) as a pyarrow Table, optionally only `columns`."""
+    import pyarrow as pa
+    if path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        return pq.read_table(path, columns=columns)
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        table = pa.Table.from_pylist([json.loads(line) for line in f])
+    return table.select(columns) if columns else table
+
+def metric_names(table):
+    """Metric names of a results table, in column order (e.g. ['rouge_1', 'rouge_2', 'rouge_su4'])."""
+    return [name[:-2] for name in table.column_names if name.endswith('_f') and f"{name[:-2]}_p" in table.column_names]
+
+def render_report(table, dataset=None, model=None):
+    """Plain-text report per (dataset, model): the average F1 of every metric, then each sample."""
+    import pyarrow.compute as pc
+    if dataset is not None:
+        table = table.filter(pc.equal(table['dataset'], dataset))
+    if model is not None:
+        table = table.filter(pc.equal(table['model'], model))
+    metrics = metric_names(table)
+    groups = {}
+    for record in table.to_pylist():
+        groups.setdefault((record['dataset'], record['model']), []).append(record)
+    lines = []
+    for (dataset_name, model_name), records in groups.items():
+        records.sort(key=lambda record: record['index'])
+        lines.append('=' * 80)
+        lines.append(f"{dataset_name} - {model_name.upper()} ({len(records)} samples)")
+        lines.append('=' * 80)
+        for metric in metrics:
+            values = [record[f'{metric}_f'] for record in records if record[f'{metric}_f'] is not None]
+            if values:
+                lines.append(f"Average {metric.upper().replace('_', '-')} F1: {sum(values) / len(values):.4f}")
+        lines.append('')
+        for record in records:
+            lines.append(f"Sample {record['index'] + 1} ({record['id']}):")
+            lines.append(record['summary'])
+            for metric in metrics:
+                if record[f'{metric}_f'] is not None:
+                    lines.append(f"{metric.upper().replace('_', '-')} P/R/F1: {record[f'{metric}_p']:.4f} / "
+                                 f"{record[f'{metric}_r']:.4f} / {record[f'{metric}_f']:.4f}")
+            if record['finished_after_s'] is not None:
+                lines.append(f"Selesai setelah {record['finished_after_s']:.2f}s")
+            lines.append('')
+    return '\n'.join(lines)
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Render a text report from a run's results store")
+    parser.add_argument("path", help="results.parquet or results.jsonl.gz (or the run folder)")
+    parser.add_argument("--dataset", help="Only this dataset, e.g. DUC2007 or cnn")
+    parser.add_argument("--model", choices=['bertsum', 'pegasus'])
+    parser.add_argument("--output", help="Write the report to this file instead of stdout")
+    args = parser.parse_args()
+
+    path = find_results(args.path)
+    if path is None:
+        raise SystemExit(f"Tidak ada results store di {args.path}")
+    report = render_report(read_results(path), args.dataset, args.model)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(report + '\n')
+        print(f"[Results] Laporan disimpan di {args.output}")
+    else:
+        print(report)
@@ -0,0 +1,663 @@
+"""Corpus-level ROUGE scorer backed by NumPy arrays; the one scoring layer of both entry points.
+
+Produces the same per-sample scores as
+`PyRouge(rouge_n=(1, 2), rouge_su=True, skip_gap=4, multi_ref_mode='best', alpha=0.5)`,
+but tokenizes every text once, interns tokens to integer ids and counts
+n-grams for the whole corpus with sorted integer keys instead of building a
+`Counter` of tuples per sample.
+
+Every sample is scored as {metric: {'p', 'r', 'f'}} with the metrics in
+SCORE_METRICS. ROUGE-L is the LCS of the whole token sequences and ROUGE-Lsum
+the summary-level union LCS over sentences, which is PyRouge's `rouge-l`.
+Tokens are PyRouge's: whitespace-separated and case-sensitive. Google's
+rouge_score lowercases and keeps only alphanumeric tokens, so its rougeL and
+rougeLsum are not comparable with these numbers. The default scorer splits
+texts into sentences at newlines when they have any (CNN/DM highlights) and
+at sentence punctuation otherwise, so single-line model output still gets a
+real summary-level score. Sentence boundaries do not change the other
+metrics. LCS tables are computed bit-parallel (Hyyro 2004): a row of the
+DP table is one Python int, so an LCS costs O(n * m / w) word operations
+instead of n * m interpreted steps.
+
+Reference-side statistics live in a `ReferenceIndex`, which is built once per
+dataset, shared by every hypothesis set scored against it and persisted under
+`cache/rouge_index/` keyed by a hash of the reference texts. Large corpora can
+be sharded across worker processes with `ParallelRougeEvaluator`.
+"""
+import glob
+import hashlib
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from cache_paths import cache_path
+from chunking import split_sentences
+from tracing import span
+
+INDEX_CACHE_DIR = 'rouge_index'  # Under the cache root, see cache_paths
+INDEX_FORMAT_VERSION = 2
+ROUGE_WORKERS = os.cpu_count() or 1  # Default size of the ParallelRougeEvaluator pool
+SCORE_METRICS = ('rouge-1', 'rouge-2', 'rouge-su4', 'rouge-l', 'rouge-lsum')
+SENTENCE_SPLITS = ('newline', 'auto')
+
+_PAIR_SHIFT = np.int64(32)
+_LOW_MASK = np.int64((1 << 32) - 1)
+
+def _f_score(precision, recall, alpha):
+    if precision == 0 or recall == 0:
+        return 0.0
+    return recall * precision / (alpha * recall + (1 - alpha) * precision)
+
+def _score(matches, hyp_size, ref_size, alpha):
+    precision = matches / hyp_size if hyp_size != 0 else 0.0
+    recall = matches / ref_size if ref_size != 0 else 0.0
+    return {'r': recall, 'p': precision, 'f': _f_score(precision, recall, alpha)}
+
+class Vocabulary:
+    """Interns tokens to integer ids starting at 1, so 0 never appears inside an n-gram key."""
+
+    def __init__(self, tokens=()):
+        self._ids = {token: i + 1 for i, token in enumerate(tokens)}
+
+    def __len__(self):
+        return len(self._ids)
+
+    def tokens(self):
+        return list(self._ids)
+
+    def encode(self, text):
+        # Same tokenization as PyRouge's default sentencizer + tokenizer, flattened
+        ids = self._ids
+        return np.fromiter((ids.setdefault(token, len(ids) + 1) for token in text.split()), dtype=np.int64)
+
+    def encode_sentences(self, sentences):
+        """Encode each sentence; the concatenation equals `encode` of the joined text."""
+        return [self.encode(sentence) for sentence in sentences]
+
+def ngram_keys(ids, n):
+    """Encode every n-gram (n <= 2) of a token id array as one int64 key."""
+    if n == 1:
+        return ids
+    if n == 2:
+        return skip_bigram_keys(ids, 0)
+    raise ValueError(f"Unsupported n-gram order: {n}")
+
+def skip_bigram_keys(ids, skip_gap):
+    """Encode the skip-bigrams with at most `skip_gap` tokens in between as int64 keys."""
+    if len(ids) < 2:
+        return np.empty(0, dtype=np.int64)
+    parts = [(ids[:-d] << _PAIR_SHIFT) | ids[d:] for d in range(1, min(len(ids), skip_gap + 2))]
+    return np.concatenate(parts)
+
+def su_keys(ids, skip_gap):
+    # PyRouge adds the unigrams of all but the last token; unigram keys (< 2**32)
+    # never collide with skip-bigram keys (>= 2**32 since ids start at 1)
+    return np.concatenate([skip_bigram_keys(ids, skip_gap), ids[:-1]])
+
+def _concat(arrays):
+    return np.concatenate(arrays) if arrays else np.empty(0, dtype=np.int64)
+
+def _match_masks(seq):
+    # Bit j of masks[token] is set where seq[j] == token
+    masks = {}
+    for j, token in enumerate(seq):
+        masks[token] = masks.get(token, 0) | (1 << j)
+    return masks
+
+def _lcs_rows(a, masks, n):
+    """
+    Bit-parallel LCS table of `a` against the sequence behind `masks` (length n).
+
+    Row i describes the DP row of a[:i]: bit j is 0 exactly where the LCS length
+    grows between b[:j] and b[:j + 1], so the LCS length is n - popcount(row).
+    """
+    full = (1 << n) - 1
+    row = full
+    rows = [row]
+    for token in a:
+        matched = row & masks.get(token, 0)
+        row = ((row + matched) | (row - matched)) & full
+        rows.append(row)
+    return rows
+
+def lcs_length(a, b):
+    """Length of the longest common subsequence of two token id lists."""
+    if not a or not b:
+        return 0
+    full = (1 << len(b)) - 1
+    masks = _match_masks(b)
+    row = full
+    for token in a:
+        matched = row & masks.get(token, 0)
+        row = ((row + matched) | (row - matched)) & full
+    return len(b) - row.bit_count()
+
+def lcs_positions(a, b, masks=None):
+    """
+    Positions in `b` of one LCS of `a` and `b`.
+
+    The traceback takes the same path as PyRouge's `_lcs_elements` (diagonal on
+    a match, else left while the row value does not drop, else up), so the
+    union over sentences matches it exactly.
+    """
+    if not a or not b:
+        return []
+    rows = _lcs_rows(a, masks or _match_masks(b), len(b))
+    positions = []
+    i, j = len(a), len(b)
+    while i > 0 and j > 0:
+        if a[i - 1] == b[j - 1]:
+            i -= 1
+            j -= 1
+            positions.append(j)
+        elif rows[i] >> (j - 1) & 1:
+            j -= 1
+        else:
+            i -= 1
+    return positions
+
+def union_lcs_matches(hyp_sentences, ref_sentences):
+    """
+    Summary-level ROUGE-L matches: per reference sentence, the union of its LCS
+    positions with every hypothesis sentence, clipped by the hypothesis unigram counts.
+    """
+    remaining = {}
+    for sentence in hyp_sentences:
+        for token in sentence:
+            remaining[token] = remaining.get(token, 0) + 1
+    matches = 0
+    for ref in ref_sentences:
+        if not ref:
+            continue
+        masks = _match_masks(ref)
+        union = set()
+        for hyp in hyp_sentences:
+            union.update(lcs_positions(hyp, ref, masks))
+        for j in union:
+            token = ref[j]
+            if remaining.get(token, 0) > 0:
+                remaining[token] -= 1
+                matches += 1
+    return matches
+
+class ReferenceIndex:
+    """
+    Reference-side n-gram statistics for a whole dataset.
+
+    For every n-gram metric the index keeps the sorted distinct n-gram keys of
+    all references and, per reference, the count of each (densely numbered)
+    n-gram. For the LCS metrics it keeps the token ids of every reference
+    sentence (`sequences`). `owner[i]` is the sample index that reference i
+    belongs to.
+    """
+
+    def __init__(self, vocab, owner, n_samples, metrics, digest=None, sequences=None):
+        self.vocab = vocab
+        self.owner = owner
+        self.n_samples = n_samples
+        self.metrics = metrics
+        self.digest = digest
+        self.sequences = sequences
+        self._ref_sentences = None
+
+    @classmethod
+    def build(cls, scorer, reference_lists):
+        vocab = Vocabulary()
+        owner = []
+        ref_keys = {name: [] for name in scorer.ngram_metric_names()}
+        ref_sentences = []
+        for sample_idx, references in enumerate(reference_lists):
+            for ref in references or []:
+                sentences = scorer.encode(vocab, ref)
+                features = scorer.extract(_concat(sentences))
+                for name, keys in features.items():
+                    ref_keys[name].append(keys)
+                ref_sentences.append(sentences)
+                owner.append(sample_idx)
+
+        metrics = {}
+        for name, keys_per_ref in ref_keys.items():
+            sizes = np.array([len(keys) for keys in keys_per_ref], dtype=np.int64)
+            all_keys = _concat(keys_per_ref)
+            keys, dense = np.unique(all_keys, return_inverse=True)
+            segments = np.repeat(np.arange(len(keys_per_ref), dtype=np.int64), sizes)
+            composite, counts = np.unique((segments << _PAIR_SHIFT) | dense.astype(np.int64), return_counts=True)
+            metrics[name] = {
+                'keys': keys,
+                'seg': composite >> _PAIR_SHIFT,
+                'dense': composite & _LOW_MASK,
+                'count': counts.astype(np.int64),
+                'sizes': sizes
+            }
+        sequences = _pack_sentences(ref_sentences) if scorer.lcs_metric_names() else None
+        return cls(vocab, np.array(owner, dtype=np.int64), len(reference_lists), metrics,
+                   digest=reference_digest(scorer, reference_lists), sequences=sequences)
+
+    def ref_sentences(self):
+        """Token id lists per sentence, per reference (for the LCS metrics)."""
+        if self._ref_sentences is None:
+            self._ref_sentences = _unpack_sentences(self.sequences)
+        return self._ref_sentences
+
+    def take(self, sample_indices):
+        """Return an index restricted to `sample_indices` (renumbered in that order)."""
+        sample_indices = np.asarray(sample_indices, dtype=np.int64)
+        new_owner_of = np.full(self.n_samples, -1, dtype=np.int64)
+        new_owner_of[sample_indices] = np.arange(len(sample_indices))
+        # Keep references of the selected samples, ordered by their new owner
+        kept = np.flatnonzero(new_owner_of[self.owner] >= 0)
+        kept = kept[np.argsort(new_owner_of[self.owner[kept]], kind='stable')]
+        new_pair_of = np.full(len(self.owner), -1, dtype=np.int64)
+        new_pair_of[kept] = np.arange(len(kept))
+
+        metrics = {}
+        for name, stats in self.metrics.items():
+            mask = new_pair_of[stats['seg']] >= 0
+            seg = new_pair_of[stats['seg'][mask]]
+            dense = stats['dense'][mask]
+            order = np.lexsort((dense, seg))
+            # Keep only the n-grams of the selected references, so a small slice pickles small
+            used = np.unique(dense)
+            metrics[name] = {
+                'keys': stats['keys'][used],
+                'seg': seg[order],
+                'dense': np.searchsorted(used, dense[order]),
+                'count': stats['count'][mask][order],
+                'sizes': stats['sizes'][kept]
+            }
+        sequences = None
+        if self.sequences is not None:
+            ref_sentences = self.ref_sentences()
+            sequences = _pack_sentences([ref_sentences[i] for i in kept.tolist()])
+        return ReferenceIndex(self.vocab, new_owner_of[self.owner[kept]], len(sample_indices), metrics,
+                              sequences=sequences)
+
+    def has_references(self):
+        return np.bincount(self.owner, minlength=self.n_samples) > 0
+
+    def save(self, path):
+        arrays = {'owner': self.owner, 'n_samples': np.int64(self.n_samples),
+                  'tokens': np.array(self.vocab.tokens(), dtype=str)}
+        for name, stats in self.metrics.items():
+            for field, values in stats.items():
+                arrays[f'{name}/{field}'] = values
+        for field, values in (self.sequences or {}).items():
+            arrays[f'sequences/{field}'] = values
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = path + '.tmp.npz'
+        np.savez(tmp_path, **arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, digest=None):
+        with np.load(path) as data:
+            metrics = {}
+            sequences = None
+            for key in data.files:
+                if key.startswith('sequences/'):
+                    sequences = sequences or {}
+                    sequences[key.split('/', 1)[1]] = data[key]
+                elif '/' in key:
+                    name, field = key.split('/', 1)
+                    metrics.setdefault(name, {})[field] = data[key]
+            return cls(Vocabulary(data['tokens'].tolist()), data['owner'], int(data['n_samples']), metrics, digest,
+                       sequences)
+
+def _pack_sentences(ref_sentences):
+    """Flatten [[sentence ids, ...] per reference] into three int64 arrays."""
+    return {
+        'tokens': _concat([np.asarray(sentence, dtype=np.int64) for sentences in ref_sentences for sentence in sentences]),
+        'sentence_sizes': np.array([len(sentence) for sentences in ref_sentences for sentence in sentences], dtype=np.int64),
+        'sentence_counts': np.array([len(sentences) for sentences in ref_sentences], dtype=np.int64),
+    }
+
+def _unpack_sentences(sequences):
+    tokens = sequences['tokens'].tolist()
+    sizes = iter(sequences['sentence_sizes'].tolist())
+    ref_sentences = []
+    start = 0
+    for count in sequences['sentence_counts'].tolist():
+        sentences = []
+        for _ in range(count):
+            size = next(sizes)
+            sentences.append(tokens[start:start + size])
+            start += size
+        ref_sentences.append(sentences)
+    return ref_sentences
+
+def reference_digest(scorer, reference_lists):
+    """Content hash of the reference texts and the scorer settings that shape the index."""
+    h = hashlib.sha256()
+    h.update(json.dumps([INDEX_FORMAT_VERSION, scorer.metric_names(), scorer.sentence_split]).encode('utf-8'))
+    for references in reference_lists:
+        h.update(json.dumps(list(references or [])).encode('utf-8'))
+    return h.hexdigest()
+
+def load_reference_index(name, reference_lists, scorer=None, cache_dir=None):
+    """
+    Load the reference index of a dataset from disk, or build and persist it.
+
+    The file name embeds the content hash of the references, so editing any gold
+    summary changes the hash and forces a rebuild; stale indexes of the same
+    dataset are removed when the new one is written.
+    """
+    scorer = scorer or get_default_scorer()
+    cache_dir = cache_dir or cache_path(INDEX_CACHE_DIR)
+    digest = reference_digest(scorer, reference_lists)
+    path = os.path.join(cache_dir, f"{name}_{digest[:16]}.npz")
+    if os.path.exists(path):
+        try:
+            with span('rouge.load_index', dataset=name):
+                return ReferenceIndex.load(path, digest)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"[ROUGE] Rebuilding unreadable reference index {path}: {e}")
+    with span('rouge.build_index', dataset=name, samples=len(reference_lists)):
+        index = ReferenceIndex.build(scorer, reference_lists)
+    for stale in glob.glob(os.path.join(cache_dir, f"{glob.escape(name)}_*.npz")):
+        if os.path.basename(stale) != os.path.basename(path):
+            os.remove(stale)
+    index.save(path)
+    return index
+
+def match_index(hyp_keys, stats, owner):
+    """
+    Compute clipped n-gram matches between every hypothesis and each of its references.
+
+    Args:
+        hyp_keys: List of int64 key arrays, one per sample
+        stats: Reference statistics of one metric from a ReferenceIndex
+        owner: Sample index of each reference
+
+    Returns:
+        (matches per reference, hypothesis sizes)
+    """
+    hyp_sizes = np.array([len(keys) for keys in hyp_keys], dtype=np.int64)
+    n_refs = len(stats['sizes'])
+    keys = stats['keys']
+    if n_refs == 0 or len(keys) == 0 or hyp_sizes.sum() == 0:
+        return np.zeros(n_refs, dtype=np.int64), hyp_sizes
+
+    # Hypothesis n-grams that never occur in any reference can only add to hyp_size
+    all_hyp = _concat(hyp_keys)
+    segments = np.repeat(np.arange(len(hyp_keys), dtype=np.int64), hyp_sizes)
+    pos = np.minimum(np.searchsorted(keys, all_hyp), len(keys) - 1)
+    known = keys[pos] == all_hyp
+    hyp_composite, hyp_count = np.unique((segments[known] << _PAIR_SHIFT) | pos[known], return_counts=True)
+    if len(hyp_composite) == 0:
+        return np.zeros(n_refs, dtype=np.int64), hyp_sizes
+
+    # Look up the hypothesis count of every reference n-gram of the owning sample
+    lookup = (owner[stats['seg']] << _PAIR_SHIFT) | stats['dense']
+    pos = np.minimum(np.searchsorted(hyp_composite, lookup), len(hyp_composite) - 1)
+    found = hyp_composite[pos] == lookup
+    overlap = np.where(found, np.minimum(hyp_count[pos], stats['count']), 0)
+    matches = np.bincount(stats['seg'], weights=overlap, minlength=n_refs).astype(np.int64)
+    return matches, hyp_sizes
+
+def aggregate_references(matches, hyp_sizes, ref_sizes, owner, multi_ref_mode):
+    """Combine per-reference matches into one (matches, hyp_size, ref_size) triple per sample."""
+    n_samples = len(hyp_sizes)
+    if multi_ref_mode == 'average':
+        total_matches = np.bincount(owner, weights=matches, minlength=n_samples).astype(np.int64)
+        total_ref = np.bincount(owner, weights=ref_sizes, minlength=n_samples).astype(np.int64)
+        n_refs = np.bincount(owner, minlength=n_samples)
+        return total_matches, hyp_sizes * n_refs, total_ref
+    if multi_ref_mode != 'best':
+        raise ValueError(f"Invalid multi_ref_mode {multi_ref_mode}: expected (average, best)")
+
+    # Pick the reference with the highest recall; ties go to the first one, like max()
+    recall = np.divide(matches, ref_sizes, out=np.zeros(len(matches)), where=ref_sizes != 0)
+    best_recall = np.full(n_samples, -1.0)
+    np.maximum.at(best_recall, owner, recall)
+    candidates = np.where(recall == best_recall[owner], np.arange(len(matches)), len(matches))
+    best = np.full(n_samples, len(matches), dtype=np.int64)
+    np.minimum.at(best, owner, candidates)
+    # Samples without references keep the sentinel and are dropped by the caller
+    padded_matches = np.append(matches, 0)
+    padded_ref_sizes = np.append(ref_sizes, 0)
+    return padded_matches[best], hyp_sizes, padded_ref_sizes[best]
+
+class RougeScorer:
+    """
+    Vectorized ROUGE-1/2/SU scorer with bit-parallel ROUGE-L/Lsum.
+
+    Args:
+        rouge_n: N-gram orders to compute (1 and/or 2)
+        rouge_su: Compute ROUGE-SU (skip-bigram plus unigram)
+        skip_gap: Maximum gap between the two words of a skip-bigram
+        multi_ref_mode: 'best' or 'average', as in PyRouge
+        alpha: Balance between recall and precision in the F-score
+        rouge_l: Compute ROUGE-L (LCS of the whole texts)
+        rouge_lsum: Compute ROUGE-Lsum (summary-level union LCS over sentences)
+        sentence_split: 'newline' (PyRouge) or 'auto' (newlines if the text has any, else punctuation)
+    """
+
+    def __init__(self, rouge_n=(1, 2), rouge_su=True, skip_gap=4, multi_ref_mode='best', alpha=0.5,
+                 rouge_l=False, rouge_lsum=False, sentence_split='newline'):
+        if sentence_split not in SENTENCE_SPLITS:
+            raise ValueError(f"Unknown sentence split {sentence_split!r}, expected one of {SENTENCE_SPLITS}")
+        self.rouge_n = tuple(rouge_n)
+        self.rouge_su = rouge_su
+        self.skip_gap = skip_gap
+        self.multi_ref_mode = multi_ref_mode
+        self.alpha = alpha
+        self.rouge_l = rouge_l
+        self.rouge_lsum = rouge_lsum
+        self.sentence_split = sentence_split
+
+    def metric_names(self):
+        return self.ngram_metric_names() + self.lcs_metric_names()
+
+    def ngram_metric_names(self):
+        names = [f'rouge-{n}' for n in self.rouge_n]
+        if self.rouge_su:
+            names.append(f'rouge-su{self.skip_gap}')
+        return names
+
+    def lcs_metric_names(self):
+        names = []
+        if self.rouge_l:
+            names.append('rouge-l')
+        if self.rouge_lsum:
+            names.append('rouge-lsum')
+        return names
+
+    def sentences(self, text):
+        """Split `text` into sentences the way the LCS metrics see them."""
+        if self.sentence_split == 'auto' and '\n' not in text.strip():
+            return split_sentences(text)
+        return text.split('\n')
+
+    def encode(self, vocab, text):
+        """Token ids of `text`, one array per sentence (a single array when no LCS metric is computed)."""
+        if not self.lcs_metric_names():
+            return [vocab.encode(text)]
+        return vocab.encode_sentences(self.sentences(text))
+
+    def extract(self, ids):
+        keys = {f'rouge-{n}': ngram_keys(ids, n) for n in self.rouge_n}
+        if self.rouge_su:
+            keys[f'rouge-su{self.skip_gap}'] = su_keys(ids, self.skip_gap)
+        return keys
+
+    def score_corpus(self, predictions, reference_lists):
+        """
+        Score each prediction against its list of references.
+
+        Samples without references are skipped, matching `evaluate_rouge`.
+        Returns one PyRouge-style dict per scored sample, e.g.
+        {'rouge-1': {'r': ..., 'p': ..., 'f': ...}, 'rouge-2': {...}, 'rouge-su4': {...}}.
+        """
+        return self.score_index(predictions, ReferenceIndex.build(self, reference_lists))
+
+    def score_index(self, predictions, index):
+        """Score predictions (one per sample of `index`, in order) against a prebuilt ReferenceIndex."""
+        if len(predictions) != index.n_samples:
+            raise ValueError(f"Expected {index.n_samples} predictions for the reference index, got {len(predictions)}")
+        hyp_sentences = [self.encode(index.vocab, pred) for pred in predictions]
+        hyp_features = [self.extract(_concat(sentences)) for sentences in hyp_sentences]
+        has_refs = index.has_references()
+        scores = [{} for _ in predictions]
+        for name in self.ngram_metric_names():
+            stats = index.metrics[name]
+            matches, hyp_sizes = match_index([features[name] for features in hyp_features], stats, index.owner)
+            self._add_scores(scores, name, matches, hyp_sizes, stats['sizes'], index.owner)
+        lcs_metrics = self.lcs_metric_names()
+        if lcs_metrics:
+            if index.sequences is None:
+                raise ValueError("The reference index was built without LCS sequences; rebuild it with this scorer")
+            hyp_lists = [[sentence.tolist() for sentence in sentences] for sentences in hyp_sentences]
+            ref_lists = index.ref_sentences()
+            hyp_sizes = np.array([sum(len(sentence) for sentence in sentences) for sentences in hyp_lists], dtype=np.int64)
+            ref_sizes = np.array([sum(len(sentence) for sentence in sentences) for sentences in ref_lists], dtype=np.int64)
+            owners = index.owner.tolist()
+            for name in lcs_metrics:
+                matches = np.zeros(len(ref_lists), dtype=np.int64)
+                for r, sentences in enumerate(ref_lists):
+                    hyp = hyp_lists[owners[r]]
+                    if name == 'rouge-l':
+                        matches[r] = lcs_length([t for sentence in hyp for t in sentence],
+                                                [t for sentence in sentences for t in sentence])
+                    else:
+                        matches[r] = union_lcs_matches(hyp, sentences)
+                self._add_scores(scores, name, matches, hyp_sizes, ref_sizes, index.owner)
+        return [score for score, keep in zip(scores, has_refs) if keep]
+
+    def _add_scores(self, scores, name, matches, hyp_sizes, ref_sizes, owner):
+        matches, hyp_sizes, ref_sizes = aggregate_references(matches, hyp_sizes, ref_sizes, owner, self.multi_ref_mode)
+        for i, (m, h, r) in enumerate(zip(matches.tolist(), hyp_sizes.tolist(), ref_sizes.tolist())):
+            scores[i][name] = _score(m, h, r, self.alpha)
+
+_default_scorer = None
+
+def get_default_scorer():
+    global _default_scorer
+    if _default_scorer is None:
+        _default_scorer = RougeScorer(rouge_n=(1, 2), rouge_su=True, skip_gap=4, multi_ref_mode='best', alpha=0.5,
+                                      rouge_l=True, rouge_lsum=True, sentence_split='auto')
+    return _default_scorer
+
+def evaluate_rouge(predictions, reference_lists, reference_index=None):
+    """
+    ROUGE-1, ROUGE-2, ROUGE-SU4, ROUGE-L and ROUGE-Lsum (best reference, alpha=0.5) per sample.
+
+    Pass a `reference_index` (see `load_reference_index`) built from the same
+    reference lists to skip re-processing the references.
+    """
+    scorer = get_default_scorer()
+    with span('rouge.evaluate', samples=len(predictions), indexed=reference_index is not None):
+        if reference_index is None:
+            return scorer.score_corpus(predictions, reference_lists)
+        return scorer.score_index(predictions, reference_index)
+
+def scores_by_sample(scores, reference_index):
+    """
+    Key the output of `evaluate_rouge` by sample index.
+
+    Samples without references are skipped when scoring, so position i of
+    `scores` is not sample i once one of them is missing. Returns
+    {sample index: score} over the samples of `reference_index` that have references.
+    """
+    indices = np.flatnonzero(reference_index.has_references()).tolist()
+    if len(indices) != len(scores):
+        raise ValueError(f"Expected {len(indices)} scores for the reference index, got {len(scores)}")
+    return dict(zip(indices, scores))
+
+def _evaluate_chunk(chunk):
+    predictions, reference_lists, reference_index = chunk
+    return evaluate_rouge(predictions, reference_lists, reference_index)
+
+class ParallelRougeEvaluator:
+    """
+    Shard ROUGE scoring across a reusable pool of worker processes.
+
+    (prediction, references) pairs are submitted in chunks of `chunk_size` and
+    the per-chunk results are reassembled in input order, so the output is the
+    same list of per-sample dicts `evaluate_rouge` returns. With a
+    `reference_index`, every chunk carries its slice of the index
+    (`ReferenceIndex.take`) instead of the reference texts, so workers never
+    re-tokenize the references. Inputs that fit in a single chunk, or
+    `workers <= 1`, are scored in-process.
+
+    Args:
+        workers: Number of worker processes (default: ROUGE_WORKERS)
+        chunk_size: Number of samples per submitted task
+    """
+
+    def __init__(self, workers=None, chunk_size=256):
+        self.workers = workers or ROUGE_WORKERS
+        self.chunk_size = chunk_size
+        self._executor = None
+
+    def _get_executor(self):
+        if self._executor is None:
+            # spawn keeps workers free of the parent's torch/tokenizer threads
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'))
+        return self._executor
+
+    def evaluate(self, predictions, reference_lists, reference_index=None):
+        predictions = list(predictions)
+        reference_lists = list(reference_lists)
+        if self.workers <= 1 or len(predictions) <= self.chunk_size:
+            return evaluate_rouge(predictions, reference_lists, reference_index)
+        executor = self._get_executor()
+        scores = []
+        with span('rouge.parallel', samples=len(predictions), workers=self.workers):
+            futures = []
+            for start in range(0, len(predictions), self.chunk_size):
+                stop = min(start + self.chunk_size, len(predictions))
+                if reference_index is not None:
+                    chunk = (predictions[start:stop], None, reference_index.take(range(start, stop)))
+                else:
+                    chunk = (predictions[start:stop], reference_lists[start:stop], None)
+                futures.append(executor.submit(_evaluate_chunk, chunk))
+            for future in futures:
+                scores.extend(future.result())
+        return scores
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+def average_f1(scores, metrics=None):
+    """Mean F1 per metric over per-sample score dicts, e.g. {'rouge-1': 0.41, ...}; {} for no scores."""
+    if not scores:
+        return {}
+    metrics = metrics or list(scores[0])
+    return {metric: float(np.mean([score[metric]['f'] for score in scores])) for metric in metrics}
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    from rouge_metric import PyRouge
+
+    from load_data import load_multiple_datasets
+    from run_options import DUC_DEFAULTS
+
+    parser = argparse.ArgumentParser(description="Time the scorer against PyRouge on the DUC gold summaries")
+    parser.add_argument("--data-dir", default=DUC_DEFAULTS['data_dir'], help="Folder with the DUC20xx folders")
+    args = parser.parse_args()
+
+    # Parity with PyRouge is checked by tests/test_rouge_scorer.py; this only compares the run time
+    for name, dataset in load_multiple_datasets(args.data_dir).items():
+        # Score each topic's first gold summary against the remaining ones
+        predictions = [sample['references'][0] for sample in dataset]
+        references = [sample['references'][1:] for sample in dataset]
+        start = time.perf_counter()
+        evaluate_rouge(predictions, references)
+        fast = time.perf_counter() - start
+        start = time.perf_counter()
+        PyRouge(rouge_n=(1, 2), rouge_l=True, rouge_su=True, skip_gap=4).evaluate(
+            predictions, references, sentencizer=get_default_scorer().sentences)
+        print(f"{name}: {fast:.2f}s vs PyRouge {time.perf_counter() - start:.2f}s")
@@ -0,0 +1,220 @@
+"""Headless run options shared by main_summarization and cnn_inference.
+
+A run is described by one flat dict of options. The layers are, in increasing
+priority: the defaults below, a TOML/YAML/JSON run-config file (`--config`),
+and command-line flags. The dict is saved as run_config.json in the result
+folder, so `--resume` replays exactly the same selection. A config file can
+also hold both entry points at once, in `[duc]` and `[cnn]` sections.
+
+Headless runs write to `<output_dir>/<run_name>`. Without a run name, the
+folder is named after a hash of the options that decide which summaries are
+produced, so rerunning the same config lands in the same folder and skips the
+samples that are already checkpointed. Throughput settings (workers, threads,
+batch sizes) and output locations are not part of that hash.
+"""
+import datetime
+import hashlib
+import json
+import os
+import sys
+
+from backends import BACKENDS, check_backend
+from cache_paths import DEFAULT_CACHE_DIR
+from extractive import EMBED_BATCH_SIZE
+from pegasus_summarization import MODES as PEGASUS_MODES
+from resource_monitor import DEFAULT_INTERVAL
+from results_store import RESULT_FORMATS as OUTPUT_FORMATS
+from tracing import FORMATS as TRACE_FORMATS, PROFILERS
+
+MODELS = ('bertsum', 'pegasus')
+CNN_SPLITS = ('test', 'validation', 'train')
+
+_COMMON_DEFAULTS = {
+    'start': 0,
+    'samples': None,  # None = every sample from `start` on
+    'models': list(MODELS),
+    'backend': 'fp32',
+    'pegasus_batch_size': 8,
+    'bertsum_batch_size': EMBED_BATCH_SIZE,
+    'workers': 1,
+    'threads': None,
+    'sequential': False,
+    'cache_dir': DEFAULT_CACHE_DIR,
+    'output_format': 'parquet',
+    'run_name': None,
+    'trace': None,  # None = tracing off; else the trace file format
+    'profile': None,
+    'profile_stages': None,  # None = profile every stage
+    'monitor_interval': DEFAULT_INTERVAL,  # Seconds between CPU/RAM samples
+}
+
+DUC_DEFAULTS = dict(_COMMON_DEFAULTS,
+    data_dir='/workspaces/summary/Dataset',
+    datasets=None,  # None = every DUC folder under data_dir
+    pegasus_mode='truncate',
+    dedup=True,
+    output_dir='results',
+)
+
+CNN_DEFAULTS = dict(_COMMON_DEFAULTS,
+    data_dir='/workspaces/summary/cnn_dailymail',
+    split='test',
+    stride=1,
+    output_dir='results_cnn',
+)
+
+CHOICES = {
+    'models': MODELS,
+    'backend': BACKENDS,
+    'pegasus_mode': PEGASUS_MODES,
+    'split': CNN_SPLITS,
+    'output_format': OUTPUT_FORMATS,
+    'trace': TRACE_FORMATS,
+    'profile': PROFILERS,
+}
+
+# Options that change speed, instrumentation or where things are written, but not the summaries
+_NOT_IN_DIGEST = ('pegasus_batch_size', 'bertsum_batch_size', 'workers', 'threads', 'sequential',
+                  'cache_dir', 'output_dir', 'run_name', 'output_format', 'trace', 'profile', 'profile_stages',
+                  'monitor_interval')
+# Options a --resume may change
+RESUME_OVERRIDES = ('workers', 'threads', 'sequential', 'cache_dir', 'trace', 'profile', 'profile_stages',
+                    'monitor_interval')
+
+def load_config_file(path, section=None):
+    """
+    Read a run-config file (.toml, .yaml/.yml or .json) into a flat dict.
+
+    If the file has a table named `section` ('duc' or 'cnn'), its keys are
+    merged over the top-level keys and the other section is ignored.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.toml':
+        import tomllib
+        with open(path, 'rb') as f:
+            config = tomllib.load(f)
+    elif extension in ('.yaml', '.yml'):
+        try:
+            import yaml
+        except ImportError:
+            raise ImportError("YAML run configs need PyYAML (pip install pyyaml); TOML and JSON work without it")
+        with open(path, 'r', encoding='utf-8') as f:
+            config = yaml.safe_load(f) or {}
+    elif extension == '.json':
+        with open(path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+    else:
+        raise ValueError(f"Unsupported run-config format {extension!r}, expected .toml, .yaml, .yml or .json")
+    sections = ('duc', 'cnn')
+    flat = {key: value for key, value in config.items() if key not in sections}
+    if section is not None and isinstance(config.get(section), dict):
+        flat.update(config[section])
+    return flat
+
+def resolve_options(defaults, *layers):
+    """
+    Merge option layers over `defaults`. Later layers win, and None values in a layer are ignored.
+
+    Raises ValueError for unknown keys or values outside CHOICES.
+    """
+    options = dict(defaults)
+    for layer in layers:
+        for key, value in (layer or {}).items():
+            if key not in defaults:
+                raise ValueError(f"Unknown run option {key!r}, expected one of {sorted(defaults)}")
+            if value is not None:
+                options[key] = value
+    if isinstance(options['models'], str):
+        options['models'] = [options['models']]
+    for key, allowed in CHOICES.items():
+        if options.get(key) is None:
+            continue
+        values = options[key] if isinstance(options[key], list) else [options[key]]
+        invalid = [value for value in values if value not in allowed]
+        if invalid:
+            raise ValueError(f"Invalid {key} {invalid}, expected one of {allowed}")
+    # Keep the models in their canonical order, so the same selection always gives the same digest
+    options['models'] = [model for model in MODELS if model in options['models']]
+    if not options['models']:
+        raise ValueError("At least one model must be selected")
+    if options['monitor_interval'] <= 0:
+        raise ValueError(f"monitor_interval must be positive, got {options['monitor_interval']}")
+    from inference_scheduler import model_kind
+    for model in options['models']:
+        check_backend(model_kind(model), options['backend'])
+    return options
+
+def options_digest(options):
+    selection = {key: value for key, value in options.items() if key not in _NOT_IN_DIGEST}
+    return hashlib.sha256(json.dumps(selection, sort_keys=True).encode('utf-8')).hexdigest()
+
+def result_dir_for(options, headless):
+    """Output folder of a new run: named and deterministic when headless, timestamped when interactive."""
+    if options['run_name']:
+        name = options['run_name']
+    elif headless:
+        name = f"run_{options_digest(options)[:12]}"
+    else:
+        name = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    return os.path.join(options['output_dir'], name)
+
+def sample_range(n_rows, options):
+    """The row indices selected by `start`, `samples` and (CNN only) `stride` out of `n_rows`."""
+    rows = range(options['start'], n_rows, options.get('stride', 1))
+    return rows if options['samples'] is None else rows[:options['samples']]
+
+def add_run_arguments(parser, defaults):
+    """Add --config, --headless and one flag per run option. Unset flags stay None, so they do not override the config."""
+    parser.add_argument("--config", metavar="FILE", help="Run-config file (.toml, .yaml or .json); flags override its values")
+    parser.add_argument("--headless", action="store_true", help="Never prompt; unset options take their defaults")
+    parser.add_argument("--data-dir", help=f"Dataset folder (default: {defaults['data_dir']})")
+    if 'datasets' in defaults:
+        parser.add_argument("--datasets", nargs='+', help="DUC folders to process, e.g. DUC2006 (default: all)")
+    if 'split' in defaults:
+        parser.add_argument("--split", choices=CNN_SPLITS, help=f"CSV split to summarize (default: {defaults['split']})")
+        parser.add_argument("--stride", type=int, help="Take every N-th row from --start on")
+    parser.add_argument("--start", type=int, help="Index of the first sample (default: 0)")
+    parser.add_argument("--samples", type=int, help="Number of samples from --start on (default: all)")
+    parser.add_argument("--models", nargs='+', choices=MODELS, help="Summarizers to run (default: both)")
+    parser.add_argument("--backend", choices=BACKENDS,
+                        help="Inference backend for both models: eager fp32, dynamic int8 or ONNX Runtime (CPU only)")
+    if 'pegasus_mode' in defaults:
+        parser.add_argument("--pegasus-mode", choices=PEGASUS_MODES,
+                            help="truncate: first 1024 chars per topic; hierarchical: map-reduce over the whole topic")
+    parser.add_argument("--pegasus-batch-size", type=int, help="Articles per Pegasus generate() call")
+    parser.add_argument("--bertsum-batch-size", type=int, help="Sentences per encoder batch")
+    parser.add_argument("--workers", type=int, help="Model replicas, each in its own process on its own cores")
+    parser.add_argument("--threads", type=int, help="Torch threads per replica (default: cores / workers)")
+    parser.add_argument("--sequential", action="store_true", default=None,
+                        help="Run Bertsum and then Pegasus on all cores instead of both at once on a shared core budget")
+    if 'dedup' in defaults:
+        parser.add_argument("--no-dedup", dest="dedup", action="store_false", default=None,
+                            help="Keep near-duplicate sentences in the topic articles")
+    parser.add_argument("--cache-dir", help=f"Root of the on-disk caches (default: {defaults['cache_dir']})")
+    parser.add_argument("--output-dir", help=f"Parent folder of the run folders (default: {defaults['output_dir']})")
+    parser.add_argument("--run-name", help="Run folder name (default: hash of the options when headless, else a timestamp)")
+    parser.add_argument("--output-format", choices=OUTPUT_FORMATS,
+                        help="Per-sample results store: results.parquet or results.jsonl.gz (default: parquet)")
+    parser.add_argument("--trace", choices=TRACE_FORMATS,
+                        help="Record per-stage spans and write them to the result folder as a Chrome trace or OpenTelemetry JSON")
+    parser.add_argument("--profile", choices=PROFILERS,
+                        help="Profile stages with cProfile or sampled stacks (written to <result folder>/profiles/)")
+    parser.add_argument("--profile-stages", nargs='+', metavar="PREFIX",
+                        help="Only profile stages whose names start with these prefixes, e.g. pegasus.generate rouge")
+    parser.add_argument("--monitor-interval", type=float, metavar="SECONDS",
+                        help=f"Seconds between CPU/RAM samples of the resource timeline (default: {defaults['monitor_interval']})")
+
+def options_from_args(args, defaults):
+    """The run options set on the command line, without the ones left unset."""
+    return {key: getattr(args, key) for key in defaults if getattr(args, key, None) is not None}
+
+def is_headless(args, cli_options):
+    """
+    Whether to skip the interactive menu.
+
+    The menu only asks for the sample selection. It is skipped when a config
+    file, --headless, --samples or --run-name is given, or when stdin is not a
+    terminal (cron, cluster jobs).
+    """
+    return bool(args.headless or args.config or 'samples' in cli_options or 'run_name' in cli_options
+                or not sys.stdin.isatty())
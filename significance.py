@@ -0,0 +1,179 @@
+"""Bootstrap confidence intervals and paired significance tests over per-sample scores.
+
+Works on the per-sample F1 scores a run already stored (see results_store), so
+comparing Bertsum and Pegasus never needs another inference or ROUGE pass:
+
+    python significance.py results/<run> --dataset DUC2007 --resamples 20000
+
+All resamples are drawn at once per block of rows. A bootstrap resample is
+kept as the count of every sample in it, so the resampled means of all
+metrics are one matrix product; a randomization resample is a row of random
+sign flips of the paired differences, drawn as packed bits. 10k resamples of
+a thousand samples and five metrics take a fraction of a second.
+
+Models are paired on (dataset, id): the difference of two models is only
+computed on samples both of them scored, and the bootstrap CI of the
+difference uses the same resamples for both, as a paired bootstrap should.
+"""
+import itertools
+
+import numpy as np
+
+from results_store import find_results, metric_names, read_results
+
+N_RESAMPLES = 10000
+CONFIDENCE = 0.95
+SEED = 0
+BLOCK_CELLS = 1 << 22  # Resamples x samples drawn per block, bounds the memory of the count matrix
+
+def _blocks(n_samples, n_resamples):
+    step = max(1, BLOCK_CELLS // max(n_samples, 1))
+    for start in range(0, n_resamples, step):
+        yield min(step, n_resamples - start)
+
+def bootstrap_means(values, n_resamples=N_RESAMPLES, seed=SEED):
+    """
+    Means of `n_resamples` bootstrap resamples of the rows of `values`.
+
+    Args:
+        values: (n_samples,) or (n_samples, k) array
+    Returns:
+        (n_resamples, k) array
+    """
+    values = np.asarray(values, dtype=np.float64).reshape(len(values), -1)
+    n = len(values)
+    if n == 0:
+        raise ValueError("Cannot bootstrap an empty sample")
+    rng = np.random.default_rng(seed)
+    means = []
+    for rows in _blocks(n, n_resamples):
+        # Row r of `counts` says how often each sample was drawn in resample r
+        draws = rng.integers(0, n, size=(rows, n), dtype=np.int64)
+        draws += np.arange(rows, dtype=np.int64)[:, None] * n
+        counts = np.bincount(draws.ravel(), minlength=rows * n).reshape(rows, n)
+        means.append(counts @ values / n)
+    return np.concatenate(means)
+
+def bootstrap_ci(values, n_resamples=N_RESAMPLES, confidence=CONFIDENCE, seed=SEED):
+    """
+    Percentile bootstrap confidence interval of the mean of each column.
+
+    Returns:
+        (mean, low, high), each an array with one value per column of `values`
+    """
+    values = np.asarray(values, dtype=np.float64).reshape(len(values), -1)
+    means = bootstrap_means(values, n_resamples, seed)
+    tail = (1 - confidence) / 2
+    low, high = np.quantile(means, [tail, 1 - tail], axis=0)
+    return values.mean(axis=0), low, high
+
+def paired_randomization_test(a, b, n_resamples=N_RESAMPLES, seed=SEED):
+    """
+    Two-sided paired randomization (sign-flip) test of mean(a) == mean(b).
+
+    Under the null hypothesis the two scores of a sample are exchangeable, so
+    each paired difference keeps or flips its sign with probability 1/2.
+
+    Args:
+        a, b: (n_samples,) or (n_samples, k) arrays, row i of both is the same sample
+    Returns:
+        (mean difference a - b, p-value), one value per column
+    """
+    diffs = (np.asarray(a, dtype=np.float64) - np.asarray(b, dtype=np.float64)).reshape(len(a), -1)
+    n = len(diffs)
+    if n == 0:
+        raise ValueError("Cannot test an empty sample")
+    rng = np.random.default_rng(seed)
+    total = diffs.sum(axis=0)
+    observed = np.abs(total) - 1e-12 * max(n, 1)  # Permutations tied with the observed sum count as extreme
+    extreme = np.zeros(diffs.shape[1], dtype=np.int64)
+    for rows in _blocks(n, n_resamples):
+        flips = np.unpackbits(rng.integers(0, 256, size=(rows, (n + 7) // 8), dtype=np.uint8), axis=1, count=n)
+        # Flipping the samples in `flips` turns the sum into total - 2 * (sum of the flipped differences)
+        permuted = total - 2 * (flips @ diffs)
+        extreme += (np.abs(permuted) >= observed).sum(axis=0)
+    return total / n, (extreme + 1) / (n_resamples + 1)
+
+def model_scores(table, metrics=None, dataset=None):
+    """
+    Per-model F1 arrays from a results table (see results_store.read_results).
+
+    Returns:
+        {model: {(dataset, id): F1 row over `metrics`}}, skipping samples without scores
+    """
+    metrics = metrics or metric_names(table)
+    scores = {}
+    for record in table.to_pylist():
+        if dataset is not None and record['dataset'] != dataset:
+            continue
+        row = [record[f'{metric}_f'] for metric in metrics]
+        if None in row:
+            continue
+        scores.setdefault(record['model'], {})[(record['dataset'], record['id'])] = row
+    return scores
+
+def compare_models(table, metrics=None, dataset=None, n_resamples=N_RESAMPLES, confidence=CONFIDENCE, seed=SEED):
+    """
+    Bootstrap CIs per model and paired tests between every pair of models of a results table.
+
+    Returns:
+        {'metrics': [...], 'models': {model: {'n', 'mean', 'low', 'high'}},
+         'pairs': [{'a', 'b', 'n', 'diff', 'low', 'high', 'p'}]} with one list entry per metric
+    """
+    metrics = metrics or metric_names(table)
+    scores = model_scores(table, metrics, dataset)
+    report = {'metrics': list(metrics), 'models': {}, 'pairs': [], 'confidence': confidence,
+              'resamples': n_resamples}
+    for model, rows in scores.items():
+        mean, low, high = bootstrap_ci(np.array(list(rows.values())), n_resamples, confidence, seed)
+        report['models'][model] = {'n': len(rows), 'mean': mean.tolist(), 'low': low.tolist(), 'high': high.tolist()}
+    for model_a, model_b in itertools.combinations(sorted(scores), 2):
+        shared = [key for key in scores[model_a] if key in scores[model_b]]
+        if not shared:
+            continue
+        a = np.array([scores[model_a][key] for key in shared])
+        b = np.array([scores[model_b][key] for key in shared])
+        _, low, high = bootstrap_ci(a - b, n_resamples, confidence, seed)
+        diff, p_value = paired_randomization_test(a, b, n_resamples, seed)
+        report['pairs'].append({'a': model_a, 'b': model_b, 'n': len(shared), 'diff': diff.tolist(),
+                                'low': low.tolist(), 'high': high.tolist(), 'p': p_value.tolist()})
+    return report
+
+def format_comparison(report):
+    """Text lines of a `compare_models` report."""
+    level = f"{report['confidence'] * 100:g}%"
+    labels = [metric.upper().replace('_', '-') for metric in report['metrics']]
+    lines = []
+    for model, stats in report['models'].items():
+        lines.append(f"{model} (n={stats['n']}, {level} CI, {report['resamples']} bootstrap resamples):")
+        for i, label in enumerate(labels):
+            lines.append(f"  {label} F1: {stats['mean'][i]:.4f} [{stats['low'][i]:.4f}, {stats['high'][i]:.4f}]")
+    for pair in report['pairs']:
+        lines.append(f"{pair['a']} - {pair['b']} (n={pair['n']} pasangan, paired randomization test):")
+        for i, label in enumerate(labels):
+            verdict = 'signifikan' if pair['p'][i] < 1 - report['confidence'] else 'tidak signifikan'
+            lines.append(f"  {label} F1: {pair['diff'][i]:+.4f} [{pair['low'][i]:+.4f}, {pair['high'][i]:+.4f}] "
+                         f"p={pair['p'][i]:.4f} ({verdict})")
+    return lines
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Bootstrap CIs and paired tests from a run's results store")
+    parser.add_argument("path", help="results.parquet or results.jsonl.gz (or the run folder)")
+    parser.add_argument("--dataset", help="Only this dataset, e.g. DUC2007 or cnn (default: all pooled)")
+    parser.add_argument("--metrics", nargs='+', help="Metric columns, e.g. rouge_1 rouge_lsum (default: all)")
+    parser.add_argument("--resamples", type=int, default=N_RESAMPLES)
+    parser.add_argument("--confidence", type=float, default=CONFIDENCE)
+    parser.add_argument("--seed", type=int, default=SEED)
+    args = parser.parse_args()
+
+    path = find_results(args.path)
+    if path is None:
+        raise SystemExit(f"Tidak ada results store di {args.path}")
+    start = time.perf_counter()
+    report = compare_models(read_results(path), args.metrics, args.dataset, args.resamples, args.confidence, args.seed)
+    for line in format_comparison(report):
+        print(line)
+    print(f"[Stats] Selesai dalam {time.perf_counter() - start:.2f}s")
@@ -0,0 +1,309 @@
+"""Online summarization service with dynamic micro-batching.
+
+`python summarization_service.py` serves `bertsum_summarize` and
+`pegasus_summarize` over HTTP (aiohttp, one asyncio event loop):
+
+- POST /summarize/<model> with {"article": "...", "timeout": seconds}
+  returns {"summary", "model", "latency_ms", "batch_size"}
+- GET /metrics returns per-model p50/p95/p99 latency, throughput, batch
+  sizes and queue depth
+- GET /health
+
+Concurrent requests for a model wait in a bounded queue. A MicroBatcher
+coalesces them into one summarizer call once MAX_BATCH_SIZE requests are
+waiting or the oldest one has waited MAX_WAIT_MS. Each model runs its batches
+on its own inference thread, and the models are loaded before the port opens.
+When the queue is full, new requests are rejected with 503 (backpressure).
+Requests still unanswered at their deadline get 504, and if they are still
+queued they are never run. `load_generator.py` replays duc2007.csv against the
+service.
+"""
+import asyncio
+import collections
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+MAX_BATCH_SIZE = 8
+MAX_WAIT_MS = 20
+MAX_QUEUE = 64
+REQUEST_TIMEOUT = 120.0
+LATENCY_WINDOW = 10000  # Latest requests kept for the percentiles
+THROUGHPUT_WINDOW = 60.0  # Seconds covered by the recent throughput figure
+
+class Overloaded(Exception):
+    """The model's request queue is full."""
+
+def latency_summary(latencies):
+    """p50/p95/p99/mean/max of latencies in seconds, reported in milliseconds."""
+    if len(latencies) == 0:
+        return {'count': 0}
+    values = np.asarray(latencies, dtype=np.float64) * 1000
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {'count': len(values), 'p50_ms': round(p50, 2), 'p95_ms': round(p95, 2), 'p99_ms': round(p99, 2),
+            'mean_ms': round(values.mean(), 2), 'max_ms': round(values.max(), 2)}
+
+class ServiceStats:
+    """Counters and sliding windows of one model; only touched from the event loop thread."""
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self.started = time.perf_counter()
+        self.latencies = collections.deque(maxlen=window)
+        self.queue_waits = collections.deque(maxlen=window)
+        self.batch_sizes = collections.deque(maxlen=window)
+        self.batch_seconds = collections.deque(maxlen=window)
+        self._completions = collections.deque()
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.errors = 0
+
+    def record_batch(self, size, seconds):
+        self.batch_sizes.append(size)
+        self.batch_seconds.append(seconds)
+
+    def record_request(self, latency, queue_wait):
+        now = time.perf_counter()
+        self.completed += 1
+        self.latencies.append(latency)
+        self.queue_waits.append(queue_wait)
+        self._completions.append(now)
+        while self._completions and now - self._completions[0] > THROUGHPUT_WINDOW:
+            self._completions.popleft()
+
+    def snapshot(self, queue_depth):
+        uptime = time.perf_counter() - self.started
+        recent = [t for t in self._completions if time.perf_counter() - t <= THROUGHPUT_WINDOW]
+        return {
+            'completed': self.completed,
+            'rejected': self.rejected,
+            'timeouts': self.timeouts,
+            'errors': self.errors,
+            'queue_depth': queue_depth,
+            'latency': latency_summary(self.latencies),
+            'queue_wait': latency_summary(self.queue_waits),
+            'batches': len(self.batch_sizes),
+            'mean_batch_size': round(float(np.mean(self.batch_sizes)), 2) if self.batch_sizes else 0.0,
+            'mean_batch_ms': round(float(np.mean(self.batch_seconds)) * 1000, 2) if self.batch_seconds else 0.0,
+            'throughput_rps': round(self.completed / uptime, 3) if uptime > 0 else 0.0,
+            'recent_throughput_rps': round(len(recent) / min(uptime, THROUGHPUT_WINDOW), 3) if uptime > 0 else 0.0,
+        }
+
+class _Request:
+    __slots__ = ('article', 'future', 'arrived', 'deadline')
+
+    def __init__(self, article, future, arrived, deadline):
+        self.article = article
+        self.future = future
+        self.arrived = arrived
+        self.deadline = deadline
+
+class MicroBatcher:
+    """
+    Coalesce concurrent requests for one model into batched summarizer calls.
+
+    Args:
+        name: Model name used in logs and metrics
+        summarize_fn: `summarize_fn(samples)` returning one summary per {'article': ...} sample
+        max_batch_size: Most requests per summarizer call
+        max_wait: Seconds the first request of a batch waits for more to arrive
+        max_queue: Waiting requests beyond which new ones are rejected
+    """
+
+    def __init__(self, name, summarize_fn, max_batch_size=MAX_BATCH_SIZE, max_wait=MAX_WAIT_MS / 1000,
+                 max_queue=MAX_QUEUE):
+        self.name = name
+        self.summarize_fn = summarize_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.max_queue = max_queue
+        self.stats = ServiceStats()
+        self._pending = collections.deque()
+        self._arrived = asyncio.Event()
+        # One inference thread per model: batches of a model run one after another
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f'{name}-batch')
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    @property
+    def queue_depth(self):
+        return len(self._pending)
+
+    async def submit(self, article, timeout=REQUEST_TIMEOUT):
+        """Queue one article and wait for its summary; returns (summary, batch size)."""
+        if len(self._pending) >= self.max_queue:
+            self.stats.rejected += 1
+            raise Overloaded(f"{self.name}: {len(self._pending)} request menunggu")
+        loop = asyncio.get_running_loop()
+        arrived = time.perf_counter()
+        request = _Request(article, loop.create_future(), arrived, arrived + timeout)
+        self._pending.append(request)
+        self._arrived.set()
+        try:
+            # A timeout cancels the future, so a still-queued request is skipped by the batch loop
+            summary, batch_size, queue_wait = await asyncio.wait_for(request.future, timeout)
+        except asyncio.TimeoutError:
+            self.stats.timeouts += 1
+            raise
+        self.stats.record_request(time.perf_counter() - arrived, queue_wait)
+        return summary, batch_size
+
+    async def _next_batch(self):
+        loop = asyncio.get_running_loop()
+        while not self._pending:
+            self._arrived.clear()
+            await self._arrived.wait()
+        # The oldest request waits at most max_wait for the batch to fill up
+        deadline = loop.time() + self.max_wait
+        while len(self._pending) < self.max_batch_size:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            self._arrived.clear()
+            try:
+                await asyncio.wait_for(self._arrived.wait(), remaining)
+            except asyncio.TimeoutError:
+                break
+        batch = []
+        now = time.perf_counter()
+        while self._pending and len(batch) < self.max_batch_size:
+            request = self._pending.popleft()
+            if request.future.done() or now >= request.deadline:
+                continue
+            batch.append(request)
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._next_batch()
+            if not batch:
+                continue
+            start = time.perf_counter()
+            samples = [{'article': request.article} for request in batch]
+            try:
+                summaries = await loop.run_in_executor(self._executor, self.summarize_fn, samples)
+            except Exception as e:
+                self.stats.errors += len(batch)
+                print(f"[Service] {self.name}: batch gagal: {e!r}")
+                for request in batch:
+                    if not request.future.done():
+                        request.future.set_exception(e)
+                continue
+            self.stats.record_batch(len(batch), time.perf_counter() - start)
+            for request, summary in zip(batch, summaries):
+                if not request.future.done():
+                    request.future.set_result((summary, len(batch), start - request.arrived))
+
+def summarize_functions(models, backend='fp32', max_batch_size=MAX_BATCH_SIZE, use_cache=True):
+    """Batch summarizers for the service: `fn(samples)` per model name."""
+    from bertsum_summarization import bertsum_summarize
+    from pegasus_summarization import pegasus_summarize
+    functions = {
+        'bertsum': functools.partial(bertsum_summarize, use_cache=use_cache, backend=backend),
+        'pegasus': functools.partial(pegasus_summarize, batch_size=max_batch_size, use_cache=use_cache, backend=backend),
+    }
+    return {model: functions[model] for model in models}
+
+def create_app(batchers, request_timeout=REQUEST_TIMEOUT):
+    """aiohttp application serving `batchers` ({model: MicroBatcher})."""
+    from aiohttp import web
+
+    async def summarize(request):
+        model = request.match_info['model']
+        batcher = batchers.get(model)
+        if batcher is None:
+            return web.json_response({'error': f"unknown model {model!r}", 'models': sorted(batchers)}, status=404)
+        try:
+            body = await request.json()
+        except ValueError:
+            return web.json_response({'error': 'body must be JSON'}, status=400)
+        article = body.get('article') if isinstance(body, dict) else None
+        if not isinstance(article, str) or not article.strip():
+            return web.json_response({'error': "'article' must be a non-empty string"}, status=400)
+        try:
+            timeout = min(float(body.get('timeout', request_timeout)), request_timeout)
+        except (TypeError, ValueError):
+            return web.json_response({'error': "'timeout' must be a number"}, status=400)
+        start = time.perf_counter()
+        try:
+            summary, batch_size = await batcher.submit(article, timeout)
+        except Overloaded as e:
+            return web.json_response({'error': str(e)}, status=503, headers={'Retry-After': '1'})
+        except asyncio.TimeoutError:
+            return web.json_response({'error': f"no summary within {timeout}s"}, status=504)
+        except Exception as e:
+            return web.json_response({'error': repr(e)}, status=500)
+        return web.json_response({'model': model, 'summary': summary, 'batch_size': batch_size,
+                                  'latency_ms': round((time.perf_counter() - start) * 1000, 2)})
+
+    async def metrics(request):
+        return web.json_response({model: batcher.stats.snapshot(batcher.queue_depth) for model, batcher in batchers.items()})
+
+    async def health(request):
+        return web.json_response({'status': 'ok', 'models': sorted(batchers)})
+
+    async def on_startup(app):
+        for batcher in batchers.values():
+            batcher.start()
+
+    async def on_cleanup(app):
+        for batcher in batchers.values():
+            await batcher.stop()
+
+    app = web.Application()
+    app.router.add_post('/summarize/{model}', summarize)
+    app.router.add_get('/metrics', metrics)
+    app.router.add_get('/health', health)
+    app.on_startup.append(on_startup)
+    app.on_cleanup.append(on_cleanup)
+    return app
+
+if __name__ == "__main__":
+    import argparse
+    from aiohttp import web
+    from backends import BACKENDS
+    from cache_paths import set_cache_dir
+    from inference_scheduler import configure_threads, model_spec
+    from model_registry import warm_up
+    from resource_monitor import get_monitor
+
+    parser = argparse.ArgumentParser(description="HTTP summarization service with dynamic micro-batching")
+    parser.add_argument("--host", default='127.0.0.1')
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--models", nargs='+', choices=['bertsum', 'pegasus'], default=['bertsum', 'pegasus'])
+    parser.add_argument("--backend", choices=BACKENDS, default='fp32')
+    parser.add_argument("--max-batch-size", type=int, default=MAX_BATCH_SIZE)
+    parser.add_argument("--max-wait-ms", type=float, default=MAX_WAIT_MS, help="Longest wait for a batch to fill up")
+    parser.add_argument("--max-queue", type=int, default=MAX_QUEUE, help="Waiting requests per model before 503")
+    parser.add_argument("--timeout", type=float, default=REQUEST_TIMEOUT, help="Longest time a request may take, in seconds")
+    parser.add_argument("--threads", type=int, default=None, help="Torch threads for inference (default: torch's choice)")
+    parser.add_argument("--cache-dir", default=None, help="Root of the on-disk caches")
+    parser.add_argument("--no-cache", action="store_true", help="Always run the model, even for articles seen before")
+    args = parser.parse_args()
+
+    if args.cache_dir:
+        set_cache_dir(args.cache_dir)
+    if args.threads:
+        configure_threads(args.threads)
+    # The summarizers record stage timings; keep only the recent ones in a long-lived process
+    get_monitor().keep_last(1000)
+    print(f"[Service] Memuat model {args.models} ({args.backend})...")
+    warm_up([model_spec(model, args.backend) for model in args.models])
+    functions = summarize_functions(args.models, args.backend, args.max_batch_size, use_cache=not args.no_cache)
+    batchers = {model: MicroBatcher(model, fn, args.max_batch_size, args.max_wait_ms / 1000, args.max_queue)
+                for model, fn in functions.items()}
+    web.run_app(create_app(batchers, args.timeout), host=args.host, port=args.port)
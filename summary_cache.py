@@ -0,0 +1,185 @@
+"""Persistent summary cache keyed by (model, generation params, article hash).
+
+Summaries are stored in a SQLite database under `cache/`, so re-running an
+evaluation with unchanged articles, model and parameters serves every summary
+from disk instead of running the model again. The cache is bounded in size and
+evicts the least recently used entries first.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from cache_paths import cache_path
+
+CACHE_FILE = 'summaries.sqlite'
+MAX_CACHE_BYTES = 512 * 1024 ** 2
+_SQLITE_BATCH = 500
+COUNTERS = ('hits', 'misses', 'evictions')
+
+def article_hash(article):
+    return hashlib.sha256(article.encode('utf-8')).hexdigest()
+
+def make_key(model, params, article):
+    """Cache key of a summary: model name, generation params (JSON, sorted) and the article hash."""
+    spec = json.dumps([model, params], sort_keys=True, default=str)
+    return hashlib.sha256(f"{spec}\0{article_hash(article)}".encode('utf-8')).hexdigest()
+
+class SummaryCache:
+    def __init__(self, path=None, max_bytes=MAX_CACHE_BYTES):
+        path = path or cache_path(CACHE_FILE)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS summaries ("
+            "key TEXT PRIMARY KEY, model TEXT, summary TEXT, size INTEGER, last_access REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON summaries (last_access)")
+        self._conn.commit()
+        # Running size of the table, so an insert does not scan it; replicas writing the same
+        # file are only seen when this estimate crosses max_bytes and _evict re-reads the real total
+        self._total_bytes = self._table_bytes()
+
+    def get_many(self, keys):
+        """Return {key: summary} for the cached keys and mark them as recently used."""
+        found = {}
+        keys = list(keys)
+        with self._lock:
+            for start in range(0, len(keys), _SQLITE_BATCH):
+                batch = keys[start:start + _SQLITE_BATCH]
+                placeholders = ','.join('?' * len(batch))
+                rows = self._conn.execute(f"SELECT key, summary FROM summaries WHERE key IN ({placeholders})", batch)
+                found.update(rows.fetchall())
+            if found:
+                now = time.time()
+                self._conn.executemany("UPDATE summaries SET last_access = ? WHERE key = ?", [(now, key) for key in found])
+                self._conn.commit()
+            self.hits += sum(1 for key in keys if key in found)
+            self.misses += sum(1 for key in keys if key not in found)
+        return found
+
+    def get(self, key):
+        return self.get_many([key]).get(key)
+
+    def put_many(self, entries):
+        """Store (key, model, summary) entries, then evict old entries if the cache grew past max_bytes."""
+        now = time.time()
+        rows = [(key, model, summary, len(summary.encode('utf-8')), now) for key, model, summary in entries]
+        if not rows:
+            return
+        with self._lock:
+            replaced = {}
+            keys = [row[0] for row in rows]
+            for start in range(0, len(keys), _SQLITE_BATCH):
+                batch = keys[start:start + _SQLITE_BATCH]
+                placeholders = ','.join('?' * len(batch))
+                replaced.update(self._conn.execute(f"SELECT key, size FROM summaries WHERE key IN ({placeholders})", batch))
+            # The last row wins for keys repeated within `rows`, as with INSERT OR REPLACE
+            sizes = {row[0]: row[3] for row in rows}
+            self._conn.executemany("INSERT OR REPLACE INTO summaries VALUES (?, ?, ?, ?, ?)", rows)
+            self._total_bytes += sum(sizes.values()) - sum(replaced.values())
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+            self._conn.commit()
+
+    def put(self, key, model, summary):
+        self.put_many([(key, model, summary)])
+
+    def _table_bytes(self):
+        return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM summaries").fetchone()[0]
+
+    def _evict(self):
+        self._total_bytes = self._table_bytes()
+        if self._total_bytes <= self.max_bytes:
+            return
+        excess = self._total_bytes - self.max_bytes
+        victims = []
+        for key, size in self._conn.execute("SELECT key, size FROM summaries ORDER BY last_access ASC"):
+            victims.append((key,))
+            self._total_bytes -= size
+            excess -= size
+            if excess <= 0:
+                break
+        self._conn.executemany("DELETE FROM summaries WHERE key = ?", victims)
+        self.evictions += len(victims)
+
+    def add_counters(self, counters):
+        """Add hit/miss/eviction counts recorded elsewhere, e.g. by the cache of a replica process."""
+        with self._lock:
+            for name in COUNTERS:
+                setattr(self, name, getattr(self, name) + counters.get(name, 0))
+
+    def stats(self):
+        with self._lock:
+            entries, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM summaries").fetchone()
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'entries': entries, 'bytes': size}
+
+    def format_stats(self):
+        s = self.stats()
+        total = s['hits'] + s['misses']
+        hit_rate = s['hits'] / total * 100 if total else 0.0
+        return (f"[Cache] Hits: {s['hits']} | Misses: {s['misses']} | Hit rate: {hit_rate:.1f}% | "
+                f"Entries: {s['entries']} ({s['bytes'] / 1024 ** 2:.1f} MB) | Evicted: {s['evictions']}")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_summary_cache(path=None, max_bytes=MAX_CACHE_BYTES):
+    """Return the process-wide summary cache, opening it on first use."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = SummaryCache(path, max_bytes)
+        return _cache
+
+def cache_counters():
+    """Hit/miss/eviction counts of this process's summary cache (zeros if it was never opened)."""
+    cache = _cache
+    if cache is None:
+        return dict.fromkeys(COUNTERS, 0)
+    with cache._lock:
+        return {name: getattr(cache, name) for name in COUNTERS}
+
+def cached_summarize(model_name, params, articles, summarize_fn, on_summary=None):
+    """
+    Serve summaries from the cache and run `summarize_fn(missing_articles, on_summary)` only for the misses.
+
+    `on_summary(index, summary)` is called once per article (cache hits first),
+    with `index` referring to `articles`. Generated summaries are stored as soon
+    as the summarizer reports them. Returns the summaries in the order of `articles`.
+    """
+    cache = get_summary_cache()
+    keys = [make_key(model_name, params, article) for article in articles]
+    found = cache.get_many(keys)
+    missing = [i for i, key in enumerate(keys) if key not in found]
+    print(f"[Cache] {model_name}: {len(articles) - len(missing)} dari {len(articles)} summary diambil dari cache")
+    if on_summary is not None:
+        for i, key in enumerate(keys):
+            if key in found:
+                on_summary(i, found[key])
+
+    def on_generated(local_index, summary):
+        i = missing[local_index]
+        cache.put(keys[i], model_name, summary)
+        if on_summary is not None:
+            on_summary(i, summary)
+
+    if missing:
+        generated = summarize_fn([articles[i] for i in missing], on_generated)
+        for i, summary in zip(missing, generated):
+            found[keys[i]] = summary
+    return [found[key] for key in keys]
@@ -0,0 +1,17 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+DATASET_DIR = os.path.join(ROOT, 'Dataset')
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    """Every test gets its own cache root, so snapshots and indexes never leak between tests or into cache/."""
+    from cache_paths import CACHE_DIR_ENV
+    path = tmp_path / 'cache'
+    monkeypatch.setenv(CACHE_DIR_ENV, str(path))
+    return path
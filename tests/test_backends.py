@@ -0,0 +1,45 @@
+import pytest
+import torch
+
+from backends import OnnxEncoder, _HiddenLayerModule, backend_kind
+from run_options import CNN_DEFAULTS, DUC_DEFAULTS, resolve_options
+
+def test_backend_kinds():
+    assert backend_kind('seq2seq', 'fp32') == 'seq2seq'
+    assert backend_kind('seq2seq', 'int8') == 'seq2seq-int8'
+    assert backend_kind('encoder', 'onnx') == 'encoder-onnx'
+    with pytest.raises(ValueError, match='Pegasus'):
+        backend_kind('seq2seq', 'onnx')
+    with pytest.raises(ValueError):
+        backend_kind('encoder', 'tpu')
+
+def test_onnx_is_rejected_for_pegasus_runs():
+    with pytest.raises(ValueError, match='Pegasus'):
+        resolve_options(DUC_DEFAULTS, {'backend': 'onnx'})
+    with pytest.raises(ValueError, match='Pegasus'):
+        resolve_options(CNN_DEFAULTS, {'backend': 'onnx', 'models': ['pegasus']})
+    assert resolve_options(CNN_DEFAULTS, {'backend': 'onnx', 'models': ['bertsum']})['models'] == ['bertsum']
+
+def test_onnx_encoder_matches_pytorch(tmp_path):
+    pytest.importorskip('onnxruntime')
+    from transformers import DistilBertConfig, DistilBertModel
+    from extractive import HIDDEN_LAYER
+    torch.manual_seed(0)
+    config = DistilBertConfig(n_layers=2, dim=64, hidden_dim=128, n_heads=2)
+    model = DistilBertModel(config).eval()
+    input_ids = torch.randint(0, config.vocab_size, (3, 9))
+    attention_mask = torch.ones_like(input_ids)
+    attention_mask[0, 6:] = 0
+    with torch.no_grad():
+        expected = model(input_ids=input_ids, attention_mask=attention_mask, output_hidden_states=True).hidden_states[HIDDEN_LAYER]
+    # Exported the way _load_onnx_encoder does, at a different batch size and length than it is run at
+    path = str(tmp_path / 'encoder.onnx')
+    dynamic = {0: 'batch', 1: 'sequence'}
+    sample = torch.randint(0, config.vocab_size, (1, 5))
+    torch.onnx.export(_HiddenLayerModule(model, HIDDEN_LAYER), (sample, torch.ones_like(sample)), path,
+                      input_names=['input_ids', 'attention_mask'], output_names=['hidden'],
+                      dynamic_axes={'input_ids': dynamic, 'attention_mask': dynamic, 'hidden': dynamic},
+                      opset_version=17, dynamo=False)
+    hidden = OnnxEncoder(path, config).hidden_layer(input_ids, attention_mask)
+    kept = attention_mask.bool()
+    assert torch.allclose(hidden[kept], expected[kept], atol=1e-4)
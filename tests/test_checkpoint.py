@@ -0,0 +1,95 @@
+import json
+import os
+
+import checkpoint
+from checkpoint import CHECKPOINT_FILE, CheckpointWriter, load_checkpoint, summarize_with_checkpoint
+
+DATASET = [{'article': f"article {i}"} for i in range(5)]
+
+def fake_summarizer(calls):
+    def summarize(samples, on_summary=None):
+        calls.append([sample['article'] for sample in samples])
+        summaries = [sample['article'].replace('article', 'summary') for sample in samples]
+        for i, summary in enumerate(summaries):
+            if on_summary is not None:
+                on_summary(i, summary)
+        return summaries
+    return summarize
+
+def count_fsyncs(monkeypatch):
+    calls = []
+    real_fsync = os.fsync
+    monkeypatch.setattr(checkpoint.os, 'fsync', lambda fd: (calls.append(fd), real_fsync(fd)))
+    return calls
+
+def test_resume_skips_finished_samples(tmp_path):
+    with CheckpointWriter(str(tmp_path)) as writer:
+        writer.record('DUC2006', 'bertsum', 1, 'summary 1')
+        writer.record('DUC2006', 'bertsum', 3, 'summary 3')
+        writer.record('DUC2006', 'pegasus', 0, 'summary 0')
+
+    calls, seen = [], {}
+    with CheckpointWriter(str(tmp_path)) as writer:
+        summaries = summarize_with_checkpoint(writer, 'DUC2006', 'bertsum', DATASET, fake_summarizer(calls),
+                                              on_summary=seen.__setitem__)
+    assert calls == [['article 0', 'article 2', 'article 4']]
+    assert summaries == [f"summary {i}" for i in range(5)]
+    assert seen == dict(enumerate(summaries))
+
+    completed = load_checkpoint(str(tmp_path))
+    assert completed[('DUC2006', 'bertsum')] == dict(enumerate(summaries))
+    assert completed[('DUC2006', 'pegasus')] == {0: 'summary 0'}
+    # New entries carry their finish time; the restored ones were recorded without one
+    assert sorted(load_checkpoint(str(tmp_path), 'finished_after')[('DUC2006', 'bertsum')]) == [0, 2, 4]
+
+    # A second resume has nothing left to do
+    with CheckpointWriter(str(tmp_path)) as writer:
+        assert summarize_with_checkpoint(writer, 'DUC2006', 'bertsum', DATASET, fake_summarizer(calls)) == summaries
+    assert len(calls) == 1
+
+def test_torn_last_line_is_ignored(tmp_path):
+    with CheckpointWriter(str(tmp_path)) as writer:
+        writer.record('DUC2007', 'pegasus', 0, 'summary 0')
+        writer.record('DUC2007', 'pegasus', 1, 'summary 1')
+    path = tmp_path / CHECKPOINT_FILE
+    # Simulate a crash halfway through writing the third entry
+    torn = json.dumps({'dataset': 'DUC2007', 'model': 'pegasus', 'index': 2, 'summary': 'summary 2'})
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(torn[:len(torn) // 2])
+
+    assert load_checkpoint(str(tmp_path)) == {('DUC2007', 'pegasus'): {0: 'summary 0', 1: 'summary 1'}}
+    calls = []
+    with CheckpointWriter(str(tmp_path)) as writer:
+        summaries = summarize_with_checkpoint(writer, 'DUC2007', 'pegasus', DATASET[:3], fake_summarizer(calls))
+    assert calls == [['article 2']]
+    assert summaries == ['summary 0', 'summary 1', 'summary 2']
+    # The torn fragment was cut off, so the re-recorded sample is on a line of its own
+    assert load_checkpoint(str(tmp_path))[('DUC2007', 'pegasus')] == {0: 'summary 0', 1: 'summary 1', 2: 'summary 2'}
+
+def test_fsync_is_batched(tmp_path, monkeypatch):
+    fsyncs = count_fsyncs(monkeypatch)
+    writer = CheckpointWriter(str(tmp_path), fsync_every=4, fsync_interval=3600)
+    for i in range(10):
+        writer.record('DUC2006', 'bertsum', i, f"summary {i}")
+    assert len(fsyncs) == 2
+    # Every line is flushed, synced or not, so other readers see all entries
+    assert len(load_checkpoint(str(tmp_path))[('DUC2006', 'bertsum')]) == 10
+    writer.close()
+    assert len(fsyncs) == 3
+    writer.close()
+    assert len(fsyncs) == 3
+
+def test_fsync_after_interval(tmp_path, monkeypatch):
+    fsyncs = count_fsyncs(monkeypatch)
+    now = [1000.0]
+    monkeypatch.setattr(checkpoint.time, 'monotonic', lambda: now[0])
+    with CheckpointWriter(str(tmp_path), fsync_every=100, fsync_interval=5.0) as writer:
+        writer.record('DUC2006', 'bertsum', 0, 'summary 0')
+        now[0] += 4.9
+        writer.record('DUC2006', 'bertsum', 1, 'summary 1')
+        assert fsyncs == []
+        now[0] += 0.2
+        writer.record('DUC2006', 'bertsum', 2, 'summary 2')
+        assert len(fsyncs) == 1
+        writer.record('DUC2006', 'bertsum', 3, 'summary 3')
+        assert len(fsyncs) == 1
@@ -0,0 +1,96 @@
+import csv
+import os
+
+import pytest
+
+import csv_index
+from csv_index import load_csv_index, scan_record_offsets
+
+ROWS = [
+    {'id': 'a1', 'article': 'One line.', 'highlights': 'Short.'},
+    {'id': 'a2', 'article': 'Two\nlines, with a comma.', 'highlights': 'He said "hi".\nThen left.'},
+    {'id': 'a3', 'article': '"Quoted" start and "" doubled', 'highlights': 'Line one\n\nLine three'},
+    {'id': 'a4', 'article': 'Ünïcödé — text', 'highlights': 'x'},
+]
+
+def write_csv(path, rows, lineterminator='\r\n', trailing_newline=True):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]), lineterminator=lineterminator)
+        writer.writeheader()
+        writer.writerows(rows)
+    if not trailing_newline:
+        with open(path, 'rb+') as f:
+            f.truncate(os.path.getsize(path) - len(lineterminator))
+    return str(path)
+
+def read_csv(path):
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        return list(csv.DictReader(f))
+
+@pytest.mark.parametrize('lineterminator', ['\r\n', '\n'])
+def test_rows_match_csv_reader(tmp_path, lineterminator):
+    path = write_csv(tmp_path / 'data.csv', ROWS, lineterminator)
+    index = load_csv_index(path)
+    assert len(index) == len(ROWS)
+    assert index.header == list(ROWS[0])
+    assert [index.row(i) for i in range(len(index))] == read_csv(path) == ROWS
+    assert list(index.rows([3, 1, 1])) == [ROWS[3], ROWS[1], ROWS[1]]
+
+def test_quote_state_carries_across_scan_chunks(tmp_path, monkeypatch):
+    path = write_csv(tmp_path / 'data.csv', ROWS * 20)
+    expected = scan_record_offsets(path)
+    # Chunks of a few bytes split quoted fields, doubled quotes and CRLF pairs
+    for size in (1, 2, 3, 7, 64):
+        monkeypatch.setattr(csv_index, '_SCAN_CHUNK', size)
+        assert scan_record_offsets(path).tolist() == expected.tolist()
+    assert len(expected) == 1 + len(ROWS) * 20 + 1
+
+def test_file_without_trailing_newline(tmp_path):
+    path = write_csv(tmp_path / 'data.csv', ROWS, trailing_newline=False)
+    index = load_csv_index(path)
+    assert [index.row(i) for i in range(len(index))] == ROWS
+
+@pytest.mark.parametrize('lineterminator', ['\r\n', '\n'])
+def test_blank_lines_are_not_rows(tmp_path, lineterminator):
+    head = write_csv(tmp_path / 'head.csv', ROWS[:2], lineterminator)
+    tail = write_csv(tmp_path / 'tail.csv', ROWS[2:], lineterminator)
+    with open(tail, 'rb') as f:
+        body = f.read().split(lineterminator.encode(), 1)[1]
+    # A blank line between two rows and a few trailing ones, as left by concatenated or hand-edited files
+    path = str(tmp_path / 'data.csv')
+    with open(head, 'rb') as f, open(path, 'wb') as out:
+        out.write(f.read() + lineterminator.encode() + body + lineterminator.encode() * 3)
+    index = load_csv_index(path)
+    assert len(index) == len(ROWS)
+    assert [index.row(i) for i in range(len(index))] == read_csv(path) == ROWS
+    assert list(index.rows([len(ROWS) - 1, 1])) == [ROWS[-1], ROWS[1]]
+
+def test_row_out_of_range(tmp_path):
+    index = load_csv_index(write_csv(tmp_path / 'data.csv', ROWS))
+    with pytest.raises(IndexError):
+        index.row(len(ROWS))
+    with pytest.raises(IndexError):
+        list(index.rows([0, -1]))
+
+def test_index_is_saved_and_rebuilt_when_the_file_changes(tmp_path, monkeypatch):
+    path = write_csv(tmp_path / 'data.csv', ROWS)
+    load_csv_index(path)
+    assert os.path.exists(path + '.idx.npz')
+
+    scan = csv_index.scan_record_offsets
+
+    def no_scan(file_path):
+        raise AssertionError("the saved index should have been used")
+    monkeypatch.setattr(csv_index, 'scan_record_offsets', no_scan)
+    assert len(load_csv_index(path)) == len(ROWS)
+
+    monkeypatch.setattr(csv_index, 'scan_record_offsets', scan)
+    write_csv(path, ROWS[:2])
+    index = load_csv_index(path)
+    assert [index.row(i) for i in range(len(index))] == ROWS[:2]
+
+def test_empty_file_is_rejected(tmp_path):
+    path = tmp_path / 'empty.csv'
+    path.write_bytes(b'')
+    with pytest.raises(ValueError):
+        load_csv_index(str(path))
@@ -0,0 +1,77 @@
+import numpy as np
+
+import dedup
+from dedup import deduplicate_samples, deduplicate_text, minhash_signatures, near_duplicate_mask, shingle_hashes
+
+WORDS = ("the storm moved north along the coast on tuesday forcing officials to close schools "
+         "and open shelters while power crews waited for the winds to ease before repairs").split()
+BASE = ' '.join(WORDS)
+NEAR = ' '.join(WORDS[:-1] + ['began'])  # Last word changed: shingle Jaccard 25/27
+OTHER = ("Lawmakers in the capital approved a budget that raises spending on roads, "
+         "bridges and rail lines over the next five years.")
+UNRELATED = "Quarterly profits at the chip maker doubled as demand for servers kept climbing."
+
+def band_keys(signatures):
+    rows = dedup.NUM_PERM // dedup.BANDS
+    return (signatures.reshape(len(signatures), dedup.BANDS, rows) * dedup._MIX[:rows]).sum(axis=2)
+
+def test_shingles_stay_within_sentences():
+    hashes, counts = shingle_hashes(['a b c d', 'C D e', 'x y'])
+    # One shingle per window of SHINGLE_WORDS words, a short sentence is padded to one shingle
+    assert counts.tolist() == [2, 1, 1]
+    assert len(hashes) == 4
+    # Lower-cased words: 'c d e' hashes the same whether it stands alone or inside a longer sentence
+    assert hashes[2] == shingle_hashes(['b c d e'])[0][1]
+    assert hashes[1] == shingle_hashes(['b c d'])[0][0]
+    # No window runs from 'a b c d' into 'C D e'
+    assert set(hashes.tolist()).isdisjoint(shingle_hashes(['c d c', 'd c d'])[0].tolist())
+    assert hashes.max() <= 0xFFFFFFFF
+
+def test_signature_agreement_estimates_jaccard():
+    signatures = minhash_signatures([BASE, BASE, NEAR, OTHER])
+    assert signatures.shape == (4, dedup.NUM_PERM)
+    assert (signatures[0] == signatures[1]).all()
+    near = (signatures[0] == signatures[2]).mean()
+    assert near >= dedup.JACCARD_THRESHOLD
+    assert (signatures[0] == signatures[3]).mean() < 0.2
+
+def test_threshold_decides_among_bucket_candidates(monkeypatch):
+    sentences = [BASE, NEAR, OTHER]
+    signatures = minhash_signatures(sentences)
+    assert (band_keys(signatures)[0] == band_keys(signatures)[1]).any()
+    assert near_duplicate_mask(sentences).tolist() == [True, False, True]
+    # Just above the estimated similarity of the pair, the near-duplicate is kept
+    estimate = (signatures[0] == signatures[1]).mean()
+    monkeypatch.setattr(dedup, 'JACCARD_THRESHOLD', estimate + 1e-9)
+    assert near_duplicate_mask(sentences).tolist() == [True, True, True]
+
+def test_only_sentences_sharing_a_band_are_compared(monkeypatch):
+    sentences = [OTHER, UNRELATED]
+    keys = band_keys(minhash_signatures(sentences))
+    assert not (keys[0] == keys[1]).any()
+    # Even with no similarity required, sentences that never share a bucket are not candidates
+    monkeypatch.setattr(dedup, 'JACCARD_THRESHOLD', 0.0)
+    assert near_duplicate_mask(sentences).tolist() == [True, True]
+
+def test_first_occurrence_kept_in_order():
+    sentences = [BASE + '.', OTHER, NEAR + '.', UNRELATED, OTHER, BASE + '.']
+    assert near_duplicate_mask(sentences).tolist() == [True, True, False, True, False, False]
+    text, before, after = deduplicate_text(' '.join(sentences))
+    assert (before, after) == (6, 3)
+    assert text == ' '.join([BASE + '.', OTHER, UNRELATED])
+
+def test_short_inputs_are_kept():
+    assert near_duplicate_mask([]).tolist() == []
+    assert near_duplicate_mask(['Only one.']).tolist() == [True]
+    assert np.all(near_duplicate_mask(['Yes.', 'No.']))
+
+def test_deduplicate_samples_reports_reduction():
+    samples = [{'id': 't1', 'article': ' '.join([OTHER, UNRELATED, OTHER]), 'references': ['r']},
+               {'id': 't2', 'article': UNRELATED, 'references': ['r']}]
+    deduplicated, stats = deduplicate_samples(samples, 'DUC')
+    assert deduplicated[0] == {'id': 't1', 'article': ' '.join([OTHER, UNRELATED]), 'references': ['r']}
+    assert deduplicated[1] == samples[1]
+    assert samples[0]['article'].count(OTHER) == 2
+    assert (stats['sentences_before'], stats['sentences_after']) == (4, 3)
+    assert stats['chars_before'] - stats['chars_after'] == len(OTHER) + 1
+    assert 0 < stats['reduction'] < 1
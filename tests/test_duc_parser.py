@@ -0,0 +1,85 @@
+from duc_parser import parse_document, parse_file, parse_files, split_paragraphs
+
+NYT_DOC = """
+<DOC>
+<DOCNO> NYT19991025.0311 </DOCNO>
+<DOCTYPE> NEWS STORY </DOCTYPE>
+<DATE_TIME> 1999-10-25 17:05 </DATE_TIME>
+<HEADER>
+A7911 &Cx1f; sci-z
+</HEADER>
+<BODY>
+<SLUG> BC-SCI-BRAIN-ART-NYT </SLUG>
+<HEADLINE>
+A NEW WAY OF LOOKING
+AT DISEASES OF THE BRAIN
+</HEADLINE>
+ By SANDRA BLAKESLEE
+<TEXT>
+<P>
+   A highly respected neuroscientist has developed a provocative
+new theory of how the brain is organized.
+</P>
+<P>
+   According to the <ANNOTATION>theory</ANNOTATION>, the   deep sadness
+of depression stems from a decoupling of two brain regions.
+</P>
+<P>
+</P>
+</TEXT>
+</BODY>
+<TRAILER>
+NYT-10-25-99 1705EDT
+</TRAILER>
+</DOC>
+"""
+
+APW_DOC = """<DOC>
+<DOCNO>APW19980601.0001</DOCNO>
+<DATE>1998-06-01</DATE>
+<TEXT>
+Flood waters rose overnight
+along the river.
+<HEADLINE>Not a header field</HEADLINE>
+</TEXT>
+</DOC>
+"""
+
+def test_parse_nyt_document():
+    document = parse_document(NYT_DOC)
+    assert document.docno == 'NYT19991025.0311'
+    assert document.date == '1999-10-25 17:05'
+    assert document.headline == 'A NEW WAY OF LOOKING AT DISEASES OF THE BRAIN'
+    # The byline and trailer sit outside <TEXT>, inline tags are dropped and whitespace collapsed
+    assert document.paragraphs == [
+        'A highly respected neuroscientist has developed a provocative new theory of how the brain is organized.',
+        'According to the theory , the deep sadness of depression stems from a decoupling of two brain regions.',
+    ]
+    assert document.text == ' '.join(document.paragraphs)
+
+def test_text_without_paragraph_tags():
+    document = parse_document(APW_DOC)
+    assert (document.docno, document.date, document.headline) == ('APW19980601.0001', '1998-06-01', '')
+    # Header fields are only read before <TEXT>; tags inside the body are stripped like any other
+    assert document.paragraphs == ['Flood waters rose overnight along the river. Not a header field']
+
+def test_document_without_text():
+    document = parse_document('<DOC><DOCNO> XIE19990101.0001 </DOCNO></DOC>')
+    assert document.docno == 'XIE19990101.0001'
+    assert document.paragraphs == []
+    assert document.text == ''
+
+def test_split_paragraphs_drops_empty_blocks():
+    assert split_paragraphs('<P>\n one \n</P>\n<P> </P><P>two<BR>three</P>') == ['one', 'two three']
+
+def test_parse_files_keeps_order_and_drops_bad_bytes(tmp_path):
+    paths = []
+    for i in range(5):
+        path = tmp_path / f"APW{i}"
+        content = APW_DOC.replace('APW19980601.0001', f"APW{i}").encode('utf-8')
+        path.write_bytes(content.replace(b'Flood', b'Fl\xffood') if i == 2 else content)
+        paths.append(str(path))
+    documents = parse_files(paths, workers=3)
+    assert [document.docno for document in documents] == [f"APW{i}" for i in range(5)]
+    assert documents[2] == parse_file(paths[0])._replace(docno='APW2')
+    assert parse_files(paths, workers=1) == documents
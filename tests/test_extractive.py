@@ -0,0 +1,76 @@
+import importlib
+import importlib.util
+import sys
+import types
+
+import numpy as np
+import pytest
+
+from extractive import segment, select_sentences
+
+ARTICLE = (
+    "The storm reached the coast early on Monday, flooding roads and cutting power to thousands. "
+    "Officials said the damage was worse than expected. Short one. "
+    "Schools in three counties will stay closed until Wednesday while crews clear fallen trees. "
+    "\"We have never seen water this high,\" said a resident who has lived in the town for forty years. "
+    "Dr. Smith of the U.S. Weather Service warned that a second storm could arrive by Friday night.\n\n"
+    "Relief groups opened shelters in two high schools and asked for donations of food and blankets."
+)
+
+@pytest.fixture(scope='module')
+def library():
+    """
+    bert-extractive-summarizer's own modules, loaded without running summarizer/__init__.py.
+
+    The package __init__ imports model classes that transformers 5 no longer
+    ships, but the clustering and sentence modules only need numpy, sklearn
+    and spaCy. The test is skipped when the library is not installed.
+    """
+    spec = importlib.util.find_spec('summarizer')
+    if spec is None or spec.submodule_search_locations is None:
+        pytest.skip("bert-extractive-summarizer is not installed")
+    saved = {name: module for name, module in sys.modules.items() if name.split('.')[0] == 'summarizer'}
+    package = types.ModuleType('summarizer')
+    package.__path__ = list(spec.submodule_search_locations)
+    sys.modules['summarizer'] = package
+    try:
+        yield types.SimpleNamespace(
+            ClusterFeatures=importlib.import_module('summarizer.cluster_features').ClusterFeatures,
+            SentenceHandler=importlib.import_module('summarizer.text_processors.sentence_handler').SentenceHandler,
+        )
+    finally:
+        for name in [name for name in sys.modules if name.split('.')[0] == 'summarizer']:
+            del sys.modules[name]
+        sys.modules.update(saved)
+
+def library_selection(library, hidden, ratio):
+    """SummaryProcessor.cluster_runner with use_first=True and num_sentences=None, as Summarizer() runs it."""
+    if len(hidden) <= 1:
+        return list(range(len(hidden)))
+    indices = library.ClusterFeatures(hidden[1:], 'kmeans', random_state=12345).cluster(ratio, None)
+    return [0] + [i + 1 for i in indices]
+
+def embeddings(seed, n, dim=768, clusters=4):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim))
+    points = centers[rng.integers(0, clusters, n)] + rng.normal(scale=0.3, size=(n, dim))
+    return points.astype(np.float32)
+
+def test_segmentation_matches_sentence_handler(library):
+    handler = library.SentenceHandler()
+    for text in (ARTICLE, ARTICLE.replace('\n\n', ' '), ARTICLE * 3, "Too short.", ""):
+        assert segment(text) == handler.process(text, 40, 600)
+
+@pytest.mark.parametrize('ratio', [0.1, 0.2, 0.3, 0.5])
+def test_cluster_selection_matches_library(library, ratio):
+    for seed, n in enumerate([1, 2, 3, 5, 8, 13, 21, 40, 75]):
+        hidden = embeddings(seed, n)
+        assert select_sentences(hidden, ratio) == library_selection(library, hidden, ratio), (seed, n)
+
+def test_cluster_selection_matches_library_on_ties(library):
+    hidden = embeddings(99, 30)
+    hidden[10] = hidden[4]  # Exact duplicates: the first occurrence wins
+    hidden[20] = hidden[4]
+    hidden[15] = hidden[7] + np.float32(1e-6)  # Distances equal up to float32 rounding
+    for ratio in (0.2, 0.3, 0.5):
+        assert select_sentences(hidden, ratio) == library_selection(library, hidden, ratio)
@@ -0,0 +1,44 @@
+import random
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from pipeline import IncrementalScorer, split_core_budget
+from rouge_scorer import ReferenceIndex, evaluate_rouge, get_default_scorer
+
+PREDICTIONS = [
+    "the cat sat on the mat",
+    "police arrested a man on monday .\nhe will appear in court",
+    "a sample whose references are missing",
+    "the quick brown fox jumps over the lazy dog",
+    "stocks fell sharply on friday after the report",
+    "the cat sat on the mat",
+    "rain is expected over the weekend",
+]
+REFERENCES = [
+    ["a cat sat on the mat", "the cat was on a mat"],
+    ["the man was arrested by police on monday .\nhe appears in court friday"],
+    [],
+    ["the quick brown fox jumped over a lazy dog"],
+    ["shares dropped on friday following the report", "stocks fell"],
+    [],
+    ["more rain over the weekend , forecasters say"],
+]
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 32])
+def test_incremental_scores_equal_full_evaluation(chunk_size):
+    index = ReferenceIndex.build(get_default_scorer(), REFERENCES)
+    order = list(range(len(PREDICTIONS)))
+    random.Random(chunk_size).shuffle(order)  # Samples finish out of order
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        scorer = IncrementalScorer(index, executor, chunk_size)
+        for i in order:
+            scorer.add(i, PREDICTIONS[i])
+        scores = scorer.finish()
+    assert scores == evaluate_rouge(PREDICTIONS, REFERENCES)
+
+def test_split_core_budget():
+    shares = split_core_budget(['bertsum', 'pegasus'], cores=range(8))
+    assert shares == {'bertsum': [0, 1], 'pegasus': [2, 3, 4, 5, 6, 7]}
+    assert split_core_budget(['bertsum', 'pegasus'], cores=[0, 1]) == {'bertsum': [0], 'pegasus': [1]}
+    assert split_core_budget(['bertsum', 'pegasus'], cores=[3]) == {'bertsum': [3], 'pegasus': [3]}
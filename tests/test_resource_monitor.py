@@ -0,0 +1,36 @@
+import json
+import time
+
+import psutil
+
+from resource_monitor import ResourceMonitor, get_monitor, max_rss
+
+def test_peak_rss_includes_spikes_between_samples(tmp_path):
+    monitor = ResourceMonitor(interval=60)  # The sampler never fires during the test
+    monitor.start()
+    before = monitor.latest()['peak_rss_mb']
+    # Allocated, touched and freed between two samples; big enough to raise the process high-water mark
+    spike = bytearray(max(max_rss() - psutil.Process().memory_info().rss, 0) + 200 * 1024 ** 2)
+    spike[::4096] = b'x' * len(spike[::4096])
+    del spike
+    monitor.stop()
+    # Once stopped, latest() takes a fresh reading
+    snapshot = monitor.latest()
+    assert snapshot['peak_rss_mb'] >= before + 150
+    assert snapshot['peak_rss_mb'] >= snapshot['rss_mb'] + 150
+    timeline = json.load(open(monitor.save(str(tmp_path / 'timeline.json'))))
+    assert timeline['peak_rss_mb'] * 1024 ** 2 >= max_rss() - 1024 ** 2
+
+def test_get_monitor_interval():
+    monitor = get_monitor()
+    previous = monitor.interval
+    try:
+        assert get_monitor(0.05) is monitor
+        assert monitor.interval == 0.05
+        assert get_monitor().interval == 0.05  # No interval keeps the current one
+        monitor.start()
+        time.sleep(0.3)
+        monitor.stop()
+        assert len(monitor.samples) >= 2
+    finally:
+        monitor.interval = previous
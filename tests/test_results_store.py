@@ -0,0 +1,30 @@
+import pytest
+
+from results_store import ResultsWriter, metric_column, metric_names, read_results, render_report
+from rouge_scorer import SCORE_METRICS
+
+SAMPLES = [{'id': f"s{i}"} for i in range(3)]
+
+def score(f):
+    return {metric: {'p': f, 'r': f, 'f': f} for metric in SCORE_METRICS}
+
+@pytest.mark.parametrize('output_format', ['parquet', 'jsonl'])
+def test_columns_do_not_depend_on_the_first_flush(tmp_path, output_format):
+    # The first row group has no scores at all (a dataset without references)
+    with ResultsWriter(str(tmp_path), output_format, buffer_rows=2) as writer:
+        writer.write('cnn', 'bertsum', SAMPLES, ['a', 'b', 'c'], {})
+        writer.write('DUC2006', 'pegasus', SAMPLES, ['d', 'e', 'f'], {0: score(0.5), 2: score(0.25)},
+                     finish_times={0: 1.5})
+    table = read_results(writer.path)
+    assert metric_names(table) == [metric.replace('-', '_') for metric in SCORE_METRICS]
+    records = table.to_pylist()
+    assert len(records) == 6 == writer.rows
+    assert records[0][metric_column('rouge-su4', 'f')] is None
+    assert [record[metric_column('rouge-2', 'r')] for record in records[3:]] == [0.5, None, 0.25]
+    assert records[3]['finished_after_s'] == 1.5
+    assert 'Average ROUGE-LSUM F1: 0.3750' in render_report(table, dataset='DUC2006')
+
+def test_unknown_metric_is_rejected(tmp_path):
+    writer = ResultsWriter(str(tmp_path), 'jsonl', metrics=('rouge-1',))
+    with pytest.raises(ValueError, match='rouge-2'):
+        writer.write('cnn', 'bertsum', SAMPLES[:1], ['a'], {0: {'rouge-1': score(1)['rouge-1'], 'rouge-2': score(1)['rouge-2']}})
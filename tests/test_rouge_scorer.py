@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+from conftest import DATASET_DIR
+from rouge_scorer import (ParallelRougeEvaluator, ReferenceIndex, SCORE_METRICS, evaluate_rouge, get_default_scorer,
+                          scores_by_sample)
+
+rouge_metric = pytest.importorskip('rouge_metric')
+
+PREDICTIONS = [
+    "the cat sat on the mat . it was happy",
+    "Police said the man was arrested on Monday.\nHe will appear in court.",
+    "no references for this one",
+    "a quick brown fox jumps over the lazy dog",
+]
+REFERENCES = [
+    ["the cat was sitting on the mat and it was happy .", "a cat sat on a mat"],
+    ["The man was arrested by police on Monday.\nHe appears in court on Friday."],
+    [],
+    ["the quick brown fox jumped over a lazy dog", "foxes jump over dogs"],
+]
+
+def pyrouge_scores(prediction, references):
+    """PyRouge's scores of one sample, keyed like ours: its summary-level rouge-l is our rouge-lsum."""
+    rouge = rouge_metric.PyRouge(rouge_n=(1, 2), rouge_l=True, rouge_su=True, skip_gap=4, multi_ref_mode='best',
+                                 alpha=0.5)
+    expected = rouge.evaluate([prediction], [references], sentencizer=get_default_scorer().sentences)
+    expected['rouge-lsum'] = expected.pop('rouge-l')
+    # Our rouge-l is the LCS of the whole texts, i.e. PyRouge's rouge-l with each text one sentence
+    flat = rouge.evaluate([' '.join(prediction.split())], [[' '.join(ref.split()) for ref in references]])
+    expected['rouge-l'] = flat['rouge-l']
+    return expected
+
+def max_difference(predictions, reference_lists, scores):
+    scored = [(pred, refs) for pred, refs in zip(predictions, reference_lists) if refs]
+    assert len(scores) == len(scored)
+    diff = 0.0
+    for (prediction, references), score in zip(scored, scores):
+        expected = pyrouge_scores(prediction, references)
+        assert sorted(expected) == sorted(SCORE_METRICS)
+        for metric, values in expected.items():
+            for key, value in values.items():
+                diff = max(diff, abs(value - score[metric][key]))
+    return diff
+
+def test_pyrouge_parity_is_exact():
+    assert max_difference(PREDICTIONS, REFERENCES, evaluate_rouge(PREDICTIONS, REFERENCES)) == 0.0
+
+def test_pyrouge_parity_on_duc_gold_summaries():
+    from load_data import load_multiple_datasets
+    for name, dataset in load_multiple_datasets(DATASET_DIR).items():
+        # Score each topic's first gold summary against the remaining ones
+        predictions = [sample['references'][0] for sample in dataset]
+        references = [sample['references'][1:] for sample in dataset]
+        assert max_difference(predictions, references, evaluate_rouge(predictions, references)) == 0.0, name
+
+def test_reference_index_matches_scoring_from_lists():
+    index = ReferenceIndex.build(get_default_scorer(), REFERENCES)
+    assert evaluate_rouge(PREDICTIONS, None, index) == evaluate_rouge(PREDICTIONS, REFERENCES)
+
+def test_reference_index_take_and_save_round_trip(tmp_path):
+    index = ReferenceIndex.build(get_default_scorer(), REFERENCES)
+    subset = [3, 0, 1]
+    expected = evaluate_rouge([PREDICTIONS[i] for i in subset], [REFERENCES[i] for i in subset])
+    assert evaluate_rouge([PREDICTIONS[i] for i in subset], None, index.take(subset)) == expected
+    path = str(tmp_path / 'index.npz')
+    index.save(path)
+    assert evaluate_rouge(PREDICTIONS, None, ReferenceIndex.load(path)) == evaluate_rouge(PREDICTIONS, REFERENCES)
+
+def test_parallel_evaluator_matches_serial():
+    predictions = PREDICTIONS * 5
+    references = REFERENCES * 5
+    index = ReferenceIndex.build(get_default_scorer(), references)
+    with ParallelRougeEvaluator(workers=2, chunk_size=3) as evaluator:
+        assert evaluator.evaluate(predictions, references, index) == evaluate_rouge(predictions, references)
+
+def test_scores_by_sample_skips_samples_without_references():
+    index = ReferenceIndex.build(get_default_scorer(), REFERENCES)
+    scores = evaluate_rouge(PREDICTIONS, None, index)
+    keyed = scores_by_sample(scores, index)
+    assert sorted(keyed) == [0, 1, 3]
+    assert keyed[3] == scores[2]
+    with pytest.raises(ValueError):
+        scores_by_sample(scores[:2], index)
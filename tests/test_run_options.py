@@ -0,0 +1,82 @@
+import json
+
+import pytest
+
+from run_options import (CNN_DEFAULTS, DUC_DEFAULTS, load_config_file, options_digest, resolve_options,
+                         result_dir_for, sample_range)
+
+def test_later_layers_win_and_none_is_ignored():
+    options = resolve_options(DUC_DEFAULTS, {'samples': 10, 'workers': 2}, {'samples': 5, 'workers': None})
+    assert options['samples'] == 5
+    assert options['workers'] == 2
+    assert options['start'] == DUC_DEFAULTS['start']
+
+def test_defaults_are_not_modified():
+    resolve_options(DUC_DEFAULTS, {'models': ['pegasus']})
+    assert DUC_DEFAULTS['models'] == ['bertsum', 'pegasus']
+
+def test_unknown_keys_and_invalid_choices_are_rejected():
+    with pytest.raises(ValueError):
+        resolve_options(DUC_DEFAULTS, {'split': 'test'})  # CNN-only option
+    with pytest.raises(ValueError):
+        resolve_options(DUC_DEFAULTS, {'backend': 'tpu'})
+    with pytest.raises(ValueError):
+        resolve_options(CNN_DEFAULTS, {'models': ['bertsum', 'gpt']})
+    with pytest.raises(ValueError):
+        resolve_options(CNN_DEFAULTS, {'models': []})
+
+def test_models_are_normalized():
+    assert resolve_options(CNN_DEFAULTS, {'models': 'pegasus'})['models'] == ['pegasus']
+    assert resolve_options(CNN_DEFAULTS, {'models': ['pegasus', 'bertsum']})['models'] == ['bertsum', 'pegasus']
+
+def test_config_file_sections(tmp_path):
+    path = tmp_path / 'run.toml'
+    path.write_text('samples = 20\nworkers = 2\n\n[duc]\nsamples = 5\n\n[cnn]\nsplit = "validation"\n')
+    assert load_config_file(str(path), 'duc') == {'samples': 5, 'workers': 2}
+    assert load_config_file(str(path), 'cnn') == {'samples': 20, 'workers': 2, 'split': 'validation'}
+    json_path = tmp_path / 'run.json'
+    json_path.write_text(json.dumps({'samples': 3, 'cnn': {'stride': 2}}))
+    assert load_config_file(str(json_path), 'duc') == {'samples': 3}
+    with pytest.raises(ValueError):
+        load_config_file(str(tmp_path / 'run.ini'))
+
+def test_config_then_command_line():
+    config = {'samples': 20, 'backend': 'int8'}
+    cli = {'samples': 3, 'backend': None}
+    options = resolve_options(CNN_DEFAULTS, config, cli)
+    assert (options['samples'], options['backend']) == (3, 'int8')
+
+def test_digest_ignores_throughput_and_output_settings():
+    base = resolve_options(DUC_DEFAULTS, {'samples': 10})
+    tuned = resolve_options(DUC_DEFAULTS, {'samples': 10, 'workers': 4, 'threads': 2, 'pegasus_batch_size': 16,
+                                           'output_dir': 'elsewhere', 'output_format': 'jsonl', 'trace': 'chrome'})
+    assert options_digest(tuned) == options_digest(base)
+    assert options_digest(resolve_options(DUC_DEFAULTS, {'samples': 11})) != options_digest(base)
+    assert options_digest(resolve_options(DUC_DEFAULTS, {'samples': 10, 'models': ['pegasus']})) != options_digest(base)
+    reordered = resolve_options(DUC_DEFAULTS, {'samples': 10, 'models': ['pegasus', 'bertsum']})
+    assert options_digest(reordered) == options_digest(base)
+
+def test_result_dir():
+    options = resolve_options(DUC_DEFAULTS, {'samples': 10})
+    assert result_dir_for(options, True) == result_dir_for(dict(options, workers=8), True)
+    assert result_dir_for(options, True).startswith(DUC_DEFAULTS['output_dir'])
+    assert result_dir_for(dict(options, run_name='mine'), False).endswith('mine')
+
+def test_sample_range():
+    assert list(sample_range(10, {'start': 2, 'samples': 3})) == [2, 3, 4]
+    assert list(sample_range(10, {'start': 8, 'samples': None})) == [8, 9]
+    assert list(sample_range(10, {'start': 1, 'samples': 3, 'stride': 3})) == [1, 4, 7]
+
+def test_saved_options_resolve_unchanged(tmp_path):
+    from checkpoint import load_run_config, save_run_config
+    options = resolve_options(CNN_DEFAULTS, {'split': 'validation', 'samples': 7, 'models': ['pegasus']})
+    save_run_config(str(tmp_path), options)
+    assert resolve_options(CNN_DEFAULTS, load_run_config(str(tmp_path))) == options
+
+def test_monitor_interval():
+    assert resolve_options(DUC_DEFAULTS)['monitor_interval'] == 0.5
+    options = resolve_options(DUC_DEFAULTS, {'monitor_interval': 2.0})
+    assert options['monitor_interval'] == 2.0
+    assert options_digest(options) == options_digest(resolve_options(DUC_DEFAULTS))
+    with pytest.raises(ValueError):
+        resolve_options(DUC_DEFAULTS, {'monitor_interval': 0})
@@ -0,0 +1,78 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from significance import bootstrap_ci, bootstrap_means, compare_models, paired_randomization_test
+
+def test_bootstrap_means_match_naive_resampling():
+    values = np.random.default_rng(1).normal(size=(50, 3))
+    means = bootstrap_means(values, n_resamples=500, seed=7)
+    # Same draws as the counting implementation, averaged row by row
+    draws = np.random.default_rng(7).integers(0, len(values), size=(500, len(values)), dtype=np.int64)
+    np.testing.assert_allclose(means, values[draws].mean(axis=1), rtol=0, atol=1e-12)
+
+def test_bootstrap_means_over_several_blocks(monkeypatch):
+    import significance
+    monkeypatch.setattr(significance, 'BLOCK_CELLS', 40)  # 4 resamples of 10 samples per block
+    values = np.arange(10, dtype=np.float64)
+    means = bootstrap_means(values, n_resamples=11, seed=3)
+    assert means.shape == (11, 1)
+    assert np.all((means >= 0) & (means <= 9))
+
+def test_bootstrap_ci():
+    values = np.random.default_rng(2).normal(loc=0.4, scale=0.1, size=400)
+    mean, low, high = bootstrap_ci(values, n_resamples=2000)
+    assert low[0] < mean[0] < high[0]
+    # The percentile interval of a mean is close to the normal one for this sample size
+    half_width = 1.96 * values.std(ddof=1) / np.sqrt(len(values))
+    assert (high[0] - low[0]) / 2 == pytest.approx(half_width, rel=0.1)
+    _, low, high = bootstrap_ci(np.full(20, 0.5))
+    assert low[0] == high[0] == 0.5
+
+def exact_p_value(diffs):
+    observed = abs(diffs.sum())
+    sums = [abs(np.dot(signs, diffs)) for signs in itertools.product((1, -1), repeat=len(diffs))]
+    return np.mean(np.array(sums) >= observed - 1e-12)
+
+def test_randomization_p_value_matches_exact_enumeration():
+    rng = np.random.default_rng(4)
+    a = rng.uniform(size=(12, 2))
+    b = a - np.column_stack([rng.normal(0.05, 0.1, 12), rng.normal(0.0, 0.1, 12)])
+    diff, p_value = paired_randomization_test(a, b, n_resamples=20000)
+    np.testing.assert_allclose(diff, (a - b).mean(axis=0))
+    for column in range(2):
+        assert p_value[column] == pytest.approx(exact_p_value(a[:, column] - b[:, column]), abs=0.015)
+
+def test_randomization_of_identical_scores():
+    a = np.random.default_rng(5).uniform(size=30)
+    diff, p_value = paired_randomization_test(a, a, n_resamples=1000)
+    assert diff[0] == 0.0
+    assert p_value[0] == 1.0
+
+def test_empty_samples_are_rejected():
+    with pytest.raises(ValueError):
+        bootstrap_means(np.zeros((0, 2)))
+    with pytest.raises(ValueError):
+        paired_randomization_test([], [])
+
+def test_compare_models_pairs_on_shared_samples():
+    pa = pytest.importorskip('pyarrow')
+    records = []
+    for i in range(20):
+        records.append({'dataset': 'd', 'model': 'bertsum', 'index': i, 'id': str(i), 'rouge_1_p': 0.0,
+                        'rouge_1_r': 0.0, 'rouge_1_f': 0.3 + 0.01 * i})
+        if i < 15:
+            records.append({'dataset': 'd', 'model': 'pegasus', 'index': i, 'id': str(i), 'rouge_1_p': 0.0,
+                            'rouge_1_r': 0.0, 'rouge_1_f': 0.2 + 0.01 * i})
+    records.append({'dataset': 'd', 'model': 'pegasus', 'index': 15, 'id': '15', 'rouge_1_p': None,
+                    'rouge_1_r': None, 'rouge_1_f': None})
+    report = compare_models(pa.Table.from_pylist(records), n_resamples=1000)
+    assert report['metrics'] == ['rouge_1']
+    assert report['models']['bertsum']['n'] == 20
+    assert report['models']['pegasus']['n'] == 15
+    pair, = report['pairs']
+    assert (pair['a'], pair['b'], pair['n']) == ('bertsum', 'pegasus', 15)
+    assert pair['diff'][0] == pytest.approx(0.1)
+    assert pair['low'][0] == pytest.approx(0.1) and pair['high'][0] == pytest.approx(0.1)
+    assert pair['p'][0] == pytest.approx(1 / 1001)
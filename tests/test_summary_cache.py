@@ -0,0 +1,105 @@
+import itertools
+
+import pytest
+
+import inference_scheduler
+import summary_cache
+from summary_cache import COUNTERS, SummaryCache, cache_counters, cached_summarize, get_summary_cache
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Strictly increasing time.time(), so every access gets its own last_access."""
+    ticks = itertools.count(1000)
+    monkeypatch.setattr(summary_cache.time, 'time', lambda: float(next(ticks)))
+
+@pytest.fixture
+def fresh_cache(monkeypatch):
+    """No process-wide cache yet; the next get_summary_cache() opens one under the test's cache root."""
+    monkeypatch.setattr(summary_cache, '_cache', None)
+    yield
+    if summary_cache._cache is not None:
+        summary_cache._cache.close()
+
+def keys_in(cache):
+    return sorted(key for key, in cache._conn.execute("SELECT key FROM summaries"))
+
+def test_evicts_least_recently_used(tmp_path, clock):
+    cache = SummaryCache(str(tmp_path / 'summaries.sqlite'), max_bytes=30)
+    cache.put('a', 'm', 'x' * 10)
+    cache.put('b', 'm', 'x' * 10)
+    cache.put('c', 'm', 'x' * 10)
+    # Reading 'a' makes 'b' the least recently used entry
+    assert cache.get('a') == 'x' * 10
+    cache.put('d', 'm', 'x' * 10)
+    assert keys_in(cache) == ['a', 'c', 'd']
+    assert cache.evictions == 1
+    # One large entry pushes out as many old ones as needed, oldest first
+    cache.put('e', 'm', 'x' * 25)
+    assert keys_in(cache) == ['e']
+    assert cache.evictions == 4
+    cache.close()
+
+def test_total_bytes_follows_the_table(tmp_path, clock):
+    path = str(tmp_path / 'summaries.sqlite')
+    cache = SummaryCache(path, max_bytes=100)
+    cache.put_many([('a', 'm', 'x' * 10), ('b', 'm', 'é' * 10)])
+    assert cache._total_bytes == cache._table_bytes() == 30
+    # Replacing a key, and a key repeated within one batch, count only the stored summary
+    cache.put_many([('a', 'm', 'x' * 4), ('c', 'm', 'x' * 7), ('c', 'm', 'x' * 3)])
+    assert cache._total_bytes == cache._table_bytes() == 27
+    cache.put('d', 'm', 'x' * 90)
+    assert cache._total_bytes == cache._table_bytes() <= 100
+    assert cache.stats()['bytes'] == cache._total_bytes
+    # A replica writing the same file is picked up once eviction re-reads the real total
+    replica = SummaryCache(path, max_bytes=100)
+    replica.put('r', 'm', 'x' * 5)
+    cache.put('e', 'm', 'x' * 20)
+    assert cache._total_bytes == cache._table_bytes() <= 100
+    assert SummaryCache(path)._total_bytes == cache._total_bytes
+    replica.close()
+    cache.close()
+
+def test_cache_counters_without_a_cache(fresh_cache):
+    assert cache_counters() == dict.fromkeys(COUNTERS, 0)
+
+def test_counters_and_add_counters(fresh_cache):
+    cache = get_summary_cache()
+    cache.get_many(['a', 'b'])
+    cache.put('a', 'm', 'summary')
+    cache.get_many(['a', 'b'])
+    assert cache_counters() == {'hits': 1, 'misses': 3, 'evictions': 0}
+    cache.add_counters({'hits': 5, 'misses': 2})
+    assert cache_counters() == {'hits': 6, 'misses': 5, 'evictions': 0}
+    assert cache.format_stats().startswith('[Cache] Hits: 6 | Misses: 5 | Hit rate: 54.5%')
+
+def test_replica_task_reports_its_own_counts(tmp_path, fresh_cache, monkeypatch):
+    generated = []
+
+    def summarize(samples, on_summary=None):
+        articles = [sample['article'] for sample in samples]
+
+        def run(missing, callback):
+            generated.extend(missing)
+            summaries = [article.upper() for article in missing]
+            for i, summary in enumerate(summaries):
+                callback(i, summary)
+            return summaries
+        return cached_summarize('fake', {'p': 1}, articles, run, on_summary)
+
+    monkeypatch.setattr(inference_scheduler, '_resolve', lambda model: summarize)
+    # Earlier activity in the replica is not part of the next task's counts
+    get_summary_cache().get_many(['unrelated'])
+    summaries, _, first = inference_scheduler._summarize_task('fake', [{'article': 'one'}, {'article': 'two'}], {})
+    assert summaries == ['ONE', 'TWO']
+    assert first == {'hits': 0, 'misses': 2, 'evictions': 0}
+    summaries, _, second = inference_scheduler._summarize_task('fake', [{'article': 'two'}, {'article': 'three'}], {})
+    assert summaries == ['TWO', 'THREE']
+    assert second == {'hits': 1, 'misses': 1, 'evictions': 0}
+    assert generated == ['one', 'two', 'three']
+
+    # The parent adds each task's counts to its own cache stats
+    parent = SummaryCache(str(tmp_path / 'parent.sqlite'))
+    parent.add_counters(first)
+    parent.add_counters(second)
+    assert (parent.hits, parent.misses, parent.evictions) == (1, 3, 0)
+    parent.close()
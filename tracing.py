@@ -0,0 +1,307 @@
+"""Span tracing and per-stage profiling for the summarization pipeline.
+
+`span(name, **attrs)` times a block of code. While tracing is disabled (the
+default) it returns one shared no-op context manager, so an instrumented call
+costs a global lookup and nothing else. `enable()` installs a process-wide
+Tracer. From then on, every span records its start, duration, thread, process
+and parent span, and `save()` writes them as a Chrome trace (chrome://tracing,
+Perfetto) or as OpenTelemetry-style JSON.
+
+ResourceMonitor.stage opens a span as well, so every monitored stage shows up
+in the trace without extra code. Stages whose names start with one of
+`profile_stages` can also be profiled, either with cProfile ('cprofile',
+written as <stage>.prof for pstats/snakeviz) or with a sampler thread that
+records the Python stacks of the threads inside those stages every few
+milliseconds ('sample', written in the folded-stack format that py-spy,
+speedscope and flamegraph.pl read).
+
+Replicas spawned by InferenceScheduler trace on their own when the parent
+enabled tracing, and their spans are merged into the parent's trace. Profiles
+are only taken in the process that called `enable()`.
+"""
+import contextlib
+import cProfile
+import functools
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+
+FORMATS = ('chrome', 'otel')
+PROFILERS = ('cprofile', 'sample')
+SAMPLE_INTERVAL = 0.005  # Seconds between stack samples
+TRACE_FILES = {'chrome': 'trace.json', 'otel': 'trace.otel.json'}
+
+_NULL_SPAN = contextlib.nullcontext()
+_tracer = None
+
+class _Span:
+    __slots__ = ('tracer', 'name', 'attrs', 'span_id', 'parent_id', 'start_ns', 'wall_ns', 'profiler')
+
+    def __init__(self, tracer, name, attrs):
+        self.tracer = tracer
+        self.name = name
+        self.attrs = attrs
+        self.profiler = None
+
+    def __enter__(self):
+        self.tracer._push(self)
+        self.wall_ns = time.time_ns()
+        self.start_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter_ns() - self.start_ns
+        if exc_type is not None:
+            self.attrs['error'] = exc_type.__name__
+        self.tracer._pop(self, duration)
+
+class Tracer:
+    """
+    Args:
+        profile: None, 'cprofile' or 'sample'
+        profile_stages: Span name prefixes to profile (default: every span)
+        sample_interval: Seconds between stack samples in 'sample' mode
+    """
+
+    def __init__(self, profile=None, profile_stages=None, sample_interval=SAMPLE_INTERVAL):
+        if profile is not None and profile not in PROFILERS:
+            raise ValueError(f"Unknown profiler {profile!r}, expected one of {PROFILERS}")
+        self.profile = profile
+        self.profile_stages = tuple(profile_stages) if profile_stages else ('',)
+        self.sample_interval = sample_interval
+        self.pid = os.getpid()
+        self.events = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._next_id = 0
+        # thread id -> stack of open spans, read by the sampler thread
+        self._open = {}
+        self._profiles = {}
+        self._profiling = False  # cProfile can only run one profiler at a time
+        self._stacks = {}
+        self._stop_event = threading.Event()
+        self._sampler = None
+        if profile == 'sample':
+            self._sampler = threading.Thread(target=self._sample_loop, name='trace-sampler', daemon=True)
+            self._sampler.start()
+
+    def span(self, name, attrs):
+        return _Span(self, name, attrs)
+
+    def _profiled(self, name):
+        return self.profile is not None and name.startswith(self.profile_stages)
+
+    def _push(self, span):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+            with self._lock:
+                self._open[threading.get_ident()] = stack
+        with self._lock:
+            self._next_id += 1
+            span.span_id = self._next_id
+        span.parent_id = stack[-1].span_id if stack else None
+        stack.append(span)
+        if self.profile == 'cprofile' and self._profiled(span.name):
+            with self._lock:
+                start_profiler = not self._profiling
+                self._profiling = True
+            if start_profiler:
+                span.profiler = cProfile.Profile()
+                span.profiler.enable()
+
+    def _pop(self, span, duration):
+        if span.profiler is not None:
+            span.profiler.disable()
+        self._local.stack.pop()
+        event = {'name': span.name, 'start_ns': span.wall_ns, 'duration_ns': duration, 'pid': self.pid,
+                 'tid': threading.get_ident(), 'span_id': span.span_id, 'parent_id': span.parent_id,
+                 'attrs': span.attrs}
+        with self._lock:
+            self.events.append(event)
+            if span.profiler is not None:
+                self._profiles.setdefault(span.name, []).append(span.profiler)
+                self._profiling = False
+
+    def _sample_loop(self):
+        own = threading.get_ident()
+        while not self._stop_event.wait(self.sample_interval):
+            frames = sys._current_frames()
+            with self._lock:
+                active = [(tid, stack[-1].name) for tid, stack in self._open.items() if stack and tid != own]
+                for tid, stage in active:
+                    if not self._profiled(stage) or tid not in frames:
+                        continue
+                    folded = _fold(frames[tid])
+                    counts = self._stacks.setdefault(stage, {})
+                    counts[folded] = counts.get(folded, 0) + 1
+
+    def add_events(self, events):
+        """Merge spans recorded in another process (see `drain`)."""
+        with self._lock:
+            self.events.extend(events)
+
+    def drain(self):
+        """Return the recorded spans and forget them (replicas hand them back after every task)."""
+        with self._lock:
+            events, self.events = self.events, []
+        return events
+
+    def stop(self):
+        if self._sampler is not None:
+            self._stop_event.set()
+            self._sampler.join()
+            self._sampler = None
+
+    def chrome_trace(self):
+        events = [{'name': 'process_name', 'ph': 'M', 'pid': pid, 'args': {'name': 'main' if pid == self.pid else f'replica {pid}'}}
+                  for pid in sorted({event['pid'] for event in self.events})]
+        for event in self.events:
+            events.append({'name': event['name'], 'cat': event['name'].split('.')[0], 'ph': 'X',
+                           'ts': event['start_ns'] / 1000, 'dur': event['duration_ns'] / 1000,
+                           'pid': event['pid'], 'tid': event['tid'], 'args': event['attrs']})
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def otel_trace(self, service_name='summarization'):
+        # One trace per run; span ids are unique per process, so the pid is folded into them
+        trace_id = f"{self.pid:08x}{time.time_ns():024x}"[-32:]
+        spans = []
+        for event in self.events:
+            span = {
+                'traceId': trace_id,
+                'spanId': f"{event['pid']:08x}{event['span_id']:08x}",
+                'name': event['name'],
+                'kind': 1,  # SPAN_KIND_INTERNAL
+                'startTimeUnixNano': str(event['start_ns']),
+                'endTimeUnixNano': str(event['start_ns'] + event['duration_ns']),
+                'attributes': [_otel_attribute(key, value) for key, value in
+                               dict(event['attrs'], **{'process.pid': event['pid'], 'thread.id': event['tid']}).items()],
+            }
+            if event['parent_id'] is not None:
+                span['parentSpanId'] = f"{event['pid']:08x}{event['parent_id']:08x}"
+            if 'error' in event['attrs']:
+                span['status'] = {'code': 2}  # STATUS_CODE_ERROR
+            spans.append(span)
+        resource = {'attributes': [_otel_attribute('service.name', service_name)]}
+        return {'resourceSpans': [{'resource': resource,
+                                   'scopeSpans': [{'scope': {'name': 'tracing'}, 'spans': spans}]}]}
+
+    def save(self, result_dir, trace_format='chrome'):
+        """Write the trace (and any profiles) into `result_dir`; returns the list of written paths."""
+        if trace_format not in FORMATS:
+            raise ValueError(f"Unknown trace format {trace_format!r}, expected one of {FORMATS}")
+        self.stop()
+        os.makedirs(result_dir, exist_ok=True)
+        path = os.path.join(result_dir, TRACE_FILES[trace_format])
+        with self._lock:
+            trace = self.chrome_trace() if trace_format == 'chrome' else self.otel_trace()
+            profiles = dict(self._profiles)
+            stacks = dict(self._stacks)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(trace, f)
+        written = [path]
+        profile_dir = os.path.join(result_dir, 'profiles')
+        for stage, profilers in profiles.items():
+            os.makedirs(profile_dir, exist_ok=True)
+            stats = pstats.Stats(profilers[0])
+            for profiler in profilers[1:]:
+                stats.add(profiler)
+            written.append(os.path.join(profile_dir, f'{stage}.prof'))
+            stats.dump_stats(written[-1])
+        for stage, counts in stacks.items():
+            os.makedirs(profile_dir, exist_ok=True)
+            written.append(os.path.join(profile_dir, f'{stage}.folded'))
+            with open(written[-1], 'w', encoding='utf-8') as f:
+                for folded, count in sorted(counts.items(), key=lambda item: -item[1]):
+                    f.write(f"{folded} {count}\n")
+        return written
+
+    def summary(self):
+        """Total seconds and count per span name, slowest first."""
+        totals = {}
+        with self._lock:
+            for event in self.events:
+                total = totals.setdefault(event['name'], [0, 0])
+                total[0] += event['duration_ns']
+                total[1] += 1
+        return sorted(((name, ns / 1e9, count) for name, (ns, count) in totals.items()), key=lambda item: -item[1])
+
+def _fold(frame):
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+def _otel_attribute(key, value):
+    if isinstance(value, bool):
+        typed = {'boolValue': value}
+    elif isinstance(value, int):
+        typed = {'intValue': str(value)}
+    elif isinstance(value, float):
+        typed = {'doubleValue': value}
+    else:
+        typed = {'stringValue': str(value)}
+    return {'key': key, 'value': typed}
+
+def span(name, **attrs):
+    """Time the enclosed block as a span named `name`; a no-op unless tracing is enabled."""
+    tracer = _tracer
+    if tracer is None:
+        return _NULL_SPAN
+    return tracer.span(name, attrs)
+
+def traced(name):
+    """Decorator form of `span` for whole functions."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def enable(profile=None, profile_stages=None, sample_interval=SAMPLE_INTERVAL):
+    """Start recording spans in this process and return the Tracer."""
+    global _tracer
+    if _tracer is not None:
+        _tracer.stop()
+    _tracer = Tracer(profile, profile_stages, sample_interval)
+    return _tracer
+
+def disable():
+    global _tracer
+    if _tracer is not None:
+        _tracer.stop()
+    _tracer = None
+
+def get_tracer():
+    """The active Tracer, or None while tracing is disabled."""
+    return _tracer
+
+def enabled():
+    return _tracer is not None
+
+def drain():
+    """Spans recorded so far in this process (empty while disabled); used by replica processes."""
+    return _tracer.drain() if _tracer is not None else []
+
+def add_events(events):
+    if _tracer is not None and events:
+        _tracer.add_events(events)
+
+def save(result_dir, trace_format='chrome'):
+    """Write the trace of the active Tracer into `result_dir` and print where it went."""
+    if _tracer is None:
+        return []
+    written = _tracer.save(result_dir, trace_format)
+    print(f"[Trace] {len(_tracer.events)} span disimpan di {written[0]}")
+    for name, seconds, count in _tracer.summary()[:10]:
+        print(f"[Trace]   {name:<24} {seconds:8.2f} s  ({count}x)")
+    for path in written[1:]:
+        print(f"[Trace] Profil: {path}")
+    return written